@@ -1,25 +1,48 @@
 import requests
+import asyncio
+import hashlib
 import json
 import os
-import unicodedata
-import gzip
 import concurrent.futures
+import queue
 import sys
+import signal
 import time
 import random
 import re
-from datetime import datetime, date
-from requests.adapters import HTTPAdapter
+import threading
+from collections import Counter
+from datetime import datetime, date, timedelta
 from urllib3.util.retry import Retry
+from automato import AutomatoTermos, ClassificadorTermos
+from normalizacao import normalizar
+from regras_materiais import carregar_motor
+from controle_taxa import ControleConcorrencia, LimitadorTaxa
+from armazenamento import carregar_banco, gravar_alteracoes
+from cache_http import criar_adaptador, obter_cache
+from metricas import METRICAS
+from registro import criar_log
+from rejeitados import IndiceRejeitados
 
 # --- CONFIGURAÇÕES DE ARQUIVOS ---
-ARQDADOS = 'pregacoes_pharma_limpos.json.gz' 
 ARQ_DICIONARIO = 'dicionario_ouro.json'
 ARQ_LOCK = 'execucao.lock'
 ARQ_LOG = 'log_captura.txt'
+ARQ_CHECKPOINT = 'checkpoint_captura.json'
+# Acertos por termo da triagem do objeto (vetos e listas brancas) na última execução
+# Métricas da execução (requisições por endpoint, latências, etapas), ao lado do log
+ARQ_METRICAS = 'metricas_captura.json'
+# Raiz da API do PNCP (SNIPER_PNCP_URL aponta para o mock_pncp.py nos benchmarks offline)
+PNCP_URL = os.environ.get('SNIPER_PNCP_URL', 'https://pncp.gov.br').rstrip('/')
 
-# Limite de threads para não sobrecarregar a API do Governo
-MAXWORKERS = 4 
+# Teto de threads; quantas requisições ficam de fato em voo é o controle adaptativo que decide
+MAXWORKERS = 16
+# Ponto de partida do controle (o antigo limite fixo); sobe enquanto o PNCP responde bem, cai com 429/403/5xx
+CONCORRENCIA_INICIAL = 4
+# Editais buscados à frente dos workers (4 páginas da listagem)
+TAMANHO_FILA = 200
+# Mude sempre que a lógica de avaliar_itens mudar: descarta o índice de editais rejeitados
+VERSAO_FILTROS = 1
 
 # --- GEOGRAFIA DE PRECISÃO ---
 NE_ESTADOS = ['AL', 'BA', 'CE', 'MA', 'PB', 'PE', 'PI', 'RN', 'SE']
@@ -27,9 +50,7 @@ UFS_PERMITIDAS_MED = NE_ESTADOS + ['DF', 'ES', 'MG', 'RJ', 'SP', 'GO', 'MT', 'MS
 UFS_PERMITIDAS_MMH = NE_ESTADOS + ['DF', 'BR', '']
 ESTADOS_BLOQUEADOS = ['RS', 'SC', 'PR', 'AP', 'AC', 'RO', 'RR']
 
-def normalize(t):
-    if not t: return ""
-    return ''.join(c for c in unicodedata.normalize('NFD', str(t)).upper() if unicodedata.category(c) != 'Mn')
+normalize = normalizar
 
 # 🛑 MURALHA 1: VETOS ABSOLUTOS DO EDITAL (O Objeto Inteiro Morre Aqui)
 VETOS_ABSOLUTOS = [normalize(x) for x in [
@@ -66,39 +87,69 @@ WL_MEDICAMENTOS = [normalize(x) for x in ["MEDICAMENT", "FARMAC", "REMEDIO", "SO
 WL_NUTRI_MMH = [normalize(x) for x in ["NUTRICAO ENTERAL", "FORMULA INFANTIL", "DIETA ENTERAL", "MATERIAL MEDIC", "INSUMO HOSPITALAR", "MMH", "SERINGA", "GAZE", "SONDA", "LUVA"]]
 WL_TERMOS_VAGOS = [normalize(x) for x in ["SAUDE", "HOSPITAL", "MATERNIDADE", "CLINICA", "FUNDO MUNICIPAL", "SECRETARIA DE"]]
 
-def log_mensagem(msg):
-    timestamp = datetime.now().strftime('%H:%M:%S')
-    linha = f"[{timestamp}] {msg}"
-    print(linha)
-    with open(ARQ_LOG, 'a', encoding='utf-8') as f:
-        f.write(linha + '\n')
+# Muralha 1 + listas brancas numa regex só: uma passada pelo objeto diz todas as categorias presentes e por qual termo
+CLASSIFICADOR_OBJETO = ClassificadorTermos({
+    'VETO': VETOS_ABSOLUTOS, 'MEDICAMENTO': WL_MEDICAMENTOS, 'NUTRI_MMH': WL_NUTRI_MMH, 'VAGO': WL_TERMOS_VAGOS,
+})
 
-def criar_sessao():
+# Regras de material hospitalar (regras_materiais.csv) aplicadas item a item
+MOTOR_MATERIAIS = carregar_motor()
+
+# Quantas vezes cada termo do dicionário casou com um item nesta execução
+CONTADOR_TERMOS = Counter()
+# Quantos itens cada regra de material reconheceu nesta execução
+CONTADOR_REGRAS = Counter()
+# Quantos objetos acionaram cada (categoria, termo) da triagem nesta execução
+CONTADOR_TRIAGEM = Counter()
+LOCK_CONTADOR = threading.Lock()
+# IDs de editais novos ou alterados nesta execução (só eles vão para o log do banco)
+ALTERADOS = set()
+# Busca os itens mesmo de editais que não mudaram na listagem (--refetch-items; ex.: dicionário ou regras novos)
+REBUSCAR_ITENS = False
+# Editais já rejeitados pelos itens com os filtros atuais (criado em executar_captura, com o dicionário carregado)
+REJEITADOS = None
+
+# Console + log_captura.txt escritos por uma thread só, a partir de uma fila
+log_mensagem = criar_log(ARQ_LOG)
+
+# Controle AIMD compartilhado por todas as sessões do processo (recriado no __main__ com os parâmetros da linha de comando)
+CONTROLE = ControleConcorrencia(CONCORRENCIA_INICIAL, maximo=MAXWORKERS, log=log_mensagem)
+
+def criar_sessao(conexoes=10, controle=None):
     s = requests.Session()
     s.headers.update({
         'Accept': 'application/json', 
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
         'Accept-Language': 'pt-BR,pt;q=0.9'
     })
-    retry = Retry(total=5, backoff_factor=2, status_forcelist=[403, 429, 500, 502, 503, 504])
-    s.mount('https://', HTTPAdapter(max_retries=retry))
+    # O urllib3 só repete falhas de conexão; 403/429/5xx voltam para o controle de concorrência,
+    # que pausa todas as threads juntas (Retry-After) em vez de uma dormir no backoff enquanto as outras insistem.
+    # respect_retry_after_header=False: senão o urllib3 repete sozinho 413/429/503 que vêm com Retry-After
+    retry = Retry(total=5, backoff_factor=0.5, status_forcelist=[], respect_retry_after_header=False)
+    # Adaptador com cache em disco (TTL por endpoint + revalidação ETag/Last-Modified)
+    adaptador = criar_adaptador(controle, max_retries=retry, pool_connections=conexoes, pool_maxsize=conexoes)
+    s.mount('https://', adaptador)
+    s.mount('http://', adaptador) # mock_pncp.py local
     return s
 
-def buscar_todos_os_itens(cnpj, ano, seq, session):
+def _ler_pagina_itens(r):
+    """Interpreta a resposta de uma página de itens: (lista de itens, mensagem de erro)."""
+    if r.status_code != 200: return [], f"HTTP {r.status_code}"
+    json_resp = r.json()
+    return (json_resp if isinstance(json_resp, list) else json_resp.get('data', [])), None
+
+def buscar_todos_os_itens(cnpj, ano, seq, session, limitador=None):
     todos_itens = []
     pagina_item = 1
     erro_msg = None
     while True:
-        url = f"https://pncp.gov.br/api/pncp/v1/orgaos/{cnpj}/compras/{ano}/{seq}/itens"
+        url = f"{PNCP_URL}/api/pncp/v1/orgaos/{cnpj}/compras/{ano}/{seq}/itens"
         try:
-            time.sleep(random.uniform(0.6, 1.2)) # Pausa para evitar bloqueio de IP
+            if limitador: limitador.aguardar() # Orçamento global de requisições/s
+            else: time.sleep(random.uniform(0.6, 1.2)) # Pausa para evitar bloqueio de IP
             r = session.get(url, params={'pagina': pagina_item, 'tamanhoPagina': 500}, timeout=30)
-            if r.status_code != 200: 
-                erro_msg = f"HTTP {r.status_code}"
-                break
-            json_resp = r.json()
-            dados = json_resp if isinstance(json_resp, list) else json_resp.get('data', [])
-            if not dados: break
+            dados, erro_msg = _ler_pagina_itens(r)
+            if erro_msg or not dados: break
             todos_itens.extend(dados)
             if len(dados) < 500: break
             pagina_item += 1
@@ -107,154 +158,543 @@ def buscar_todos_os_itens(cnpj, ano, seq, session):
             break
     return todos_itens, erro_msg
 
-def processar_licitacao(lic, session, termos_ouro):
-    try:
-        uo = lic.get('unidadeOrgao', {})
-        uf = str(uo.get('ufSigla') or 'BR').upper().strip()
-        obj_raw = lic.get('objetoCompra') or ""
-        obj_norm = normalize(obj_raw)
-        edit = f"{lic.get('numeroCompra')}/{lic.get('anoCompra')}"
+async def buscar_todos_os_itens_async(cnpj, ano, seq, session, limitador, semaforo):
+    """Mesma paginação de buscar_todos_os_itens, mas cedendo o loop enquanto espera ficha e resposta."""
+    todos_itens = []
+    pagina_item = 1
+    erro_msg = None
+    while True:
+        url = f"{PNCP_URL}/api/pncp/v1/orgaos/{cnpj}/compras/{ano}/{seq}/itens"
+        try:
+            await limitador.aguardar_async()
+            async with semaforo:
+                r = await asyncio.to_thread(session.get, url, params={'pagina': pagina_item, 'tamanhoPagina': 500}, timeout=30)
+            dados, erro_msg = _ler_pagina_itens(r)
+            if erro_msg or not dados: break
+            todos_itens.extend(dados)
+            if len(dados) < 500: break
+            pagina_item += 1
+        except Exception as e:
+            erro_msg = str(e)[:50]
+            break
+    return todos_itens, erro_msg
 
-        # 1. Filtros Iniciais (Geo e Muralha 1 do Objeto)
-        if uf in ESTADOS_BLOQUEADOS: return ('VETO_GEO', None)
-        for v in VETOS_ABSOLUTOS:
-            if v in obj_norm: return ('VETO_TITULO', None)
-
-        tem_med = any(t in obj_norm for t in WL_MEDICAMENTOS)
-        tem_mmh = any(t in obj_norm for t in WL_NUTRI_MMH)
-        tem_vago = any(t in obj_norm for t in WL_TERMOS_VAGOS)
-
-        precisa_checar_itens = False
-        if tem_med:
-            if uf not in UFS_PERMITIDAS_MED: return ('VETO_GEO', None)
-        elif tem_mmh:
-            if uf not in UFS_PERMITIDAS_MMH: return ('VETO_GEO', None)
-        elif tem_vago:
-            precisa_checar_itens = True
-        else:
-            return ('FORA_TEMATICA', None)
+def classificar_objeto(obj_norm):
+    """{categoria: [termos]} do objeto normalizado, contando cada acerto para o relatório do fim da execução."""
+    acertos = CLASSIFICADOR_OBJETO.classificar(obj_norm)
+    if acertos:
+        with LOCK_CONTADOR:
+            for categoria, termos in acertos.items():
+                for termo in termos: CONTADOR_TRIAGEM[categoria, termo] += 1
+    return acertos
 
-        # 2. Busca de Itens Detalhada
-        cnpj = lic['orgaoEntidade']['cnpj']
-        ano = lic['anoCompra']
-        seq = lic['sequencialCompra']
-        itens_brutos, erro_api = buscar_todos_os_itens(cnpj, ano, seq, session)
+def triar_licitacao(lic):
+    """Filtros que só dependem do registro da listagem: (status de veto ou None, precisa_checar_itens)."""
+    uo = lic.get('unidadeOrgao', {})
+    uf = str(uo.get('ufSigla') or 'BR').upper().strip()
+    obj_norm = normalize(lic.get('objetoCompra') or "")
+
+    # 1. Filtros Iniciais (Geo e Muralha 1 do Objeto)
+    if uf in ESTADOS_BLOQUEADOS: return 'VETO_GEO', False
+    acertos = classificar_objeto(obj_norm)
+    if 'VETO' in acertos: return 'VETO_TITULO', False
+
+    if 'MEDICAMENTO' in acertos:
+        if uf not in UFS_PERMITIDAS_MED: return 'VETO_GEO', False
+    elif 'NUTRI_MMH' in acertos:
+        if uf not in UFS_PERMITIDAS_MMH: return 'VETO_GEO', False
+    elif 'VAGO' in acertos:
+        return None, True
+    else:
+        return 'FORA_TEMATICA', False
+    return None, False
+
+def avaliar_itens(lic, itens_brutos, precisa_checar_itens, automato_ouro):
+    """Aplica a Muralha 2 e o dicionário aos itens baixados e monta o registro final do banco."""
+    uo = lic.get('unidadeOrgao', {})
+    uf = str(uo.get('ufSigla') or 'BR').upper().strip()
+    obj_raw = lic.get('objetoCompra') or ""
+    edit = f"{lic.get('numeroCompra')}/{lic.get('anoCompra')}"
+    cnpj = lic['orgaoEntidade']['cnpj']
+    ano = lic['anoCompra']
+    seq = lic['sequencialCompra']
+
+    teve_match = False
+    termos_achados = Counter()
+    regras_achadas = Counter()
+    itens_mapeados = []
+    
+    for it in itens_brutos:
+        desc_item = normalize(it.get('descricao', ''))
         
-        if erro_api: return ('ERRO_API', f"{edit} -> {erro_api}")
+        # 🛑 MURALHA 2: Elimina comida, veículos e material de escritório
+        if REGEX_BLACKLIST_ITENS.search(desc_item):
+            continue
+        
+        # Verifica Match com o Dicionário de Fármacos (uma passada só pelo autômato)
+        achados = automato_ouro.encontrar(desc_item)
+        if achados:
+            teve_match = True
+            termos_achados.update(achados)
 
-        teve_match = False
-        itens_mapeados = []
+        # Regras de material (chave + afirmação - negação): MMH reconhecido no próprio item
+        regras = MOTOR_MATERIAIS.avaliar(it.get('descricao', ''))
+        if regras:
+            teve_match = True
+            regras_achadas.update({r['rotulo'] for r in regras})
         
-        for it in itens_brutos:
-            desc_item = normalize(it.get('descricao', ''))
-            
-            # 🛑 MURALHA 2: Elimina comida, veículos e material de escritório
-            if REGEX_BLACKLIST_ITENS.search(desc_item):
-                continue
-            
-            # Verifica Match com o Dicionário de Fármacos
-            if not teve_match and any(termo in desc_item for termo in termos_ouro):
-                teve_match = True
-            
-            # Captura precisa do Tipo de Benefício ME/EPP
-            try:
-                cod_benef = int(it.get('tipoBeneficio', 5))
-            except:
-                cod_benef = 5
-
-            itens_mapeados.append({
-                'n': it.get('numeroItem'), 
-                'd': it.get('descricao', ''),
-                'q': it.get('quantidade'), 
-                'u': it.get('unidadeMedida', 'UN'),
-                'v_est': it.get('valorUnitarioEstimado', 0), 
-                'benef': cod_benef
-            })
-
-        if precisa_checar_itens and not teve_match:
-            return ('VETO_DICIONARIO', None)
-            
-        # Se todos os itens foram eliminados pela Blacklist (ex: edital só de merenda)
-        if not itens_mapeados:
-            return ('FORA_TEMATICA', None)
-
-        # 3. Dados Finais para o Banco de Dados
-        cid = uo.get('municipioNome', '---')
-        uasg = uo.get('codigoUnidade', 'N/A')
-        unid_nome = uo.get('nomeUnidade', '---')
-
-        dados_finais = {
-            'id': f"{cnpj}{ano}{seq}", 
-            'dt_enc': lic.get('dataEncerramentoProposta'),
-            'uf': uf, 
-            'org': lic.get('orgaoEntidade', {}).get('razaoSocial', '---'),
-            'cid': cid, 'uasg': uasg, 'unid_nome': unid_nome,
-            'obj': obj_raw, 'edit': edit, 
-            'sit_global': lic.get('situacaoCompraNome', 'EM ANDAMENTO'), # <--- NOVA LINHA ADICIONADA AQUI
-            'link': f"https://pncp.gov.br/app/editais/{cnpj}/{ano}/{seq}",
-            'itens': itens_mapeados
-        }
-        return ('CAPTURADO', dados_finais)
+        # Captura precisa do Tipo de Benefício ME/EPP
+        try:
+            cod_benef = int(it.get('tipoBeneficio', 5))
+        except:
+            cod_benef = 5
 
+        itens_mapeados.append({
+            'n': it.get('numeroItem'), 
+            'd': it.get('descricao', ''),
+            'q': it.get('quantidade'), 
+            'u': it.get('unidadeMedida', 'UN'),
+            'v_est': it.get('valorUnitarioEstimado', 0), 
+            'benef': cod_benef
+        })
+
+    if precisa_checar_itens and not teve_match:
+        return ('VETO_DICIONARIO', None)
+
+    with LOCK_CONTADOR:
+        CONTADOR_TERMOS.update(termos_achados)
+        CONTADOR_REGRAS.update(regras_achadas)
+        
+    # Se todos os itens foram eliminados pela Blacklist (ex: edital só de merenda)
+    if not itens_mapeados:
+        return ('FORA_TEMATICA', None)
+
+    # 3. Dados Finais para o Banco de Dados
+    cid = uo.get('municipioNome', '---')
+    uasg = uo.get('codigoUnidade', 'N/A')
+    unid_nome = uo.get('nomeUnidade', '---')
+
+    dt_atu, h_lst = assinatura_listagem(lic)
+    dados_finais = {
+        'id': f"{cnpj}{ano}{seq}", 
+        'dt_enc': lic.get('dataEncerramentoProposta'),
+        'dt_atu': dt_atu, 'h_lst': h_lst, # Assinatura da listagem: recapturas pulam os itens se não mudou
+        'uf': uf, 
+        'org': lic.get('orgaoEntidade', {}).get('razaoSocial', '---'),
+        'cid': cid, 'uasg': uasg, 'unid_nome': unid_nome,
+        'obj': obj_raw, 'edit': edit, 
+        'sit_global': lic.get('situacaoCompraNome', 'EM ANDAMENTO'), # <--- NOVA LINHA ADICIONADA AQUI
+        'link': f"https://pncp.gov.br/app/editais/{cnpj}/{ano}/{seq}",
+        'itens': itens_mapeados
+    }
+    return ('CAPTURADO', dados_finais)
+
+def assinatura_listagem(lic):
+    """(data de atualização, hash do registro) da listagem; iguais aos guardados no banco = edital sem mudança."""
+    atualizacao = lic.get('dataAtualizacaoGlobal') or lic.get('dataAtualizacao')
+    return atualizacao, hashlib.blake2b(json.dumps(lic, ensure_ascii=False, sort_keys=True).encode('utf-8'), digest_size=8).hexdigest()
+
+def id_do_edital(lic):
+    try: return f"{lic['orgaoEntidade']['cnpj']}{lic['anoCompra']}{lic['sequencialCompra']}"
+    except (KeyError, TypeError): return None
+
+def edital_inalterado(banco, lic):
+    """O edital já está no banco e a listagem não mudou desde a captura: os itens não precisam ser buscados de novo."""
+    if REBUSCAR_ITENS: return False
+    id_lic = id_do_edital(lic)
+    anterior = banco.get(id_lic) if id_lic else None
+    return anterior is not None and 'h_lst' in anterior and (anterior.get('dt_atu'), anterior['h_lst']) == assinatura_listagem(lic)
+
+def assinatura_filtros(termos_ouro):
+    """O que decide uma rejeição depois dos itens: dicionário, regras de material, blacklist e listas da triagem."""
+    filtros = [VERSAO_FILTROS, termos_ouro, MOTOR_MATERIAIS.regras, BLACKLIST_ITENS, VETOS_ABSOLUTOS, WL_MEDICAMENTOS, WL_NUTRI_MMH,
+               WL_TERMOS_VAGOS, UFS_PERMITIDAS_MED, UFS_PERMITIDAS_MMH, ESTADOS_BLOQUEADOS]
+    return hashlib.blake2b(json.dumps(filtros, ensure_ascii=False, sort_keys=True).encode('utf-8'), digest_size=12).hexdigest()
+
+def rejeicao_conhecida(lic):
+    """Status da rejeição guardada no índice negativo, se este edital (nesta versão da listagem) já caiu nos itens."""
+    if REJEITADOS is None or REBUSCAR_ITENS: return None
+    id_lic = id_do_edital(lic)
+    return REJEITADOS.consultar(id_lic, assinatura_listagem(lic)[1]) if id_lic else None
+
+def lembrar_rejeicao(lic, itens_brutos, status):
+    """Rejeitado depois de baixar itens (com itens de fato: lista vazia pode ser edital ainda sem itens) entra no índice;
+    capturado sai dele."""
+    if REJEITADOS is None: return
+    id_lic = id_do_edital(lic)
+    if status in ('VETO_DICIONARIO', 'FORA_TEMATICA') and itens_brutos:
+        REJEITADOS.registrar(id_lic, assinatura_listagem(lic)[1], len(itens_brutos) // 500 + 1, status)
+    elif status == 'CAPTURADO':
+        REJEITADOS.descartar(id_lic)
+
+def processar_licitacao(lic, session, automato_ouro, limitador=None):
+    try:
+        with METRICAS.etapa('filtro'):
+            veto, precisa_checar_itens = triar_licitacao(lic)
+        if veto: return (veto, None)
+        rejeicao = rejeicao_conhecida(lic)
+        if rejeicao: return (rejeicao, None) # Já caiu nos itens com estes filtros: nenhuma requisição de itens
+
+        # 2. Busca de Itens Detalhada
+        edit = f"{lic.get('numeroCompra')}/{lic.get('anoCompra')}"
+        with METRICAS.etapa('itens'):
+            itens_brutos, erro_api = buscar_todos_os_itens(lic['orgaoEntidade']['cnpj'], lic['anoCompra'], lic['sequencialCompra'], session, limitador)
+        if erro_api: return ('ERRO_API', f"{edit} -> {erro_api}")
+
+        with METRICAS.etapa('filtro'):
+            status, resultado = avaliar_itens(lic, itens_brutos, precisa_checar_itens, automato_ouro)
+        lembrar_rejeicao(lic, itens_brutos, status)
+        return status, resultado
     except Exception: return ('ERRO_API', "Falha Interna")
 
-if __name__ == '__main__':
-    if os.path.exists(ARQ_LOCK): sys.exit(0)
-    with open(ARQ_LOCK, 'w') as f: f.write("lock")
+async def processar_licitacao_async(lic, session, automato_ouro, limitador, semaforo):
+    """Versão assíncrona de processar_licitacao: mesmos filtros, itens buscados sob o limitador global."""
+    try:
+        with METRICAS.etapa('filtro'):
+            veto, precisa_checar_itens = triar_licitacao(lic)
+        if veto: return (veto, None)
+        rejeicao = rejeicao_conhecida(lic)
+        if rejeicao: return (rejeicao, None)
+
+        edit = f"{lic.get('numeroCompra')}/{lic.get('anoCompra')}"
+        with METRICAS.etapa('itens'): # Inclui a espera por ficha e vaga: é o tempo que o edital passou nesta fase
+            itens_brutos, erro_api = await buscar_todos_os_itens_async(lic['orgaoEntidade']['cnpj'], lic['anoCompra'], lic['sequencialCompra'], session, limitador, semaforo)
+        if erro_api: return ('ERRO_API', f"{edit} -> {erro_api}")
+
+        with METRICAS.etapa('filtro'):
+            status, resultado = avaliar_itens(lic, itens_brutos, precisa_checar_itens, automato_ouro)
+        lembrar_rejeicao(lic, itens_brutos, status)
+        return status, resultado
+    except Exception: return ('ERRO_API', "Falha Interna")
+
+def buscar_pagina_listagem(dia_api, pagina, session):
+    """Uma página de editais (pregões) publicados no dia; [] quando acabou, None se a API recusou."""
+    with METRICAS.etapa('listagem'):
+        r = session.get(f"{PNCP_URL}/api/consulta/v1/contratacoes/publicacao", 
+                        params={'dataInicial': dia_api, 'dataFinal': dia_api, 'codigoModalidadeContratacao': 6, 'pagina': pagina, 'tamanhoPagina': 50})
+    if r.status_code == 204: return [] # Dia sem publicações
+    if r.status_code != 200: return None
+    return r.json().get('data', [])
 
+def registrar_resultado(banco, stats, status, resultado):
+    stats[status] += 1
+    if status == 'CAPTURADO':
+        # Detetor de Alteração de Data (uma leitura por id: no backend sqlite é consulta pela chave primária)
+        anterior = banco.get(resultado['id'])
+        if anterior is not None:
+            antiga = anterior.get('dt_enc')
+            if antiga and resultado['dt_enc'] and antiga != resultado['dt_enc']:
+                resultado['alerta_data'] = True
+                resultado['dt_enc_antiga'] = antiga
+        if anterior != resultado:
+            ALTERADOS.add(resultado['id'])
+        banco[resultado['id']] = resultado
+
+# --- CHECKPOINT POR DIA ---
+def dias_do_intervalo(inicio, fim):
+    d0 = date.fromisoformat(inicio)
+    d1 = date.fromisoformat(fim)
+    return [(d0 + timedelta(days=i)).isoformat() for i in range((d1 - d0).days + 1)]
+
+def carregar_checkpoint():
+    if not os.path.exists(ARQ_CHECKPOINT): return {}
     try:
-        import argparse
-        parser = argparse.ArgumentParser()
-        parser.add_argument('--start', type=str); parser.add_argument('--end', type=str)
-        args = parser.parse_args()
-        
-        data_alvo = args.start if args.start else date.today().strftime('%Y-%m-%d')
-        log_mensagem(f"🚀 Sniper Iniciado: {data_alvo}")
-        
-        with open(ARQ_DICIONARIO, 'r', encoding='utf-8') as f:
-            termos_ouro = [normalize(t) for t in json.load(f)]
-
-        session = criar_sessao()
-        banco = {}
-        if os.path.exists(ARQDADOS):
-            with gzip.open(ARQDADOS, 'rt', encoding='utf-8') as f:
-                for x in json.load(f): banco[x['id']] = x
-
-        dia_api = data_alvo.replace('-', '')
-        pagina = 1
-        stats = {'CAPTURADO': 0, 'VETO_GEO': 0, 'VETO_TITULO': 0, 'VETO_DICIONARIO': 0, 'FORA_TEMATICA': 0, 'ERRO_API': 0}
-        
-        while True:
-            r = session.get(f"https://pncp.gov.br/api/consulta/v1/contratacoes/publicacao", 
-                            params={'dataInicial': dia_api, 'dataFinal': dia_api, 'codigoModalidadeContratacao': 6, 'pagina': pagina, 'tamanhoPagina': 50})
-            if r.status_code != 200: break
-            lics = r.json().get('data', [])
+        with open(ARQ_CHECKPOINT, 'r', encoding='utf-8') as f:
+            return json.load(f).get('dias_concluidos', {})
+    except Exception: return {}
+
+def salvar_checkpoint(concluidos):
+    tmp = ARQ_CHECKPOINT + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'dias_concluidos': dict(sorted(concluidos.items()))}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, ARQ_CHECKPOINT)
+
+def dia_ja_concluido(concluidos, dia):
+    """Um dia só está fechado se foi varrido inteiro DEPOIS de terminar (senão ainda podem surgir publicações)."""
+    quando = concluidos.get(dia)
+    return bool(quando) and quando[:10] > dia
+
+def produzir_listagem(dia, session, fila, controle, parar):
+    """Produtor: busca as páginas da listagem à frente dos workers e empurra os editais na fila limitada."""
+    dia_api = dia.replace('-', '')
+    pagina = 1
+    try:
+        while not parar.is_set():
+            lics = buscar_pagina_listagem(dia_api, pagina, session)
+            if lics is None:
+                log_mensagem(f"❌ {dia}: listagem recusada na pag {pagina}.")
+                return
             if not lics: break
-            
-            log_mensagem(f"📄 Pag {pagina}: Analisando {len(lics)} editais...")
-            
-            with concurrent.futures.ThreadPoolExecutor(max_workers=MAXWORKERS) as exe:
-                futuros = {exe.submit(processar_licitacao, l, session, termos_ouro): l for l in lics}
-                for f in concurrent.futures.as_completed(futuros):
-                    status, resultado = f.result()
-                    stats[status] += 1
-                    
-                    if status == 'CAPTURADO':
-                        # Detetor de Alteração de Data
-                        if resultado['id'] in banco:
-                            antiga = banco[resultado['id']].get('dt_enc')
-                            if antiga and resultado['dt_enc'] and antiga != resultado['dt_enc']:
-                                resultado['alerta_data'] = True
-                                resultado['dt_enc_antiga'] = antiga
-                        banco[resultado['id']] = resultado
+
+            log_mensagem(f"📄 {dia} Pag {pagina}: {len(lics)} editais na fila (profundidade atual: {fila.qsize()})")
+            for l in lics:
+                if parar.is_set(): return
+                fila.put(l) # Bloqueia se a fila estiver cheia (prefetch limitado)
 
             if len(lics) < 50: break
             pagina += 1
+        controle['listagem_ok'] = True
+    except Exception as e:
+        log_mensagem(f"❌ {dia}: falha na listagem (pag {pagina}): {str(e)[:80]}")
+    finally:
+        if not parar.is_set():
+            for _ in range(MAXWORKERS): fila.put(None)
+
+def consumir_editais(fila, session, automato_ouro, banco, stats, metricas, lock, parar):
+    """Consumidor de vida longa: processa editais conforme chegam, sem esperar a página inteira."""
+    while True:
+        ini_espera = time.monotonic()
+        profundidade = fila.qsize()
+        lic = fila.get()
+        espera = time.monotonic() - ini_espera
+        if lic is None or parar.is_set(): break
+
+        with lock: inalterado = edital_inalterado(banco, lic)
+        if inalterado: status, resultado = 'INALTERADO', None
+        else: status, resultado = processar_licitacao(lic, session, automato_ouro)
+        with lock:
+            if parar.is_set(): break # Interrompido durante a requisição: o banco já está sendo gravado
+            metricas['ocioso'] += espera
+            metricas['amostras'] += 1
+            metricas['soma_fila'] += profundidade
+            metricas['fila_max'] = max(metricas['fila_max'], profundidade)
+            if status == 'ERRO_API': metricas['erros_api'] += 1
+            registrar_resultado(banco, stats, status, resultado)
+
+def capturar_dia(dia, session, automato_ouro, banco, stats):
+    """Modo threads: varre um dia; retorna True se ele pode ser marcado como concluído (dia_fechado)."""
+    fila = queue.Queue(maxsize=TAMANHO_FILA)
+    lock = threading.Lock()
+    metricas = {'ocioso': 0.0, 'amostras': 0, 'soma_fila': 0, 'fila_max': 0, 'erros_api': 0}
+    controle = {'listagem_ok': False}
+    parar = threading.Event()
+    inicio = time.monotonic()
+
+    produtor = threading.Thread(target=produzir_listagem, args=(dia, session, fila, controle, parar), daemon=True)
+    produtor.start()
+    exe = concurrent.futures.ThreadPoolExecutor(max_workers=MAXWORKERS)
+    try:
+        consumidores = [exe.submit(consumir_editais, fila, session, automato_ouro, banco, stats, metricas, lock, parar) for _ in range(MAXWORKERS)]
+        for c in consumidores: c.result()
+    except KeyboardInterrupt:
+        # Não espera a fila do dia: produtor e consumidores param no próximo edital, e quem ainda está numa
+        # requisição não registra mais nada (o evento é ligado sob o lock antes de o banco ser gravado)
+        with lock: parar.set()
+        try: # Esvazia a fila (solta o produtor bloqueado no put) e acorda com sentinelas quem espera no get
+            while True: fila.get_nowait()
+        except queue.Empty: pass
+        try:
+            for _ in range(MAXWORKERS): fila.put_nowait(None)
+        except queue.Full: pass
+        exe.shutdown(wait=False, cancel_futures=True)
+        raise
+    exe.shutdown()
+    produtor.join()
+
+    duracao = max(time.monotonic() - inicio, 1e-9)
+    media_fila = metricas['soma_fila'] / max(metricas['amostras'], 1)
+    pct_ocioso = 100 * metricas['ocioso'] / (duracao * MAXWORKERS)
+    log_mensagem(f"📦 {dia} Fila: profundidade média {media_fila:.1f} (máx {metricas['fila_max']}) | "
+                 f"ociosidade dos workers: {metricas['ocioso']:.0f}s ({pct_ocioso:.0f}% do tempo) | concorrência {CONTROLE.vagas}")
+    return dia_fechado(dia, controle['listagem_ok'], metricas['erros_api'])
+
+def dia_fechado(dia, listagem_ok, erros_api):
+    """Só vai para o checkpoint o dia com a listagem inteira e nenhum edital em ERRO_API; senão a próxima execução
+    revarre o dia (quem já está no banco sem mudança ou no índice de rejeitados não custa requisição de itens)."""
+    if listagem_ok and erros_api:
+        log_mensagem(f"🔁 {dia}: {erros_api} editais com ERRO_API; o dia fica aberto para a próxima execução.")
+    return listagem_ok and not erros_api
+
+async def capturar_dia_async(dia, automato_ouro, banco, stats, recursos):
+    """Modo assíncrono: varre um dia sob o limitador e o semáforo compartilhados por todos os dias do intervalo.
+    Retorna True se ele pode ser marcado como concluído (dia_fechado)."""
+    session, limitador, semaforo = recursos['session'], recursos['limitador'], recursos['semaforo']
+    dia_api = dia.replace('-', '')
+    erros_api = 0
+
+    async def tratar(lic):
+        nonlocal erros_api
+        if edital_inalterado(banco, lic): status, resultado = 'INALTERADO', None # Uma requisição de listagem, nenhuma de itens
+        else: status, resultado = await processar_licitacao_async(lic, session, automato_ouro, limitador, semaforo)
+        if status == 'ERRO_API': erros_api += 1
+        registrar_resultado(banco, stats, status, resultado)
+
+    tarefas = []
+    pagina = 1
+    listagem_ok = False
+    while True:
+        await limitador.aguardar_async()
+        try:
+            async with semaforo:
+                lics = await asyncio.to_thread(buscar_pagina_listagem, dia_api, pagina, session)
+        except Exception as e:
+            log_mensagem(f"❌ {dia}: falha na listagem (pag {pagina}): {str(e)[:80]}")
+            break
+        if lics is None:
+            log_mensagem(f"❌ {dia}: listagem recusada na pag {pagina}.")
+            break
+        if not lics:
+            listagem_ok = True
+            break
+
+        log_mensagem(f"📄 {dia} Pag {pagina}: {len(lics)} editais enfileirados...")
+        tarefas.extend(asyncio.create_task(tratar(l)) for l in lics)
+
+        if len(lics) < 50:
+            listagem_ok = True
+            break
+        pagina += 1
+
+    await asyncio.gather(*tarefas)
+    return dia_fechado(dia, listagem_ok, erros_api)
+
+async def capturar_intervalo_async(dias, automato_ouro, banco, stats, concluidos, taxa, rajada, concorrencia_max, dias_paralelos):
+    """Vários dias ao mesmo tempo, todos dividindo um único orçamento (req/s + rajada) e o controle de concorrência
+    (até `concorrencia_max` requisições em voo)."""
+    recursos = {
+        'session': criar_sessao(conexoes=concorrencia_max, controle=CONTROLE),
+        'limitador': LimitadorTaxa(taxa, rajada),
+        'semaforo': asyncio.Semaphore(concorrencia_max),
+    }
+    # O requests é bloqueante: as chamadas rodam num pool do tamanho do teto (o controle segura o excedente)
+    asyncio.get_running_loop().set_default_executor(concurrent.futures.ThreadPoolExecutor(max_workers=concorrencia_max))
+    vagas_dias = asyncio.Semaphore(dias_paralelos)
+    log_mensagem(f"⚙️ Orçamento compartilhado: {taxa:g} req/s, rajada {rajada}, {CONTROLE.vagas} em voo (adaptativo até {concorrencia_max}), "
+                 f"{dias_paralelos} dias em paralelo")
+
+    async def rodar_dia(dia):
+        async with vagas_dias:
+            if await capturar_dia_async(dia, automato_ouro, banco, stats, recursos):
+                concluidos[dia] = datetime.now().isoformat(timespec='seconds')
+                log_mensagem(f"🗓️ Dia {dia} concluído. (concorrência {CONTROLE.vagas})")
+
+    await asyncio.gather(*(rodar_dia(d) for d in dias))
+    log_mensagem(f"⏱️ Espera acumulada no limitador (soma das tarefas): {recursos['limitador'].total_espera:.0f}s")
+
+def interromper(signum, frame):
+    # SIGTERM (timeout/cancelamento do Actions) vira KeyboardInterrupt para salvar o progresso
+    raise KeyboardInterrupt
+
+def criar_parser(parser=None):
+    import argparse
+    parser = parser or argparse.ArgumentParser()
+    parser.add_argument('--start', type=str); parser.add_argument('--end', type=str)
+    parser.add_argument('--mode', choices=['threads', 'async'], default='threads')
+    parser.add_argument('--rps', type=float, default=4.0, help="Requisições/s permitidas no modo async")
+    parser.add_argument('--burst', type=int, default=4, help="Rajada máxima do limitador no modo async")
+    parser.add_argument('--concurrency', type=int, help="Requisições simultâneas iniciais (o controle adaptativo ajusta)")
+    parser.add_argument('--max-concurrency', type=int, default=MAXWORKERS, help="Teto do controle adaptativo de concorrência")
+    parser.add_argument('--parallel-days', type=int, default=3, help="Dias do intervalo varridos ao mesmo tempo no modo async")
+    parser.add_argument('--force', action='store_true', help="Revarre dias já concluídos no checkpoint")
+    parser.add_argument('--refetch-items', action='store_true', help="Busca os itens também dos editais que não mudaram na listagem")
+    return parser
+
+def dias_pendentes(args):
+    """(início, fim, checkpoint carregado, dias do intervalo que ainda precisam ser varridos)."""
+    data_ini = args.start if args.start else date.today().strftime('%Y-%m-%d')
+    data_fim = args.end if args.end else data_ini
+    concluidos = carregar_checkpoint()
+    dias = [d for d in dias_do_intervalo(data_ini, data_fim) if args.force or not dia_ja_concluido(concluidos, d)]
+    return data_ini, data_fim, concluidos, dias
+
+def executar_captura(args, dias, banco, concluidos):
+    """Varre `dias` sobre `banco` (alterações marcadas em ALTERADOS; nada é gravado aqui) e marca os dias concluídos.
+    Devolve (stats, interrompido)."""
+    global CONTROLE, MAXWORKERS, REBUSCAR_ITENS, REJEITADOS
+    REBUSCAR_ITENS = args.refetch_items
+    inicial = args.concurrency or (8 if args.mode == 'async' else CONCORRENCIA_INICIAL)
+    CONTROLE = ControleConcorrencia(inicial, maximo=args.max_concurrency, log=log_mensagem)
+    MAXWORKERS = CONTROLE.maximo
+
+    with open(ARQ_DICIONARIO, 'r', encoding='utf-8') as f:
+        termos_ouro = [normalize(t) for t in json.load(f)]
+    automato_ouro = AutomatoTermos(termos_ouro)
+    REJEITADOS = IndiceRejeitados(assinatura_filtros(termos_ouro))
+    log_mensagem(f"🚫 Índice de editais rejeitados pelos itens: {REJEITADOS.situacao}")
+
+    stats = {'CAPTURADO': 0, 'INALTERADO': 0, 'VETO_GEO': 0, 'VETO_TITULO': 0, 'VETO_DICIONARIO': 0, 'FORA_TEMATICA': 0, 'ERRO_API': 0}
+    try:
+        if args.mode == 'async':
+            asyncio.run(capturar_intervalo_async(dias, automato_ouro, banco, stats, concluidos, args.rps, args.burst, CONTROLE.maximo, args.parallel_days))
+        else:
+            session = criar_sessao(conexoes=MAXWORKERS, controle=CONTROLE)
+            for dia in dias:
+                if capturar_dia(dia, session, automato_ouro, banco, stats):
+                    concluidos[dia] = datetime.now().isoformat(timespec='seconds')
+                    log_mensagem(f"🗓️ Dia {dia} concluído.")
+    except KeyboardInterrupt:
+        log_mensagem("⚠️ Interrompido: salvando o que já foi capturado e os dias concluídos...")
+        return stats, True
+    return stats, False
+
+def contadores_triagem():
+    """{categoria: {termo: objetos}} da triagem, do termo mais acionado para o menos (vai para o metricas_captura.json)."""
+    contadores = {}
+    for (categoria, termo), n in CONTADOR_TRIAGEM.most_common():
+        contadores.setdefault(categoria, {})[termo] = n
+    return contadores
+
+def mostrar_vetos_triagem():
+    contadores = contadores_triagem()
+    if contadores.get('VETO'):
+        top = ', '.join(f"{t} ({n})" for t, n in list(contadores['VETO'].items())[:10])
+        log_mensagem(f"🛑 Vetos de objeto mais acionados: {top}")
+
+def resumir_captura(stats, inicio):
+    log_mensagem(f"✅ Finalizado: {stats['CAPTURADO']} capturados de {sum(stats.values())} analisados em {time.time() - inicio:.0f}s.")
+    if stats.get('INALTERADO'):
+        log_mensagem(f"♻️ {stats['INALTERADO']} editais já no banco sem mudança na listagem (dataAtualizacao + hash): itens não rebuscados.")
+    if CONTADOR_TERMOS:
+        top = ', '.join(f"{t} ({n})" for t, n in CONTADOR_TERMOS.most_common(10))
+        log_mensagem(f"🎯 Termos do dicionário mais encontrados: {top}")
+    if CONTADOR_REGRAS:
+        top = ', '.join(f"{t} ({n})" for t, n in CONTADOR_REGRAS.most_common(10))
+        log_mensagem(f"🧤 Regras de material mais acionadas: {top}")
+    mostrar_vetos_triagem()
+    log_mensagem(f"🚦 Controle de concorrência: {CONTROLE.resumo()}")
+    if obter_cache():
+        log_mensagem(f"🗃️ Cache HTTP: {obter_cache().resumo()}")
+    if REJEITADOS is not None:
+        log_mensagem(f"🚫 Índice de rejeitados: {REJEITADOS.resumo()}")
+    for linha in METRICAS.linhas(): log_mensagem(linha)
+
+def salvar_rejeitados():
+    if REJEITADOS is not None: REJEITADOS.salvar()
+
+def salvar_metricas(stats, script='app.py', **extras):
+    """metricas_captura.json: endpoints e etapas (METRICAS) + desfecho dos editais, controle e cache."""
+    cache = obter_cache()
+    METRICAS.salvar(ARQ_METRICAS, script, editais=stats, alterados=len(ALTERADOS),
+                    concorrencia={k: round(v, 1) for k, v in CONTROLE.stats.items()},
+                    cache_http=dict(cache.stats) if cache else None,
+                    rejeitados=dict(REJEITADOS.stats, total=len(REJEITADOS)) if REJEITADOS is not None else None,
+                    triagem=contadores_triagem(), **extras)
+    log_mensagem(f"📈 Métricas da execução em {ARQ_METRICAS}")
+
+if __name__ == '__main__':
+    if os.path.exists(ARQ_LOCK): sys.exit(0)
+    with open(ARQ_LOCK, 'w') as f: f.write("lock")
+
+    try:
+        args = criar_parser().parse_args()
+        data_ini, data_fim, concluidos, dias = dias_pendentes(args)
+        log_mensagem(f"🚀 Sniper Iniciado: {data_ini} a {data_fim} (modo {args.mode}) | {len(dias)} dias a varrer")
+        if not dias: sys.exit(0)
+        signal.signal(signal.SIGTERM, interromper)
+
+        # O banco é lido UMA vez para o intervalo inteiro; no fim só o que mudou é acrescentado
+        banco = carregar_banco()
+        inicio = time.time()
+        stats, _ = executar_captura(args, dias, banco, concluidos)
 
-        with gzip.open(ARQDADOS, 'wt', encoding='utf-8') as f:
-            json.dump(list(banco.values()), f, ensure_ascii=False)
-            
-        log_mensagem(f"✅ Finalizado: {stats['CAPTURADO']} capturados de {sum(stats.values())} analisados.")
+        with METRICAS.etapa('persistencia'):
+            gravados = gravar_alteracoes([banco[i] for i in ALTERADOS])
+            # Checkpoint só depois do banco: um dia marcado como concluído está sempre no disco
+            salvar_checkpoint(concluidos)
+            salvar_rejeitados()
+        log_mensagem(f"💾 {gravados} editais novos/alterados acrescentados ao banco.")
+        resumir_captura(stats, inicio)
+        salvar_metricas(stats, argumentos=vars(args))
 
     finally:
         if os.path.exists(ARQ_LOCK): os.remove(ARQ_LOCK)
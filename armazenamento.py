@@ -0,0 +1,338 @@
+import json
+import gzip
+import os
+import sys
+import logging
+import tempfile
+import threading
+
+# --- ARQUIVOS DO BANCO ---
+# Snapshot compactado + log de alterações só-de-acréscimo. Formato do snapshot: 'json' (array, o que o
+# index.html lê sem o exportar.py) ou 'ndjson' (um edital por linha, lido e gravado em fluxo)
+FORMATO = os.environ.get('SNIPER_FORMATO', 'json')
+ARQ_SNAPSHOT_JSON = 'pregacoes_pharma_limpos.json.gz'
+ARQ_SNAPSHOT_NDJSON = 'pregacoes_pharma_limpos.ndjson.gz'
+ARQ_SNAPSHOT = ARQ_SNAPSHOT_NDJSON if FORMATO == 'ndjson' else ARQ_SNAPSHOT_JSON
+ARQ_DELTA = 'pregacoes_pharma_limpos.delta.jsonl'
+ARQ_INDICE = 'pregacoes_pharma_limpos.delta.idx.json'
+
+# Compacta quando o log passa de 20% do snapshot (mínimo de 500 registros)
+FRACAO_COMPACTACAO = 0.2
+MINIMO_COMPACTACAO = 500
+
+# Backend opcional de consulta: 'json' (padrão) ou 'sqlite' (tabelas editais/itens indexadas).
+# Em qualquer caso snapshot + log continuam sendo o artefato publicado que o index.html lê.
+BACKEND = os.environ.get('SNIPER_BACKEND', 'json')
+_BANCO_SQLITE = None
+
+def _gravar_atomico(caminho, escrever):
+    """Escreve num temporário e troca de uma vez: quem lê nunca vê arquivo pela metade."""
+    tmp = caminho + '.tmp'
+    escrever(tmp)
+    os.replace(tmp, caminho)
+
+def _iterar_array_json(f, bloco=1 << 16):
+    """Objetos de um array JSON lidos um a um (raw_decode sobre um buffer), sem carregar o array inteiro."""
+    decodificador = json.JSONDecoder()
+    buffer = ''
+    while '[' not in buffer:
+        mais = f.read(bloco)
+        if not mais: return
+        buffer = mais.lstrip()
+    pos = buffer.find('[') + 1
+    fim_arquivo = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,': pos += 1
+        if pos < len(buffer) and buffer[pos] == ']': return
+        try:
+            obj, fim = decodificador.raw_decode(buffer, pos)
+        except ValueError:
+            if fim_arquivo: raise
+            mais = f.read(bloco)
+            fim_arquivo = not mais
+            buffer = buffer[pos:] + mais
+            pos = 0
+            continue
+        yield obj
+        pos = fim
+        if len(buffer) - pos < bloco // 2 and not fim_arquivo:
+            mais = f.read(bloco)
+            fim_arquivo = not mais
+            buffer = buffer[pos:] + mais
+            pos = 0
+
+def ler_registros(arquivo):
+    """Iterador de editais de um snapshot, em qualquer dos dois formatos (pela extensão), sem carregá-lo inteiro."""
+    if not os.path.exists(arquivo): return
+    with gzip.open(arquivo, 'rt', encoding='utf-8') as f:
+        if arquivo.endswith('.ndjson.gz'):
+            for linha in f:
+                if linha.strip(): yield json.loads(linha)
+        else:
+            yield from _iterar_array_json(f)
+
+def gravar_registros(arquivo, registros):
+    """Grava um iterável de editais no formato da extensão, em fluxo e por troca atômica. Devolve quantos gravou.
+    O array sai byte a byte igual ao json.dump(lista) de antes."""
+    total = 0
+    def escrever(tmp):
+        nonlocal total
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            ndjson = arquivo.endswith('.ndjson.gz')
+            if not ndjson: f.write('[')
+            for r in registros:
+                if ndjson: f.write(json.dumps(r, ensure_ascii=False) + '\n')
+                else: f.write((', ' if total else '') + json.dumps(r, ensure_ascii=False))
+                total += 1
+            if not ndjson: f.write(']')
+    _gravar_atomico(arquivo, escrever)
+    return total
+
+def converter(origem, destino):
+    """Converte o snapshot entre array JSON e NDJSON (ex.: .json.gz -> .ndjson.gz) sem carregar tudo."""
+    return gravar_registros(destino, ler_registros(origem))
+
+def ler_snapshot(arq_snapshot=ARQ_SNAPSHOT):
+    return list(ler_registros(arq_snapshot))
+
+def _varrer_delta(arq_delta=ARQ_DELTA):
+    """Gera (offset, entrada) de cada linha íntegra do log; uma última linha truncada (queda no meio da escrita) é ignorada."""
+    if not os.path.exists(arq_delta): return
+    with open(arq_delta, 'rb') as f:
+        offset = 0
+        for linha in f:
+            if linha.endswith(b'\n'):
+                try:
+                    yield offset, json.loads(linha)
+                except ValueError:
+                    pass
+            offset += len(linha)
+
+def carregar_indice(arq_delta=ARQ_DELTA, arq_indice=ARQ_INDICE):
+    """Índice id -> offset da versão mais recente no log. Reconstruído se não bater com o tamanho atual do log."""
+    tamanho = os.path.getsize(arq_delta) if os.path.exists(arq_delta) else 0
+    if os.path.exists(arq_indice):
+        try:
+            with open(arq_indice, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+            if dados.get('tamanho') == tamanho:
+                return dados['offsets']
+        except Exception: pass
+    offsets = {entrada['id']: off for off, entrada in _varrer_delta(arq_delta)}
+    _salvar_indice(offsets, tamanho, arq_indice)
+    return offsets
+
+def _salvar_indice(offsets, tamanho, arq_indice=ARQ_INDICE, registros_snapshot=None):
+    if registros_snapshot is None: registros_snapshot = _registros_snapshot(arq_indice)
+    def escrever(tmp):
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'tamanho': tamanho, 'registros_snapshot': registros_snapshot, 'offsets': offsets}, f)
+    _gravar_atomico(arq_indice, escrever)
+
+def _registros_snapshot(arq_indice=ARQ_INDICE):
+    """Quantas licitações o snapshot tinha na última compactação (evita abrir o .gz só para contar)."""
+    try:
+        with open(arq_indice, 'r', encoding='utf-8') as f:
+            return json.load(f).get('registros_snapshot')
+    except Exception: return None
+
+def _carregar_banco_json(arq_snapshot=ARQ_SNAPSHOT, arq_delta=ARQ_DELTA):
+    banco = {x['id']: x for x in ler_registros(arq_snapshot) if x.get('id')}
+    for _, entrada in _varrer_delta(arq_delta):
+        if entrada.get('del'): banco.pop(entrada['id'], None)
+        else: banco[entrada['id']] = entrada['rec']
+    return banco
+
+def carregar_banco(arq_snapshot=ARQ_SNAPSHOT, arq_delta=ARQ_DELTA):
+    """Visão consolidada: snapshot + alterações do log aplicadas em ordem. Retorna {id: licitação}
+    (no backend sqlite, um BancoSQLite que responde como dicionário sem carregar tudo)."""
+    if BACKEND == 'sqlite': return abrir_sqlite()
+    return _carregar_banco_json(arq_snapshot, arq_delta)
+
+def iterar_banco(arq_snapshot=ARQ_SNAPSHOT, arq_delta=ARQ_DELTA, arq_indice=ARQ_INDICE):
+    """Mesma visão do carregar_banco, um edital por vez: na memória ficam só o índice do log e os ids do snapshot.
+    A versão mais nova de quem está no log é lida direto do offset; a ordem é a do dicionário consolidado."""
+    if BACKEND == 'sqlite':
+        yield from abrir_sqlite().registros()
+        return
+    offsets = carregar_indice(arq_delta, arq_indice)
+    vistos = set()
+    delta = open(arq_delta, 'rb') if offsets else None
+    def ultima_versao(id_lic):
+        delta.seek(offsets[id_lic])
+        entrada = json.loads(delta.readline())
+        return None if entrada.get('del') else entrada['rec']
+
+    try:
+        for rec in ler_registros(arq_snapshot):
+            id_lic = rec.get('id')
+            if not id_lic or id_lic in vistos: continue
+            vistos.add(id_lic)
+            if id_lic in offsets: rec = ultima_versao(id_lic)
+            if rec is not None: yield rec
+        for id_lic in offsets:
+            if id_lic in vistos: continue
+            rec = ultima_versao(id_lic)
+            if rec is not None: yield rec
+    finally:
+        if delta: delta.close()
+
+def _pendente(lic):
+    return any(it.get('sit', 'EM ANDAMENTO') == "EM ANDAMENTO" for it in lic.get('itens', []))
+
+class Pendentes:
+    """Licitações com algum item ainda EM ANDAMENTO, sem mantê-las na memória.
+
+    `chaves` guarda só {'id', 'dt_enc'} (o que a agenda precisa para priorizar); o edital completo é lido por
+    `ler(id)` quando a auditoria dele roda. No JSON, uma passada em fluxo pelo banco copia os pendentes para um
+    NDJSON temporário (sem gzip, acesso direto pelo offset); no sqlite, é a consulta pela chave primária.
+    """
+
+    def __init__(self):
+        self.chaves = []
+        self.lock = threading.Lock()
+        if BACKEND == 'sqlite':
+            self.banco = abrir_sqlite()
+            self.chaves = [{'id': i, 'dt_enc': self.banco.dt_enc(i)} for i in self.banco.ids_pendentes()]
+            return
+        self.banco = None
+        self.offsets = {}
+        self.arquivo = tempfile.TemporaryFile()
+        for lic in iterar_banco():
+            if not _pendente(lic): continue
+            self.offsets[lic['id']] = self.arquivo.tell()
+            self.arquivo.write((json.dumps(lic, ensure_ascii=False) + '\n').encode('utf-8'))
+            self.chaves.append({'id': lic['id'], 'dt_enc': lic.get('dt_enc')})
+        self.arquivo.flush()
+
+    def __len__(self):
+        return len(self.chaves)
+
+    def ler(self, id_lic):
+        if self.banco is not None: return self.banco[id_lic]
+        with self.lock:
+            self.arquivo.seek(self.offsets[id_lic])
+            return json.loads(self.arquivo.readline())
+
+    def fechar(self):
+        if self.banco is None: self.arquivo.close()
+
+def carregar_pendentes():
+    """Pendentes de auditoria (consulta indexada no backend sqlite; em fluxo no JSON): só chaves na memória."""
+    return Pendentes()
+
+# --- BACKEND SQLITE ---
+def _assinatura(arq_snapshot=ARQ_SNAPSHOT, arq_delta=ARQ_DELTA):
+    """Tamanho + mtime (ns) do snapshot e do log: se mudaram por fora (outro workflow, git pull), o SQLite está defasado.
+    Só o tamanho não basta: um snapshot recompactado ou um log reescrito podem voltar com o mesmo número de bytes."""
+    def marca(a):
+        if not os.path.exists(a): return "0"
+        st = os.stat(a)
+        return f"{st.st_size}.{st.st_mtime_ns}"
+    return f"{marca(arq_snapshot)}:{marca(arq_delta)}"
+
+def abrir_sqlite(forcar_importacao=False):
+    """Abre o SQLite e o ressincroniza a partir do snapshot + log quando estiver ausente ou defasado."""
+    global _BANCO_SQLITE
+    from banco_sqlite import BancoSQLite
+    if _BANCO_SQLITE is None: _BANCO_SQLITE = BancoSQLite()
+    banco = _BANCO_SQLITE
+    if forcar_importacao or banco.meta('assinatura') != _assinatura():
+        registros = list(_carregar_banco_json().values())
+        banco.limpar()
+        banco.gravar(registros)
+        banco.meta('assinatura', _assinatura())
+        logging.info(f"🗄️ SQLite sincronizado com o snapshot + log ({len(registros)} licitações).")
+    return banco
+
+def exportar_sqlite(banco, arq_snapshot=ARQ_SNAPSHOT):
+    """Gera o snapshot a partir das tabelas do SQLite."""
+    return gravar_registros(arq_snapshot, banco.registros())
+
+def ler_registro(id_lic, arq_snapshot=ARQ_SNAPSHOT, arq_delta=ARQ_DELTA, arq_indice=ARQ_INDICE):
+    """Busca um único edital: pelo índice vai direto ao offset no log; só cai no snapshot se não estiver lá."""
+    offsets = carregar_indice(arq_delta, arq_indice)
+    if id_lic in offsets:
+        with open(arq_delta, 'rb') as f:
+            f.seek(offsets[id_lic])
+            entrada = json.loads(f.readline())
+        return None if entrada.get('del') else entrada['rec']
+    return next((x for x in ler_registros(arq_snapshot) if x.get('id') == id_lic), None)
+
+def _anexar(entradas, arq_delta, arq_indice):
+    if not entradas: return 0
+    offsets = carregar_indice(arq_delta, arq_indice)
+    with open(arq_delta, 'ab') as f:
+        # Se a última escrita caiu no meio de uma linha, descarta o pedaço antes de anexar
+        tamanho = f.seek(0, os.SEEK_END)
+        if tamanho:
+            with open(arq_delta, 'rb') as r:
+                r.seek(tamanho - 1)
+                if r.read(1) != b'\n':
+                    r.seek(0)
+                    bom = r.read().rfind(b'\n') + 1
+                    f.truncate(bom)
+                    tamanho = f.seek(0, os.SEEK_END)
+        for entrada in entradas:
+            linha = (json.dumps(entrada, ensure_ascii=False) + '\n').encode('utf-8')
+            offsets[entrada['id']] = tamanho
+            f.write(linha)
+            tamanho += len(linha)
+        f.flush()
+        os.fsync(f.fileno())
+    _salvar_indice(offsets, tamanho, arq_indice)
+    return len(entradas)
+
+def gravar_alteracoes(registros, arq_delta=ARQ_DELTA, arq_indice=ARQ_INDICE):
+    """Acrescenta ao log só os editais alterados/novos. Custo proporcional ao que mudou, não ao banco."""
+    gravados = _anexar([{'id': r['id'], 'rec': r} for r in registros], arq_delta, arq_indice)
+    if BACKEND == 'sqlite' and gravados:
+        banco = abrir_sqlite()
+        banco.gravar(registros)
+        banco.meta('assinatura', _assinatura(arq_delta=arq_delta))
+    return gravados
+
+def remover(ids, arq_delta=ARQ_DELTA, arq_indice=ARQ_INDICE):
+    removidos = _anexar([{'id': i, 'del': True} for i in ids], arq_delta, arq_indice)
+    if BACKEND == 'sqlite' and removidos:
+        banco = abrir_sqlite()
+        banco.apagar(ids)
+        banco.meta('assinatura', _assinatura(arq_delta=arq_delta))
+    return removidos
+
+def compactar(arq_snapshot=ARQ_SNAPSHOT, arq_delta=ARQ_DELTA, arq_indice=ARQ_INDICE, registros=None):
+    """Incorpora o log ao snapshot e zera o log. `registros`: a visão consolidada já em memória (pipeline),
+    gravada direto sem reler snapshot e log."""
+    if BACKEND == 'sqlite':
+        banco = abrir_sqlite()
+        total = exportar_sqlite(banco, arq_snapshot)
+    elif registros is not None:
+        total = gravar_registros(arq_snapshot, registros)
+    else:
+        # Em fluxo: o snapshot novo vai sendo escrito enquanto o antigo é lido (o antigo só é trocado no fim)
+        total = gravar_registros(arq_snapshot, iterar_banco(arq_snapshot, arq_delta, arq_indice))
+    # O snapshot novo já contém tudo: só então o log pode ser esvaziado
+    open(arq_delta, 'wb').close()
+    _salvar_indice({}, 0, arq_indice, registros_snapshot=total)
+    if BACKEND == 'sqlite': banco.meta('assinatura', _assinatura(arq_snapshot, arq_delta))
+    return total
+
+def compactar_se_necessario(arq_snapshot=ARQ_SNAPSHOT, arq_delta=ARQ_DELTA, arq_indice=ARQ_INDICE, registros=None):
+    entradas = len(carregar_indice(arq_delta, arq_indice))
+    if not entradas: return False
+    base = _registros_snapshot(arq_indice)
+    if base is None: base = sum(1 for _ in ler_registros(arq_snapshot))
+    if entradas < max(MINIMO_COMPACTACAO, FRACAO_COMPACTACAO * base): return False
+    total = compactar(arq_snapshot, arq_delta, arq_indice, registros)
+    logging.info(f"🗜️ Compactação: {entradas} alterações incorporadas ao snapshot ({total} licitações).")
+    return True
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+    if len(sys.argv) > 1 and sys.argv[1] == 'compactar':
+        logging.info(f"✅ Snapshot regravado com {compactar()} licitações.")
+    elif len(sys.argv) == 3 and sys.argv[1] == 'converter' and sys.argv[2] in ('json', 'ndjson'):
+        origem, destino = (ARQ_SNAPSHOT_JSON, ARQ_SNAPSHOT_NDJSON) if sys.argv[2] == 'ndjson' else (ARQ_SNAPSHOT_NDJSON, ARQ_SNAPSHOT_JSON)
+        logging.info(f"✅ {converter(origem, destino)} licitações convertidas de {origem} para {destino}.")
+    else:
+        print("Uso: python armazenamento.py compactar | converter json|ndjson")
@@ -1,30 +1,55 @@
 import requests
 import json
-import gzip
 import os
 import concurrent.futures
-from datetime import datetime
-from requests.adapters import HTTPAdapter
+import threading
+import time
+from datetime import datetime, timedelta
 from urllib3.util.retry import Retry
+from cache_http import criar_adaptador, obter_cache
+from controle_taxa import ControleConcorrencia
+from armazenamento import ARQ_SNAPSHOT, ARQ_DELTA, carregar_pendentes, gravar_alteracoes
+from metricas import METRICAS
+from registro import criar_log
 
 # --- CONFIGURAÇÕES ORIGINAIS ---
-ARQDADOS = 'pregacoes_pharma_limpos.json.gz'
 ARQ_LOG = 'log_atualizacao.txt'
-MAXWORKERS = 10
+ARQ_METRICAS = 'metricas_auditoria.json' # Requisições por endpoint, latências e etapas da rodada
+MAXWORKERS = 20 # Teto de threads; o controle adaptativo decide quantas requisições ficam em voo
+CONCORRENCIA_INICIAL = 10
+TAM_PAGINA_RESULTADOS = 50
+# Raiz da API do PNCP (SNIPER_PNCP_URL aponta para o mock_pncp.py nos benchmarks offline)
+PNCP_URL = os.environ.get('SNIPER_PNCP_URL', 'https://pncp.gov.br').rstrip('/')
 
-def criar_sessao():
+# --- AGENDA DE AUDITORIA ---
+ARQ_AGENDA = 'agenda_auditoria.json'
+LIMITE_POR_RODADA = 500 # Teto de editais por rodada (0 = só o orçamento de tempo manda)
+ORCAMENTO_MIN = 40 # Tempo de parede da rodada (o job do Actions tem timeout próprio)
+MARGEM_SEGUNDOS = 120 # Para de despachar antes do fim do orçamento para terminar com calma
+BACKOFF_BASE_H = 6 # Reagendamento após uma checagem com mudança
+BACKOFF_MAX_H = 14 * 24 # Teto do backoff exponencial para quem nunca muda
+
+# --- CHECKPOINT INCREMENTAL ---
+CHECKPOINT_EDITAIS = 25 # Descarrega o progresso a cada N editais auditados...
+CHECKPOINT_SEGUNDOS = 60 # ...ou a cada T segundos, o que vier primeiro
+
+# Requisições por edital: feitas x as que o modo item a item (1 por item pendente) teria feito
+CONTADOR_REQUISICOES = {'editais': 0, 'feitas': 0, 'item_a_item': 0, 'fallback': 0}
+LOCK_CONTADOR = threading.Lock()
+
+def criar_sessao(controle=None):
     s = requests.Session()
     s.headers.update({'Accept': 'application/json', 'User-Agent': 'Sniper Auditor/24.1'})
-    retry = Retry(total=5, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
-    s.mount('https://', HTTPAdapter(max_retries=retry))
+    # 429/403/5xx ficam com o controle de concorrência (pausa global + repetição); o urllib3 só repete falhas de conexão
+    # (nem 429/503 com Retry-After, que ele repetiria sozinho com respect_retry_after_header ligado)
+    retry = Retry(total=5, backoff_factor=0.3, status_forcelist=[], respect_retry_after_header=False)
+    adaptador = criar_adaptador(controle, max_retries=retry, pool_connections=MAXWORKERS, pool_maxsize=MAXWORKERS)
+    s.mount('https://', adaptador)
+    s.mount('http://', adaptador) # mock_pncp.py local
     return s
 
-def log_mensagem(msg):
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    linha = f"[{timestamp}] {msg}"
-    print(linha)
-    with open(ARQ_LOG, 'a', encoding='utf-8') as f:
-        f.write(linha + '\n')
+# Console + log_atualizacao.txt escritos por uma thread só, a partir de uma fila
+log_mensagem = criar_log(ARQ_LOG, '%Y-%m-%d %H:%M:%S')
 
 def buscar_status_global_pncp(lic_id, session):
     """Consulta a página principal do edital para ver se foi Anulado/Revogado/Suspenso"""
@@ -32,7 +57,7 @@ def buscar_status_global_pncp(lic_id, session):
         cnpj = lic_id[:14]
         ano = lic_id[14:18]
         seq = lic_id[18:]
-        url = f"https://pncp.gov.br/api/pncp/v1/orgaos/{cnpj}/compras/{ano}/{seq}"
+        url = f"{PNCP_URL}/api/pncp/v1/orgaos/{cnpj}/compras/{ano}/{seq}"
         
         r = session.get(url, timeout=15)
         if r.status_code == 200:
@@ -46,7 +71,7 @@ def buscar_resultado_no_pncp(lic_id, item_num, session):
         cnpj = lic_id[:14]
         ano = lic_id[14:18]
         seq = lic_id[18:]
-        url = f"https://pncp.gov.br/api/pncp/v1/orgaos/{cnpj}/compras/{ano}/{seq}/itens/{item_num}/resultados"
+        url = f"{PNCP_URL}/api/pncp/v1/orgaos/{cnpj}/compras/{ano}/{seq}/itens/{item_num}/resultados"
         
         r = session.get(url, timeout=15)
         if r.status_code == 200:
@@ -56,12 +81,55 @@ def buscar_resultado_no_pncp(lic_id, item_num, session):
     except: pass
     return None
 
+def buscar_resultados_compra(lic_id, session):
+    """Todos os resultados da compra de uma vez, paginando /resultados (mesma via do teste_espiao.buscar_todos_resultados).
+    Retorna ({numeroItem: resultado}, requisições feitas); o dicionário vem None se o endpoint falhar."""
+    cnpj = lic_id[:14]
+    ano = lic_id[14:18]
+    seq = lic_id[18:]
+    url = f"{PNCP_URL}/api/pncp/v1/orgaos/{cnpj}/compras/{ano}/{seq}/resultados"
+    resultados = {}
+    pag = 1
+    requisicoes = 0
+    while True:
+        try:
+            requisicoes += 1
+            r = session.get(url, params={'pagina': pag, 'tamanhoPagina': TAM_PAGINA_RESULTADOS}, timeout=15)
+            if r.status_code == 204: break # Compra ainda sem nenhum resultado
+            if r.status_code != 200: return None, requisicoes
+            dados = r.json()
+            lista = dados.get('data', []) if isinstance(dados, dict) else dados
+            if not lista: break
+            for res in lista:
+                try: num = int(res['numeroItem'])
+                except: continue
+                resultados.setdefault(num, res) # Mesmo critério do endpoint por item: o primeiro resultado
+            if len(lista) < TAM_PAGINA_RESULTADOS or pag >= 100: break
+            pag += 1
+        except Exception:
+            return None, requisicoes
+    return resultados, requisicoes
+
+def aplicar_resultado(it, resultado):
+    fornecedor = resultado.get('nomeRazaoSocialFornecedor') or resultado.get('razaoSocial')
+    ni = resultado.get('niFornecedor', '')
+    valor = float(resultado.get('valorUnitarioHomologado') or 0)
+    
+    if fornecedor:
+        it['res_forn'] = f"{fornecedor} ({ni})" if ni else fornecedor
+        it['res_val'] = valor
+        it['sit'] = "HOMOLOGADO"
+        return True
+    return False
+
 def auditoria_licitacao(lic, session):
     teve_mudanca = False
     lic_id = lic.get('id')
+    requisicoes = 1
     
     # 1️⃣ AUDITORIA GLOBAL: O Edital foi cancelado/anulado?
-    novo_status_global = buscar_status_global_pncp(lic_id, session)
+    with METRICAS.etapa('status_global'):
+        novo_status_global = buscar_status_global_pncp(lic_id, session)
     if novo_status_global:
         novo_status_upper = novo_status_global.upper()
         status_atual = lic.get('sit_global', '').upper()
@@ -71,61 +139,223 @@ def auditoria_licitacao(lic, session):
             lic['sit_global'] = novo_status_upper
             teve_mudanca = True
 
-    # 2️⃣ AUDITORIA DE ITENS: Quem ganhou o quê?
-    for it in lic.get('itens', []):
-        if it.get('sit', 'EM ANDAMENTO') == "EM ANDAMENTO":
-            resultado = buscar_resultado_no_pncp(lic_id, it.get('n'), session)
-            
-            if resultado:
-                fornecedor = resultado.get('nomeRazaoSocialFornecedor') or resultado.get('razaoSocial')
-                ni = resultado.get('niFornecedor', '')
-                valor = float(resultado.get('valorUnitarioHomologado') or 0)
-                
-                if fornecedor:
-                    it['res_forn'] = f"{fornecedor} ({ni})" if ni else fornecedor
-                    it['res_val'] = valor
-                    it['sit'] = "HOMOLOGADO"
-                    teve_mudanca = True
+    # 2️⃣ AUDITORIA DE ITENS: Quem ganhou o quê? (uma consulta por compra; item a item só se ela falhar)
+    pendentes = [it for it in lic.get('itens', []) if it.get('sit', 'EM ANDAMENTO') == "EM ANDAMENTO"]
+    with METRICAS.etapa('resultados'):
+        resultados, req_lote = buscar_resultados_compra(lic_id, session) if pendentes else ({}, 0)
+        requisicoes += req_lote
+
+        for it in pendentes:
+            if resultados is not None:
+                try: resultado = resultados.get(int(it.get('n')))
+                except (TypeError, ValueError): resultado = None
+            else:
+                resultado = buscar_resultado_no_pncp(lic_id, it.get('n'), session)
+                requisicoes += 1
+
+            if resultado and aplicar_resultado(it, resultado):
+                teve_mudanca = True
+
+    with LOCK_CONTADOR:
+        CONTADOR_REQUISICOES['editais'] += 1
+        CONTADOR_REQUISICOES['feitas'] += requisicoes
+        CONTADOR_REQUISICOES['item_a_item'] += 1 + len(pendentes) # O que o modo antigo teria gasto
+        if resultados is None: CONTADOR_REQUISICOES['fallback'] += 1
                     
     return teve_mudanca
 
+def auditar_pendente(pendentes, lic_id, session):
+    """Lê o edital completo só agora (worker) e o audita: (edital, mudou). Sem mudança, ele sai da memória aqui."""
+    lic = pendentes.ler(lic_id)
+    return lic, auditoria_licitacao(lic, session)
+
+def carregar_agenda():
+    """{id: {'ult': última checagem, 'prox': próxima checagem, 'sem_mudanca': checagens seguidas sem novidade}}"""
+    if not os.path.exists(ARQ_AGENDA): return {}
+    try:
+        with open(ARQ_AGENDA, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception: return {}
+
+def salvar_agenda(agenda, ids_vivos=None):
+    if ids_vivos is not None:
+        agenda = {k: v for k, v in agenda.items() if k in ids_vivos} # Homologados saem da agenda
+    tmp = ARQ_AGENDA + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(agenda, f, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp, ARQ_AGENDA)
+
+def _data(texto):
+    try: return datetime.fromisoformat(str(texto)[:19])
+    except (TypeError, ValueError): return None
+
+def prioridade(lic, estado, agora):
+    """Valor esperado de auditar agora: resultado costuma sair nas semanas seguintes ao encerramento."""
+    dt_enc = _data(lic.get('dt_enc'))
+    if dt_enc is None: valor = 0.5
+    else:
+        dias = (agora - dt_enc).total_seconds() / 86400
+        if dias < 0: valor = 0.1 # Ainda recebendo propostas: só mudança de status global é possível
+        elif dias <= 45: valor = 1.0
+        else: valor = 1.0 / (1 + (dias - 45) / 30) # Editais velhos rendem cada vez menos
+    ult = _data(estado.get('ult'))
+    if ult is None: return valor * 2 # Nunca auditado
+    horas = (agora - ult).total_seconds() / 3600
+    return valor * min(2.0, horas / 24) / (1 + estado.get('sem_mudanca', 0))
+
+def ordenar_por_prioridade(pendentes, agenda, agora):
+    """Só entra quem já venceu o 'prox'; ordem decrescente de valor esperado."""
+    vencidos = [l for l in pendentes if (_data(agenda.get(l['id'], {}).get('prox')) or agora) <= agora]
+    vencidos.sort(key=lambda l: prioridade(l, agenda.get(l['id'], {}), agora), reverse=True)
+    return vencidos
+
+def reagendar(estado, teve_mudanca, agora):
+    estado['sem_mudanca'] = 0 if teve_mudanca else estado.get('sem_mudanca', 0) + 1
+    horas = min(BACKOFF_MAX_H, BACKOFF_BASE_H * 2 ** estado['sem_mudanca'])
+    estado['ult'] = agora.isoformat(timespec='seconds')
+    estado['prox'] = (agora + timedelta(hours=horas)).isoformat(timespec='seconds')
+
+class CheckpointAuditoria:
+    """Progresso durável da rodada: a cada N editais ou T segundos os alterados vão para o log do banco
+    (anexados com fsync) e a agenda é regravada por troca atômica. A agenda é o cursor: quem já foi auditado
+    ganha 'prox' no futuro e a rodada seguinte continua de onde esta parou. Uma queda perde no máximo um lote."""
+
+    def __init__(self, agenda, a_cada=CHECKPOINT_EDITAIS, intervalo=CHECKPOINT_SEGUNDOS):
+        self.agenda = agenda
+        self.a_cada = a_cada
+        self.intervalo = intervalo
+        self.lote = []
+        self.desde_descarga = 0
+        self.ultima_descarga = time.monotonic()
+        self.gravados = 0
+        self.descargas = 0
+        self.tempo_descarga = 0.0
+
+    def registrar(self, lic, mudou):
+        reagendar(self.agenda.setdefault(lic['id'], {}), mudou, datetime.now())
+        if mudou: self.lote.append(lic)
+        self.desde_descarga += 1
+        if self.desde_descarga >= self.a_cada or time.monotonic() - self.ultima_descarga >= self.intervalo:
+            self.descarregar()
+
+    def descarregar(self, ids_vivos=None):
+        ini = time.perf_counter()
+        # Log primeiro, agenda depois: se cair entre os dois, o edital só é auditado de novo (nunca perdido)
+        if self.lote:
+            self.gravados += gravar_alteracoes(self.lote)
+            self.lote = []
+        salvar_agenda(self.agenda, ids_vivos)
+        self.descargas += 1
+        self.desde_descarga = 0
+        self.ultima_descarga = time.monotonic()
+        self.tempo_descarga += time.perf_counter() - ini
+        METRICAS.somar_etapa('persistencia', time.perf_counter() - ini)
+
+def interromper(signum, frame):
+    raise KeyboardInterrupt
+
 if __name__ == '__main__':
-    if not os.path.exists(ARQDADOS):
+    import argparse
+    import signal
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget-min', type=float, default=ORCAMENTO_MIN, help="Orçamento de tempo da rodada (minutos)")
+    parser.add_argument('--limit', type=int, default=LIMITE_POR_RODADA, help="Máximo de editais por rodada (0 = sem teto)")
+    args = parser.parse_args()
+    prazo = time.monotonic() + args.budget_min * 60 - MARGEM_SEGUNDOS
+    signal.signal(signal.SIGTERM, interromper) # Cancelamento do Actions: descarrega o que já foi feito
+
+    if not os.path.exists(ARQ_SNAPSHOT) and not os.path.exists(ARQ_DELTA):
         log_mensagem("❌ Banco de dados não encontrado.")
         exit(0)
 
     log_mensagem("🚀 Iniciando Auditoria Completa (Status Global e Vencedores)...")
-    
-    with gzip.open(ARQDADOS, 'rt', encoding='utf-8') as f:
-        banco = json.load(f)
 
-    session = criar_sessao()
+    controle = ControleConcorrencia(CONCORRENCIA_INICIAL, maximo=MAXWORKERS, log=log_mensagem)
+    session = criar_sessao(controle)
     mudancas_totais = 0
     
-    # Filtra licitações que ainda têm itens em andamento ou que não estão com status finalizado
-    pendentes = [l for l in banco if any(it.get('sit', 'EM ANDAMENTO') == "EM ANDAMENTO" for it in l.get('itens', []))]
+    # Filtra licitações que ainda têm itens em andamento (no backend sqlite é uma consulta indexada).
+    # Na memória ficam só id + dt_enc; cada edital é lido do disco quando a auditoria dele roda
+    pendentes = carregar_pendentes()
 
     if not pendentes:
         log_mensagem("✅ Todas as licitações já estão homologadas/finalizadas.")
         exit(0)
 
-    # Fatiamento para evitar Timeout do GitHub Actions (Máx 45 min)
-    LIMITE_POR_RODADA = 500
-    if len(pendentes) > LIMITE_POR_RODADA:
-        log_mensagem(f"⚠️ {len(pendentes)} pendentes encontrados. Limitando a {LIMITE_POR_RODADA} nesta rodada.")
-        pendentes = pendentes[:LIMITE_POR_RODADA]
-    else:
-        log_mensagem(f"⏳ Verificando {len(pendentes)} licitações pendentes...")
+    # Fila por valor esperado (encerramento recente, tempo desde a última checagem, backoff de quem não muda)
+    agenda = carregar_agenda()
+    fila = ordenar_por_prioridade(pendentes.chaves, agenda, datetime.now())
+    adiados = len(pendentes) - len(fila)
+    if args.limit and len(fila) > args.limit:
+        fila = fila[:args.limit]
+    log_mensagem(f"⏳ {len(pendentes)} pendentes: {len(fila)} na fila desta rodada, {adiados} em backoff | orçamento {args.budget_min:g} min")
+
+    checkpoint = CheckpointAuditoria(agenda)
+    auditadas = 0
+    parou_por_tempo = False
+    interrompido = False
+    exe = concurrent.futures.ThreadPoolExecutor(max_workers=MAXWORKERS)
+    restantes = iter(fila)
+    em_voo = {}
+    try:
+        while True:
+            # Despacha aos poucos (no máximo 2 por worker) para poder parar no prazo sem deixar nada pela metade
+            while len(em_voo) < MAXWORKERS * 2 and not parou_por_tempo:
+                if time.monotonic() >= prazo:
+                    parou_por_tempo = True
+                    break
+                l = next(restantes, None)
+                if l is None: break
+                em_voo[exe.submit(auditar_pendente, pendentes, l['id'], session)] = l
+            if not em_voo: break
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAXWORKERS) as exe:
-        futuros = {exe.submit(auditoria_licitacao, l, session): l for l in pendentes}
-        for f in concurrent.futures.as_completed(futuros):
-            if f.result():
-                mudancas_totais += 1
+            feitos, _ = concurrent.futures.wait(em_voo, return_when=concurrent.futures.FIRST_COMPLETED)
+            for f in feitos:
+                em_voo.pop(f)
+                l, mudou = f.result()
+                auditadas += 1
+                if mudou: mudancas_totais += 1
+                checkpoint.registrar(l, mudou)
+        exe.shutdown()
+    except KeyboardInterrupt:
+        interrompido = True
+        signal.signal(signal.SIGTERM, signal.SIG_IGN) # Um segundo sinal não corta a descarga final
+        # Quem já terminou entra no checkpoint (a auditoria está paga); quem ainda está no ar é abandonado
+        # sem esperar as requisições, para a descarga rodar já
+        for f in em_voo:
+            if not f.done() or f.cancelled() or f.exception() is not None: continue
+            l, mudou = f.result()
+            auditadas += 1
+            if mudou: mudancas_totais += 1
+            checkpoint.registrar(l, mudou)
+        exe.shutdown(wait=False, cancel_futures=True)
+        log_mensagem(f"⚠️ Interrompido: salvando o progresso ({auditadas} editais auditados nesta rodada).")
 
+    # Último lote + poda da agenda (homologados saem)
+    checkpoint.descarregar({l['id'] for l in pendentes.chaves})
+    pendentes.fechar()
     if mudancas_totais > 0:
-        with gzip.open(ARQDADOS, 'wt', encoding='utf-8') as f:
-            json.dump(banco, f, ensure_ascii=False)
         log_mensagem(f"💾 Auditoria finalizada: {mudancas_totais} licitações atualizadas com novos status/vencedores.")
     else:
         log_mensagem("ℹ️ Nenhuma alteração encontrada nesta rodada.")
+    log_mensagem(f"🧷 Checkpoints: {checkpoint.descargas} descargas, {checkpoint.tempo_descarga:.2f} s no total")
+
+    cobertura = 100 * auditadas / len(pendentes)
+    log_mensagem(f"📊 Cobertura: {auditadas}/{len(pendentes)} pendentes auditados ({cobertura:.0f}%) | "
+                 f"{len(fila) - auditadas} ficaram na fila{' (orçamento de tempo esgotado)' if parou_por_tempo else ' (interrompido)' if interrompido else ''} | {adiados} em backoff")
+
+    c = CONTADOR_REQUISICOES
+    if c['editais']:
+        log_mensagem(f"📉 Requisições por edital: {c['feitas'] / c['editais']:.1f} (antes: {c['item_a_item'] / c['editais']:.1f}) | "
+                     f"total {c['feitas']} x {c['item_a_item']} item a item | {c['fallback']} editais no fallback")
+
+    log_mensagem(f"🚦 Controle de concorrência: {controle.resumo()}")
+    if obter_cache():
+        log_mensagem(f"🗃️ Cache HTTP: {obter_cache().resumo()}")
+    for linha in METRICAS.linhas(): log_mensagem(linha)
+    METRICAS.salvar(ARQ_METRICAS, 'atualiza.py', argumentos=vars(args), interrompido=interrompido,
+                    cobertura={'pendentes': len(pendentes), 'na_fila': len(fila), 'auditados': auditadas, 'adiados': adiados,
+                               'mudaram': mudancas_totais, 'orcamento_esgotado': parou_por_tempo},
+                    requisicoes_por_edital=dict(c), concorrencia={k: round(v, 1) for k, v in controle.stats.items()},
+                    cache_http=dict(obter_cache().stats) if obter_cache() else None)
+    log_mensagem(f"📈 Métricas da rodada em {ARQ_METRICAS}")
@@ -0,0 +1,130 @@
+import re
+from collections import deque
+
+class AutomatoTermos:
+    """Autômato Aho-Corasick: acha TODOS os termos do dicionário numa única passada pelo texto."""
+
+    def __init__(self, termos):
+        # Cada estado é um dicionário de transições; 'falha' e 'saida' são listas paralelas
+        self.transicoes = [{}]
+        self.falha = [0]
+        self.saida = [[]]
+        self.termos = []
+
+        for termo in dict.fromkeys(termos):
+            if termo is None: continue
+            self._inserir(termo)
+        self._construir_falhas()
+
+    def __len__(self):
+        return len(self.termos)
+
+    def _inserir(self, termo):
+        estado = 0
+        for c in termo:
+            prox = self.transicoes[estado].get(c)
+            if prox is None:
+                prox = len(self.transicoes)
+                self.transicoes[estado][c] = prox
+                self.transicoes.append({})
+                self.falha.append(0)
+                self.saida.append([])
+            estado = prox
+        self.saida[estado].append(termo)
+        self.termos.append(termo)
+
+    def _construir_falhas(self):
+        """Busca em largura: liga cada estado ao maior sufixo próprio que também é prefixo de algum termo."""
+        fila = deque(self.transicoes[0].values())
+        while fila:
+            estado = fila.popleft()
+            for c, prox in self.transicoes[estado].items():
+                fila.append(prox)
+                f = self.falha[estado]
+                while f and c not in self.transicoes[f]:
+                    f = self.falha[f]
+                alvo = self.transicoes[f].get(c, 0)
+                self.falha[prox] = alvo if alvo != prox else 0
+                # Herda as saídas do estado de falha (termos que são sufixo deste caminho)
+                self.saida[prox] = self.saida[prox] + self.saida[self.falha[prox]]
+
+    def encontrar(self, texto):
+        """Retorna o conjunto de termos que aparecem como substring do texto."""
+        achados = set(self.saida[0])
+        transicoes, falha, saida = self.transicoes, self.falha, self.saida
+        estado = 0
+        for c in texto:
+            while estado and c not in transicoes[estado]:
+                estado = falha[estado]
+            estado = transicoes[estado].get(c, 0)
+            if saida[estado]:
+                achados.update(saida[estado])
+        return achados
+
+    def contem_algum(self, texto):
+        """Equivalente a any(termo in texto for termo in termos), mas parando no primeiro achado."""
+        if self.saida[0]: return True
+        transicoes, falha, saida = self.transicoes, self.falha, self.saida
+        estado = 0
+        for c in texto:
+            while estado and c not in transicoes[estado]:
+                estado = falha[estado]
+            estado = transicoes[estado].get(c, 0)
+            if saida[estado]:
+                return True
+        return False
+
+def _regex_trie(termos):
+    """Alternância fatorada por prefixo (trie): em cada posição o re casa o MAIOR termo que começa ali."""
+    trie = {}
+    for termo in termos:
+        no = trie
+        for c in termo: no = no.setdefault(c, {})
+        no[''] = {}
+    def gerar(no):
+        ramos = [re.escape(c) + gerar(filho) for c, filho in sorted(no.items()) if c]
+        if not ramos: return ''
+        corpo = ramos[0] if len(ramos) == 1 and '' not in no else '(?:' + '|'.join(ramos) + ')'
+        return corpo + ('?' if '' in no else '')
+    return gerar(trie)
+
+class ClassificadorTermos:
+    """Grupos de termos (categorias) compilados numa regex só: uma passada pelo texto devolve todas as categorias
+    presentes e os termos que as acionaram, com o mesmo resultado de testar `termo in texto` termo a termo."""
+
+    def __init__(self, categorias):
+        self.categorias_do_termo = {}
+        for categoria, termos in categorias.items():
+            for termo in termos:
+                if termo: self.categorias_do_termo.setdefault(termo, []).append(categoria)
+        termos = list(self.categorias_do_termo)
+        self.regex = re.compile(_regex_trie(termos) or '(?!)') # Sem termos: regex que nunca casa
+        # Casar o maior termo numa posição implica casar todos os termos contidos nele
+        self.contidos = {t: [s for s in termos if s in t] for t in termos}
+        # Depois de um achado a busca segue do fim dele, recuando só o maior sufixo que começa outro termo
+        self.recuo = {t: max((k for s in termos for k in range(1, min(len(s), len(t))) if t.endswith(s[:k])), default=0)
+                      for t in termos}
+
+    def __len__(self):
+        return len(self.categorias_do_termo)
+
+    def encontrar(self, texto):
+        """Conjunto dos termos que aparecem como substring do texto."""
+        achados = set()
+        busca, contidos, recuo = self.regex.search, self.contidos, self.recuo
+        m = busca(texto)
+        while m:
+            termo = m.group()
+            achados.update(contidos[termo])
+            m = busca(texto, m.end() - recuo[termo])
+        return achados
+
+    def classificar(self, texto):
+        """{categoria: [termos que a acionaram]}, só com as categorias presentes no texto."""
+        acertos = {}
+        achados = self.encontrar(texto)
+        if not achados: return acertos
+        for termo in sorted(achados):
+            for categoria in self.categorias_do_termo[termo]:
+                acertos.setdefault(categoria, []).append(termo)
+        return acertos
@@ -1,15 +1,29 @@
 import json
-import gzip
 import csv
+import gzip
+import hashlib
 import os
 import re
-import unicodedata
 import logging
+import argparse
+import concurrent.futures
+from functools import lru_cache
+from normalizacao import normalizar_descricao
+from armazenamento import ARQ_SNAPSHOT, ARQ_DELTA, BACKEND, iterar_banco
 
 # --- CONFIGURAÇÕES ---
-ARQUIVO_ENTRADA = 'pregacoes_pharma_limpos.json.gz'
 ARQUIVO_DICIONARIO = 'dicionario_ouro.json'
 ARQUIVO_SAIDA = 'relatorio_compatibilidade_consolidado.csv'
+# Mesmo resultado para o painel: por edital, itens casados com o termo e os trechos a destacar (sem HTML)
+ARQUIVO_SAIDA_JSON = 'relatorio_compatibilidade.json.gz'
+# Resultados por descrição de item, reaproveitados entre execuções (só o que é novo ou mudou é avaliado)
+ARQUIVO_CACHE = 'cache_portfolio.json.gz'
+# Itens resolvidos por vez: os editais são lidos em fluxo e só o lote corrente fica na memória
+TAM_LOTE = 50000
+# Descrições por tarefa no modo --workers (grande o bastante para diluir o custo de IPC)
+TAM_BLOCO = 2000
+# Mude sempre que a lógica de casamento/destaque mudar: descarta o cache inteiro
+VERSAO_MOTOR = 1
 
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
 
@@ -29,24 +43,20 @@ BLACKLIST = [
 ]
 REGEX_BLACKLIST = re.compile(r'\b(?:' + '|'.join(BLACKLIST) + r')\b')
 
-def normalizar(texto):
-    """Remove acentos e converte para maiúsculas para facilitar a busca."""
-    if not texto: return ""
-    t = ''.join(c for c in unicodedata.normalize('NFD', str(texto)) if not unicodedata.combining(c))
-    return t.upper()
+normalizar = normalizar_descricao # Remove acentos e converte para maiúsculas para facilitar a busca
+
+# Mapa supremo de flexibilidade (Acentos, S/Z, I/Y e C/Ç)
+MAPA_FLEX = {
+    'A': '[AÁÀÂÃÄ]', 'E': '[EÉÈÊË]', 'I': '[IÍÌÎÏY]', 
+    'O': '[OÓÒÔÕÖ]', 'U': '[UÚÙÛÜ]', 'C': '[CÇ]', 
+    'S': '[SZ]', 'Z': '[SZ]', 'Y': '[IY]'
+}
 
 def criar_regex_token(token):
     """Cria expressões regulares flexíveis para capturar variações e acentos no texto original."""
     if token.isalpha():
         t = token.upper()
         
-        # Mapa supremo de flexibilidade (Acentos, S/Z, I/Y e C/Ç)
-        mapa = {
-            'A': '[AÁÀÂÃÄ]', 'E': '[EÉÈÊË]', 'I': '[IÍÌÎÏY]', 
-            'O': '[OÓÒÔÕÖ]', 'U': '[UÚÙÛÜ]', 'C': '[CÇ]', 
-            'S': '[SZ]', 'Z': '[SZ]', 'Y': '[IY]'
-        }
-        
         # Trata o final A/O para pegar masculino/feminino (ex: Nifedipina/Nifedipino)
         if t.endswith('A') or t.endswith('O'):
             base = t[:-1]
@@ -56,7 +66,7 @@ def criar_regex_token(token):
             sufixo = ''
             
         # Monta a palavra substituindo cada letra pelo seu grupo de variações
-        t_flex = "".join(mapa.get(c, c) for c in base) + sufixo + r'S?'
+        t_flex = "".join(MAPA_FLEX.get(c, c) for c in base) + sufixo + r'S?'
         return t_flex
     else:
         # Tratamento para números e dosagens (ex: 10MG/ML ou 0,9%)
@@ -67,8 +77,73 @@ def criar_regex_token(token):
         t = t.replace(r'\/', r'\s*/\s*').replace(r'\,', r'\s*,\s*')
         return t
 
+@lru_cache(maxsize=None)
+def compilar_token(token):
+    """Regex compilada (com limites de palavra) de um token, construída uma única vez por execução."""
+    return re.compile(r'(?<!\w)' + criar_regex_token(token) + r'(?!\w)', flags=re.IGNORECASE)
+
+@lru_cache(maxsize=4096)
+def compilar_marca_texto(tokens):
+    """Super regex do marca-texto para uma combinação de tokens (tupla)."""
+    super_regex = r'(?<!\w)(' + '|'.join(criar_regex_token(t) for t in tokens) + r')(?!\w)'
+    return re.compile(super_regex, flags=re.IGNORECASE)
+
+LETRAS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+CLASSES_LETRAS = [(l, re.compile(MAPA_FLEX.get(l, l), re.IGNORECASE)) for l in LETRAS]
+
+class _TabelaCanonica(dict):
+    """Tabela para str.translate: leva cada caractere à letra cuja classe flexível (criar_regex_token) o aceita."""
+    def __missing__(self, codigo):
+        c = chr(codigo)
+        canon = next((l for l, rx in CLASSES_LETRAS if rx.fullmatch(c)), c)
+        self[codigo] = canon
+        return canon
+
+TABELA_CANONICA = _TabelaCanonica()
+
+def chave_palavra(palavra):
+    """Chave de índice: duas palavras que a regex flexível considera iguais sempre geram a mesma chave
+    (acentos, S/Z, I/Y, plural e final A/O colapsados)."""
+    chave = palavra.translate(TABELA_CANONICA).rstrip('S')
+    if chave.endswith('O'): chave = chave[:-1] + 'A'
+    return chave
+
+class MotorDicionario:
+    """Dicionário compilado: regex em cache por token e índice invertido palavra -> termos candidatos."""
+
+    def __init__(self, termos):
+        self.termos = termos
+        self.indice = {}
+        # Termos com letras fora de A-Z não entram no índice: são sempre testados (caminho seguro)
+        self.sempre_testar = []
+        for pos, termo in enumerate(termos):
+            if not termo['core']: continue  # Sem núcleo nunca casa (regra original)
+            if any(c not in LETRAS for ct in termo['core'] for c in ct):
+                self.sempre_testar.append(pos)
+                continue
+            chaves = frozenset(chave_palavra(ct) for ct in termo['core'])
+            termo['chaves'] = chaves
+            # Indexa pela chave mais longa (mais seletiva); as demais são conferidas no filtro de candidatos
+            self.indice.setdefault(max(chaves, key=len), []).append(pos)
+        for termo in termos:
+            for t in termo['core'] + termo['attrs']:
+                compilar_token(t)
+
+    def __len__(self):
+        return len(self.termos)
+
+    def candidatos(self, desc_original):
+        """Posições (em ordem do dicionário) dos termos cujas palavras núcleo podem estar no texto."""
+        chaves_desc = {chave_palavra(p) for p in re.findall(r'\w+', desc_original)}
+        achados = set(self.sempre_testar)
+        for chave in chaves_desc:
+            for pos in self.indice.get(chave, ()):
+                if self.termos[pos]['chaves'] <= chaves_desc:
+                    achados.add(pos)
+        return sorted(achados)
+
 def preparar_dicionario(termos_brutos):
-    """Transforma a sua lista do dicionário numa máquina de tokens."""
+    """Transforma a sua lista do dicionário numa máquina de tokens compilada e indexada."""
     dicionario_inteligente = []
     for termo in termos_brutos:
         termo = normalizar(termo).strip()
@@ -82,52 +157,200 @@ def preparar_dicionario(termos_brutos):
             # Atributos = Dosagens, percentuais e unidades (10MG, 0,9%, etc)
             'attrs': [t for t in tokens if not t.isalpha()]
         })
-    return dicionario_inteligente
+    return MotorDicionario(dicionario_inteligente)
 
-def processar_item(desc_original, dicionario_inteligente):
-    """Aplica as barreiras e o marca-texto num item específico."""
+def localizar_item(desc_original, dicionario_inteligente):
+    """Aplica as barreiras e devolve (posição do termo no dicionário, trechos [(início, fim)] a destacar) ou (None, None)."""
     desc_norm = normalizar(desc_original)
 
     # 🛑 BARREIRA 1: Blacklist (O Item morre aqui se for pão ou pneu)
     if REGEX_BLACKLIST.search(desc_norm):
         return None, None
 
-    # 🎯 BARREIRA 2: Busca da Chave Mestra
-    for termo in dicionario_inteligente:
-        core_matches = []
-        
-        # Procura os nomes dos fármacos (Core)
-        for ct in termo['core']:
-            # (?<!\w) e (?!\w) funcionam como limites de palavra, mas suportam símbolos
-            regex_ct = r'(?<!\w)' + criar_regex_token(ct) + r'(?!\w)'
-            if re.search(regex_ct, desc_original, flags=re.IGNORECASE):
-                core_matches.append(ct)
+    # 🎯 BARREIRA 2: Busca da Chave Mestra (só nos termos cujas palavras aparecem no texto)
+    for pos in dicionario_inteligente.candidatos(desc_original):
+        termo = dicionario_inteligente.termos[pos]
 
         # Se achou TODAS as palavras principais do fármaco...
-        if core_matches and len(core_matches) == len(termo['core']):
+        if all(compilar_token(ct).search(desc_original) for ct in termo['core']):
             
             # Prepara a tinta amarela para os nomes do remédio...
-            tokens_para_pintar = [criar_regex_token(ct) for ct in termo['core']]
+            tokens_para_pintar = list(termo['core'])
 
             # ...e também procura as dosagens perdidas na frase (CATMAT)
             for at in termo['attrs']:
-                regex_at = r'(?<!\w)' + criar_regex_token(at) + r'(?!\w)'
-                if re.search(regex_at, desc_original, flags=re.IGNORECASE):
-                    tokens_para_pintar.append(criar_regex_token(at))
+                if compilar_token(at).search(desc_original):
+                    tokens_para_pintar.append(at)
 
-            # 🖌️ APLICAÇÃO DO MARCA-TEXTO
-            # Junta todos os tokens que achou numa super regex
-            super_regex = r'(?<!\w)(' + '|'.join(tokens_para_pintar) + r')(?!\w)'
-            
-            # Pinta o texto ORIGINAL (mantendo a formatação e as minúsculas/maiúsculas que o pregoeiro usou)
-            desc_pintada = re.sub(super_regex, r'<mark><b>\g<1></b></mark>', desc_original, flags=re.IGNORECASE)
-
-            return desc_pintada, termo['original']
+            # 🖌️ TRECHOS DO MARCA-TEXTO (no texto ORIGINAL, com a caixa que o pregoeiro usou)
+            trechos = [m.span(1) for m in compilar_marca_texto(tuple(tokens_para_pintar)).finditer(desc_original)]
+            return pos, trechos
 
     # Se não achou nenhum medicamento, ignora
     return None, None
 
-def main():
+def pintar(desc_original, trechos):
+    """Marca-texto em HTML a partir dos trechos (mesma saída do antigo re.sub com <mark><b>)."""
+    partes, ultimo = [], 0
+    for ini, fim in trechos:
+        partes.append(desc_original[ultimo:ini] + '<mark><b>' + desc_original[ini:fim] + '</b></mark>')
+        ultimo = fim
+    return ''.join(partes) + desc_original[ultimo:]
+
+def processar_item(desc_original, dicionario_inteligente):
+    """Aplica as barreiras e o marca-texto num item específico."""
+    pos, trechos = localizar_item(desc_original, dicionario_inteligente)
+    if pos is None: return None, None
+    return pintar(desc_original, trechos), dicionario_inteligente.termos[pos]['original']
+
+def offsets_utf16(texto, trechos):
+    """Converte posições de caracteres do Python para as do JavaScript (UTF-16) quando o texto tem caracteres fora do BMP."""
+    if all(ord(c) <= 0xFFFF for c in texto): return trechos
+    conv = lambda i: len(texto[:i].encode('utf-16-le')) // 2
+    return [(conv(ini), conv(fim)) for ini, fim in trechos]
+
+def gravar_artefato_json(achados, termos, arquivo=ARQUIVO_SAIDA_JSON):
+    """{'termos': [...], 'editais': {id: {item: [id do termo, [[início, fim], ...]]}}} em gzip determinístico.
+    `achados` é uma lista de (id_licitacao, item, descrição, posição do termo, trechos)."""
+    ids_termos = {}
+    editais = {}
+    for id_lic, item_num, desc, pos, trechos in achados:
+        id_termo = ids_termos.setdefault(pos, len(ids_termos))
+        editais.setdefault(id_lic, {})[str(item_num)] = [id_termo, [list(t) for t in offsets_utf16(desc, trechos)]]
+    artefato = {'termos': [termos[pos]['original'] for pos in ids_termos], 'editais': editais}
+    bruto = gzip.compress(json.dumps(artefato, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), mtime=0)
+    tmp = arquivo + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(bruto)
+    os.replace(tmp, arquivo)
+    return len(editais)
+
+def chave_item(desc_original):
+    """Impressão digital da descrição exata (os trechos destacados dependem do texto original, não do normalizado)."""
+    return hashlib.blake2b(desc_original.encode('utf-8'), digest_size=12).hexdigest()
+
+def assinatura_motor():
+    """O que invalida tudo: versão da lógica e a blacklist (o dicionário é comparado termo a termo)."""
+    return f"{VERSAO_MOTOR}:{hashlib.sha1(REGEX_BLACKLIST.pattern.encode('utf-8')).hexdigest()[:12]}"
+
+class CacheAvaliacao:
+    """Cache persistente de localizar_item por descrição de item.
+
+    Com o dicionário igual ao da última execução, o resultado guardado é reaproveitado direto. Se o dicionário
+    só ganhou/perdeu termos (os que ficaram mantêm a ordem), cada resultado é revalidado barato: cai se o termo
+    casado saiu ou se algum termo novo, vindo antes dele na ordem, casa com a descrição; senão continua valendo.
+    Reordenação de termos ou mudança da blacklist/lógica descarta o cache.
+    """
+
+    def __init__(self, motor, arquivo=ARQUIVO_CACHE):
+        self.motor = motor
+        self.arquivo = arquivo
+        self.termos = [t['original'] for t in motor.termos]
+        self.posicao = {}
+        for pos, original in enumerate(self.termos): self.posicao.setdefault(original, pos)
+        self.entradas = {}
+        self.motor_novos = None # MotorDicionario só com os termos acrescentados (None = dicionário igual)
+        self.pos_novos = []
+        self.situacao = 'vazio'
+        self.atualizadas = {}
+        self.stats = {'avaliados': 0, 'reaproveitados': 0, 'revalidados': 0}
+        self._carregar()
+
+    def _carregar(self):
+        if not os.path.exists(self.arquivo): return
+        try:
+            with gzip.open(self.arquivo, 'rt', encoding='utf-8') as f:
+                dados = json.load(f)
+        except Exception: return
+        if dados.get('motor') != assinatura_motor():
+            self.situacao = 'motor alterado'
+            return
+
+        antigos = dados['termos']
+        self.entradas = {chave: (antigos[i] if i >= 0 else None, [tuple(t) for t in trechos] if trechos else None)
+                         for chave, (i, trechos) in dados['itens'].items()}
+        if antigos == self.termos:
+            self.situacao = 'dicionário igual'
+            return
+
+        conj_antigos, conj_atuais = set(antigos), set(self.termos)
+        mantidos_antes = [t for t in dict.fromkeys(antigos) if t in conj_atuais]
+        mantidos_agora = [t for t in dict.fromkeys(self.termos) if t in conj_antigos]
+        if mantidos_antes != mantidos_agora:
+            self.entradas = {}
+            self.situacao = 'dicionário reordenado'
+            return
+
+        self.pos_novos = [pos for pos, t in enumerate(self.termos) if t not in conj_antigos]
+        self.motor_novos = MotorDicionario([self.motor.termos[pos] for pos in self.pos_novos])
+        self.situacao = f"dicionário com {len(self.pos_novos)} termos novos e {len(conj_antigos - conj_atuais)} removidos"
+
+    def _ainda_vale(self, desc_original, original):
+        if self.motor_novos is None: return True
+        if original is not None and original not in self.posicao: return False # Termo saiu do dicionário
+        if not self.pos_novos: return True
+        pos_novo, _ = localizar_item(desc_original, self.motor_novos)
+        if pos_novo is None: return True
+        # Um termo novo casa: só derruba o resultado se vier antes do termo guardado (o primeiro da ordem vence)
+        return original is not None and self.pos_novos[pos_novo] > self.posicao[original]
+
+    def resolver(self, descricoes, avaliar_lote):
+        """Resultados (posição do termo, trechos) alinhados com `descricoes`. Cada descrição distinta é resolvida
+        uma vez: pelo cache quando ainda vale, senão entra no lote entregue a avaliar_lote (lista -> lista de
+        resultados de localizar_item, na mesma ordem)."""
+        chaves = [chave_item(d) for d in descricoes]
+        faltantes = {}
+        for chave, desc in zip(chaves, descricoes):
+            if chave in self.atualizadas or chave in faltantes: continue
+            if chave in self.entradas and self._ainda_vale(desc, self.entradas[chave][0]):
+                self.atualizadas[chave] = self.entradas[chave]
+                self.stats['reaproveitados' if self.motor_novos is None else 'revalidados'] += 1
+            else:
+                faltantes[chave] = desc
+        for chave, (pos, trechos) in zip(faltantes, avaliar_lote(list(faltantes.values()))):
+            self.atualizadas[chave] = (self.termos[pos] if pos is not None else None, trechos)
+        self.stats['avaliados'] += len(faltantes)
+
+        resultados = []
+        for chave in chaves:
+            original, trechos = self.atualizadas[chave]
+            resultados.append((self.posicao[original], trechos) if original is not None else (None, None))
+        return resultados
+
+    def salvar(self):
+        """Guarda só as descrições vistas nesta execução, todas válidas para o dicionário atual."""
+        dados = {'motor': assinatura_motor(), 'termos': self.termos,
+                 'itens': {chave: [self.posicao[o] if o is not None else -1, t] for chave, (o, t) in self.atualizadas.items()}}
+        tmp = self.arquivo + '.tmp'
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            json.dump(dados, f, separators=(',', ':'))
+        os.replace(tmp, self.arquivo)
+
+# --- MODO MULTIPROCESSO ---
+# Cada worker compila o próprio dicionário uma vez (regex compilada não atravessa processos)
+_MOTOR_WORKER = None
+
+def _iniciar_worker(termos_brutos):
+    global _MOTOR_WORKER
+    _MOTOR_WORKER = preparar_dicionario(termos_brutos)
+
+def _avaliar_bloco(descricoes):
+    return [localizar_item(d, _MOTOR_WORKER) for d in descricoes]
+
+def criar_pool(termos_brutos, workers):
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker, initargs=(termos_brutos,))
+
+def avaliar_em_paralelo(descricoes, termos_brutos, workers, tam_bloco=TAM_BLOCO, exe=None):
+    """localizar_item em blocos espalhados por `workers` processos. O map devolve na ordem dos blocos,
+    então o resultado é o mesmo (e na mesma ordem) do modo de um processo só. Reaproveita `exe` se vier."""
+    blocos = [descricoes[i:i + tam_bloco] for i in range(0, len(descricoes), tam_bloco)]
+    if exe is not None:
+        return [r for bloco in exe.map(_avaliar_bloco, blocos) for r in bloco]
+    with criar_pool(termos_brutos, workers) as exe:
+        return [r for bloco in exe.map(_avaliar_bloco, blocos) for r in bloco]
+
+def main(workers=1, licitacoes=None):
+    """`licitacoes`: iterável de editais já em memória (modo pipeline); sem ele, o banco é lido em fluxo do disco."""
     if not os.path.exists(ARQUIVO_DICIONARIO):
         logging.error("Dicionário não encontrado.")
         return
@@ -138,41 +361,71 @@ def main():
     dicionario = preparar_dicionario(termos_brutos)
     logging.info(f"Dicionário carregado com {len(dicionario)} estratégias de busca ativa.")
 
-    if not os.path.exists(ARQUIVO_ENTRADA):
+    # Visão consolidada do banco (snapshot + log de alterações), lida em fluxo: um edital por vez
+    if licitacoes is None and BACKEND != 'sqlite' and not os.path.exists(ARQ_SNAPSHOT) and not os.path.exists(ARQ_DELTA):
         logging.error("Banco de dados JSON não encontrado.")
         return
 
-    with gzip.open(ARQUIVO_ENTRADA, 'rt', encoding='utf-8') as f:
-        licitacoes = json.load(f)
+    cache = CacheAvaliacao(dicionario)
+    logging.info(f"🗂️ Cache de avaliação: {len(cache.entradas)} descrições guardadas ({cache.situacao}).")
 
-    resultados_finais = []
+    total_ouro = 0
+    achados = []
     
     logging.info("A auditar itens e a aplicar filtros de destaque inteligente...")
 
-    for licitacao in licitacoes:
-        for item in licitacao.get('itens', []):
-            desc_original = item.get('d', '')
-            
-            # Passa o item pela nova inteligência
-            desc_pintada, termo_encontrado = processar_item(desc_original, dicionario)
-            
-            if desc_pintada:
-                resultados_finais.append({
-                    'id_licitacao': licitacao.get('id'),
-                    'orgao': licitacao.get('org'),
-                    'item_num': item.get('n'),
-                    'descricao_item': desc_pintada,
-                    'termo_encontrado': termo_encontrado
-                })
-
     # 💾 GRAVAÇÃO (MODO SOBREPOR TOTAL)
-    # Como abrimos com 'w', ele destrói os dados velhos e reescreve com a versão mais atualizada
-    with open(ARQUIVO_SAIDA, mode='w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=['id_licitacao', 'orgao', 'item_num', 'descricao_item', 'termo_encontrado'])
-        writer.writeheader()
-        writer.writerows(resultados_finais)
+    # Como abrimos com 'w', ele destrói os dados velhos e reescreve com a versão mais atualizada (linha a linha, por lote)
+    pool = criar_pool(termos_brutos, workers) if workers > 1 else None
+    if pool:
+        avaliar_lote = lambda descs: avaliar_em_paralelo(descs, termos_brutos, workers, exe=pool) if descs else []
+        logging.info(f"🧵 Modo multiprocesso: {workers} workers.")
+    else:
+        avaliar_lote = lambda descs: [localizar_item(d, dicionario) for d in descs]
+
+    try:
+        with open(ARQUIVO_SAIDA, mode='w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['id_licitacao', 'orgao', 'item_num', 'descricao_item', 'termo_encontrado'])
+            writer.writeheader()
+
+            def resolver_lote(lote):
+                # Passa os itens pela nova inteligência: o que o cache não resolve vai para um processo ou para o pool
+                nonlocal total_ouro
+                avaliacoes = cache.resolver([item.get('d', '') for _, item in lote], avaliar_lote)
+                for (licitacao, item), (pos, trechos) in zip(lote, avaliacoes):
+                    if pos is None: continue
+                    desc_original = item.get('d', '')
+                    achados.append((licitacao.get('id'), item.get('n'), desc_original, pos, trechos))
+                    writer.writerow({
+                        'id_licitacao': licitacao.get('id'),
+                        'orgao': licitacao.get('org'),
+                        'item_num': item.get('n'),
+                        'descricao_item': pintar(desc_original, trechos),
+                        'termo_encontrado': dicionario.termos[pos]['original']
+                    })
+                    total_ouro += 1
+
+            lote = []
+            for licitacao in (licitacoes if licitacoes is not None else iterar_banco()):
+                lote.extend((licitacao, item) for item in licitacao.get('itens', []))
+                if len(lote) >= TAM_LOTE:
+                    resolver_lote(lote)
+                    lote = []
+            resolver_lote(lote)
+    finally:
+        if pool: pool.shutdown()
+
+    editais = gravar_artefato_json(achados, dicionario.termos)
+    cache.salvar()
 
-    logging.info(f"✅ Concluído! Relatório CSV sobreposto e atualizado com {len(resultados_finais)} itens de ouro.")
+    logging.info(f"✅ Concluído! Relatório CSV sobreposto e atualizado com {total_ouro} itens de ouro.")
+    st = cache.stats
+    logging.info(f"♻️ Descrições distintas: {st['avaliados']} avaliadas, {st['reaproveitados']} reaproveitadas do cache, "
+                 f"{st['revalidados']} revalidadas contra os termos novos")
+    logging.info(f"🧾 {ARQUIVO_SAIDA_JSON}: {editais} editais com itens compatíveis ({os.path.getsize(ARQUIVO_SAIDA_JSON) / 1024:.0f} KB)")
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=1, help="Processos para a avaliação (0 = todos os núcleos)")
+    args = parser.parse_args()
+    main(args.workers or os.cpu_count())
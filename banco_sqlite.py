@@ -0,0 +1,190 @@
+import json
+import sqlite3
+import sys
+import threading
+import logging
+from collections.abc import MutableMapping
+
+ARQ_SQLITE = 'pregacoes_pharma.sqlite'
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS editais (
+    id TEXT PRIMARY KEY,
+    uf TEXT,
+    dt_enc TEXT,
+    sit_global TEXT,
+    dados TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS itens (
+    id TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    n INTEGER,
+    sit TEXT,
+    dados TEXT NOT NULL,
+    PRIMARY KEY (id, pos)
+);
+CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT);
+CREATE INDEX IF NOT EXISTS idx_editais_uf ON editais(uf);
+CREATE INDEX IF NOT EXISTS idx_editais_dt_enc ON editais(dt_enc);
+CREATE INDEX IF NOT EXISTS idx_editais_sit_global ON editais(sit_global);
+CREATE INDEX IF NOT EXISTS idx_itens_sit ON itens(sit);
+CREATE INDEX IF NOT EXISTS idx_itens_id_n ON itens(id, n);
+"""
+
+class BancoSQLite(MutableMapping):
+    """Banco de editais em SQLite com cara de dicionário {id: licitação}.
+
+    Leituras por id são consultas pela chave primária (nada é carregado inteiro na memória);
+    atribuições ficam só em memória até salvar() (mesmo contrato do dicionário do armazenamento JSON).
+    """
+
+    def __init__(self, caminho=ARQ_SQLITE):
+        self.con = sqlite3.connect(caminho, check_same_thread=False)
+        self.con.executescript(ESQUEMA)
+        self.lock = threading.Lock()
+        self._novos = {}
+        self._removidos = set()
+
+    # --- Interface de dicionário ---
+    def __getitem__(self, id_lic):
+        if id_lic in self._novos: return self._novos[id_lic]
+        if id_lic in self._removidos: raise KeyError(id_lic)
+        registro = self.ler(id_lic)
+        if registro is None: raise KeyError(id_lic)
+        return registro
+
+    def __setitem__(self, id_lic, registro):
+        self._removidos.discard(id_lic)
+        self._novos[id_lic] = registro
+
+    def __delitem__(self, id_lic):
+        if id_lic not in self: raise KeyError(id_lic)
+        self._novos.pop(id_lic, None)
+        self._removidos.add(id_lic)
+
+    def __contains__(self, id_lic):
+        if id_lic in self._novos: return True
+        if id_lic in self._removidos: return False
+        with self.lock:
+            return self.con.execute("SELECT 1 FROM editais WHERE id = ?", (id_lic,)).fetchone() is not None
+
+    def __iter__(self):
+        with self.lock:
+            ids = [r[0] for r in self.con.execute("SELECT id FROM editais ORDER BY rowid")]
+        vistos = set(ids)
+        for id_lic in ids:
+            if id_lic not in self._removidos: yield id_lic
+        for id_lic in self._novos:
+            if id_lic not in vistos: yield id_lic
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    # --- Consultas indexadas ---
+    def ler(self, id_lic):
+        with self.lock:
+            linha = self.con.execute("SELECT dados FROM editais WHERE id = ?", (id_lic,)).fetchone()
+            if not linha: return None
+            itens = [json.loads(d) for (d,) in self.con.execute("SELECT dados FROM itens WHERE id = ? ORDER BY pos", (id_lic,))]
+        registro = json.loads(linha[0])
+        registro['itens'] = itens
+        return registro
+
+    def dt_enc(self, id_lic):
+        """Data de encerramento gravada (consulta pela chave primária, sem ler os itens)."""
+        if id_lic in self._novos: return self._novos[id_lic].get('dt_enc')
+        with self.lock:
+            linha = self.con.execute("SELECT dt_enc FROM editais WHERE id = ?", (id_lic,)).fetchone()
+        return linha[0] if linha else None
+
+    def ids_pendentes(self):
+        """Editais com pelo menos um item EM ANDAMENTO (índice em itens.sit)."""
+        with self.lock:
+            return [r[0] for r in self.con.execute(
+                "SELECT e.id FROM editais e WHERE e.id IN (SELECT DISTINCT id FROM itens WHERE sit = 'EM ANDAMENTO') ORDER BY e.rowid")]
+
+    def ufs(self):
+        """UFs presentes no banco (varre só o índice de uf)."""
+        with self.lock:
+            ufs = {r[0] for r in self.con.execute("SELECT DISTINCT uf FROM editais")}
+        ufs |= {r.get('uf') for r in self._novos.values()}
+        return sorted(ufs, key=lambda uf: uf or '')
+
+    def por_uf(self, uf):
+        """Ids da UF, do encerramento mais recente ao mais antigo (índice em uf)."""
+        with self.lock:
+            linhas = self.con.execute("SELECT id, dt_enc FROM editais WHERE uf IS ? ORDER BY dt_enc DESC", (uf,)).fetchall()
+        return self._mesclar(linhas, lambda r: r.get('uf') == uf, reverso=True)
+
+    def por_periodo(self, inicio, fim, uf=None):
+        """Ids com inicio <= dt_enc < fim (comparação de texto ISO: '2026-01' pega o mês inteiro), do mais antigo
+        ao mais recente (índice em dt_enc); com `uf`, só os daquela UF."""
+        sql, parametros = "SELECT id, dt_enc FROM editais WHERE dt_enc >= ? AND dt_enc < ?", [inicio, fim]
+        if uf is not None: sql, parametros = sql + " AND uf = ?", parametros + [uf]
+        with self.lock:
+            linhas = self.con.execute(sql + " ORDER BY dt_enc", parametros).fetchall()
+        return self._mesclar(linhas, lambda r: inicio <= (r.get('dt_enc') or '') < fim and (uf is None or r.get('uf') == uf))
+
+    def _mesclar(self, linhas, filtro, reverso=False):
+        """(id, dt_enc) vindos do índice + o que só está em memória (atribuído/removido antes do salvar), na mesma ordem."""
+        if self._novos or self._removidos:
+            linhas = [(i, d) for i, d in linhas if i not in self._novos and i not in self._removidos]
+            linhas += [(i, r.get('dt_enc')) for i, r in self._novos.items() if filtro(r)]
+            linhas.sort(key=lambda l: l[1] or '', reverse=reverso)
+        return [i for i, _ in linhas]
+
+    # --- Escrita ---
+    def gravar(self, registros):
+        """Upsert de editais inteiros (cabeçalho + itens) numa transação."""
+        with self.lock, self.con:
+            for r in registros:
+                cabecalho = {k: v for k, v in r.items() if k != 'itens'}
+                self.con.execute("INSERT OR REPLACE INTO editais (id, uf, dt_enc, sit_global, dados) VALUES (?, ?, ?, ?, ?)",
+                                 (r['id'], r.get('uf'), r.get('dt_enc'), r.get('sit_global'), json.dumps(cabecalho, ensure_ascii=False)))
+                self.con.execute("DELETE FROM itens WHERE id = ?", (r['id'],))
+                self.con.executemany("INSERT INTO itens (id, pos, n, sit, dados) VALUES (?, ?, ?, ?, ?)",
+                                     [(r['id'], pos, it.get('n'), it.get('sit', 'EM ANDAMENTO'), json.dumps(it, ensure_ascii=False))
+                                      for pos, it in enumerate(r.get('itens', []))])
+        return len(registros)
+
+    def apagar(self, ids):
+        with self.lock, self.con:
+            for id_lic in ids:
+                self.con.execute("DELETE FROM itens WHERE id = ?", (id_lic,))
+                self.con.execute("DELETE FROM editais WHERE id = ?", (id_lic,))
+
+    def salvar(self):
+        """Persiste o que foi atribuído/removido via interface de dicionário."""
+        self.gravar(list(self._novos.values()))
+        self.apagar(self._removidos)
+        self._novos.clear()
+        self._removidos.clear()
+
+    def limpar(self):
+        with self.lock, self.con:
+            self.con.execute("DELETE FROM itens")
+            self.con.execute("DELETE FROM editais")
+
+    def meta(self, chave, valor=None):
+        with self.lock, self.con:
+            if valor is None:
+                linha = self.con.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+                return linha[0] if linha else None
+            self.con.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES (?, ?)", (chave, valor))
+
+    def registros(self):
+        for id_lic in self:
+            yield self[id_lic]
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+    import armazenamento
+    comando = sys.argv[1] if len(sys.argv) > 1 else ''
+    if comando == 'importar':
+        banco = armazenamento.abrir_sqlite(forcar_importacao=True)
+        logging.info(f"✅ {len(banco)} licitações importadas para {ARQ_SQLITE}.")
+    elif comando == 'exportar':
+        banco = armazenamento.abrir_sqlite()
+        logging.info(f"✅ Snapshot {armazenamento.ARQ_SNAPSHOT} exportado com {armazenamento.exportar_sqlite(banco)} licitações.")
+    else:
+        print("Uso: python banco_sqlite.py importar|exportar")
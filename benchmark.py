@@ -0,0 +1,497 @@
+import argparse
+import json
+import os
+import csv
+import io
+import random
+import subprocess
+import sys
+import tempfile
+import re
+import shutil
+import time
+import unicodedata
+from datetime import date, datetime, timedelta
+
+from app import normalize
+from automato import AutomatoTermos
+import avalia_portfolio
+import normalizacao
+
+ARQ_DICIONARIO = 'dicionario_ouro.json'
+
+# Vocabulário de "enchimento" típico das descrições do CATMAT
+PALAVRAS_RUIDO = [
+    "FRASCO", "AMPOLA", "CAIXA", "UNIDADE", "SOLUCAO", "INJETAVEL", "ORAL", "USO", "ADULTO",
+    "PEDIATRICO", "EMBALAGEM", "ESTERIL", "DESCRICAO", "COMPLEMENTAR", "CONFORME", "TERMO",
+    "REFERENCIA", "APRESENTACAO", "BLISTER", "COMPRIMIDO", "REVESTIDO", "GOTAS", "XAROPE",
+    "PAPEL", "CANETA", "SERINGA", "GAZE", "LUVA", "PROCEDIMENTO", "TAMANHO", "MEDIO"
+]
+
+def carregar_termos():
+    with open(ARQ_DICIONARIO, 'r', encoding='utf-8') as f:
+        return [normalize(t) for t in json.load(f)]
+
+def gerar_descricoes(termos, qtd, semente=42, taxa_match=0.3):
+    """Gera descrições sintéticas de itens: parte contém um termo do dicionário, parte é só ruído."""
+    rnd = random.Random(semente)
+    descricoes = []
+    for _ in range(qtd):
+        palavras = rnd.choices(PALAVRAS_RUIDO, k=rnd.randint(6, 20))
+        palavras.append(f"{rnd.randint(1, 1000)}MG")
+        if rnd.random() < taxa_match:
+            palavras.insert(rnd.randint(0, len(palavras)), rnd.choice(termos))
+        descricoes.append(' '.join(palavras))
+    return descricoes
+
+def cronometrar(func, repeticoes=3):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        ini = time.perf_counter()
+        func()
+        melhor = min(melhor, time.perf_counter() - ini)
+    return melhor
+
+def bench_dicionario(args):
+    """Autômato Aho-Corasick x laço any() original do processar_licitacao."""
+    termos = carregar_termos()
+    descricoes = gerar_descricoes(termos, args.itens)
+
+    ini = time.perf_counter()
+    automato = AutomatoTermos(termos)
+    t_build = time.perf_counter() - ini
+
+    # Conferência: o autômato tem que concordar com o any() em todos os itens
+    for d in descricoes:
+        esperado = any(t in d for t in termos)
+        assert automato.contem_algum(d) == esperado == bool(automato.encontrar(d)), d
+
+    t_any = cronometrar(lambda: [any(t in d for t in termos) for d in descricoes])
+    t_aut = cronometrar(lambda: [automato.encontrar(d) for d in descricoes])
+
+    print(f"📚 {len(termos)} termos | {len(descricoes)} descrições | montagem do autômato: {t_build * 1000:.1f} ms")
+    print(f"🐢 any() original : {t_any:.3f} s ({len(descricoes) / t_any:,.0f} itens/s)")
+    print(f"⚡ Aho-Corasick   : {t_aut:.3f} s ({len(descricoes) / t_aut:,.0f} itens/s) -> {t_any / t_aut:.1f}x")
+
+def processar_item_original(desc_original, termos):
+    """Versão anterior do avalia_portfolio.processar_item (regex montada e buscada termo a termo)."""
+    if avalia_portfolio.REGEX_BLACKLIST.search(avalia_portfolio.normalizar(desc_original)):
+        return None, None
+    criar = avalia_portfolio.criar_regex_token
+    for termo in termos:
+        core_matches = [ct for ct in termo['core']
+                        if re.search(r'(?<!\w)' + criar(ct) + r'(?!\w)', desc_original, flags=re.IGNORECASE)]
+        if core_matches and len(core_matches) == len(termo['core']):
+            tokens_para_pintar = [criar(ct) for ct in termo['core']]
+            for at in termo['attrs']:
+                if re.search(r'(?<!\w)' + criar(at) + r'(?!\w)', desc_original, flags=re.IGNORECASE):
+                    tokens_para_pintar.append(criar(at))
+            super_regex = r'(?<!\w)(' + '|'.join(tokens_para_pintar) + r')(?!\w)'
+            return re.sub(super_regex, r'<mark><b>\g<1></b></mark>', desc_original, flags=re.IGNORECASE), termo['original']
+    return None, None
+
+VARIACOES = [str.lower, str.title, str.upper,
+             lambda t: t.replace('A', 'Á', 1), lambda t: t.replace('S', 'Z'),
+             lambda t: t + 'S', lambda t: t[:-1] + 'O' if t.endswith('A') else t]
+
+def gerar_descricoes_reais(termos_brutos, qtd, semente=7):
+    """Descrições com grafias variadas (acentos, caixa, plural, S/Z) dos termos do dicionário."""
+    rnd = random.Random(semente)
+    base = gerar_descricoes(termos_brutos, qtd, semente, taxa_match=0)
+    descricoes = []
+    for d in base:
+        palavras = d.split()
+        if rnd.random() < 0.4:
+            termo = rnd.choice(termos_brutos).split()
+            palavras[rnd.randint(0, len(palavras) - 1):0] = [rnd.choice(VARIACOES)(p) for p in termo]
+        descricoes.append(' '.join(rnd.choice((str.lower, str.upper))(p) if rnd.random() < 0.2 else p for p in palavras))
+    return descricoes
+
+def bench_portfolio(args):
+    """Motor compilado/indexado x laço termo a termo do avalia_portfolio.processar_item."""
+    with open(ARQ_DICIONARIO, 'r', encoding='utf-8') as f:
+        termos_brutos = json.load(f)
+    descricoes = gerar_descricoes_reais(termos_brutos, args.itens)
+
+    ini = time.perf_counter()
+    motor = avalia_portfolio.preparar_dicionario(termos_brutos)
+    t_build = time.perf_counter() - ini
+
+    ini = time.perf_counter()
+    antes = [processar_item_original(d, motor.termos) for d in descricoes]
+    t_antes = time.perf_counter() - ini
+
+    ini = time.perf_counter()
+    depois = [avalia_portfolio.processar_item(d, motor) for d in descricoes]
+    t_depois = time.perf_counter() - ini
+
+    divergencias = sum(1 for a, b in zip(antes, depois) if a != b)
+    casados = sum(1 for a in antes if a[0])
+    print(f"📚 {len(motor)} termos | {len(descricoes)} descrições ({casados} com match) | preparo do motor: {t_build:.2f} s")
+    print(f"🐢 Antes : {t_antes:.2f} s ({len(descricoes) / t_antes:,.0f} itens/s)")
+    print(f"⚡ Depois: {t_depois:.2f} s ({len(descricoes) / t_depois:,.0f} itens/s) -> {t_antes / t_depois:.1f}x")
+    print(f"{'✅' if not divergencias else '❌'} Saídas divergentes: {divergencias}")
+
+def bench_checkpoint(args):
+    """Custo das descargas incrementais do atualiza.py (log + agenda) frente ao tempo de rede por edital."""
+    import atualiza
+    rnd = random.Random(3)
+    editais = [{'id': f"{i:014d}2026{i}", 'dt_enc': '2026-01-01T10:00:00', 'sit_global': 'DIVULGADA',
+                'itens': [{'n': n, 'd': ' '.join(rnd.choices(PALAVRAS_RUIDO, k=12)), 'q': 10, 'u': 'UN', 'v_est': 1.5,
+                           'benef': 1, 'sit': 'EM ANDAMENTO'} for n in range(1, 21)]} for i in range(args.itens // 20)]
+    pasta_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as pasta:
+        os.chdir(pasta)
+        try:
+            checkpoint = atualiza.CheckpointAuditoria({}, intervalo=float('inf'))
+            ini = time.perf_counter()
+            for i, lic in enumerate(editais):
+                checkpoint.registrar(lic, mudou=i % 3 == 0) # ~1/3 das auditorias trazem novidade
+            checkpoint.descarregar()
+            total = time.perf_counter() - ini
+        finally:
+            os.chdir(pasta_original)
+
+    por_edital = total / len(editais)
+    rede = args.latencia_ms / 1000 / atualiza.CONCORRENCIA_INICIAL # Tempo de rede por edital com os workers em paralelo
+    print(f"🧷 {len(editais)} editais | {checkpoint.descargas} descargas a cada {checkpoint.a_cada} | {total:.2f} s em disco")
+    print(f"⏱️ Por descarga: {total / checkpoint.descargas * 1000:.1f} ms | por edital: {por_edital * 1000:.2f} ms")
+    print(f"🌐 Rede estimada por edital ({args.latencia_ms:g} ms / {atualiza.CONCORRENCIA_INICIAL} workers): {rede * 1000:.1f} ms "
+          f"-> sobrecarga de {100 * por_edital / rede:.1f}%")
+
+def bench_escala(args):
+    """avalia_portfolio --workers: tempo com 1/2/4/N processos num banco sintético e saída idêntica em todos."""
+    with open(ARQ_DICIONARIO, 'r', encoding='utf-8') as f:
+        termos_brutos = json.load(f)
+    descricoes = gerar_descricoes_reais(termos_brutos, args.itens)
+    motor = avalia_portfolio.preparar_dicionario(termos_brutos)
+
+    def csv_de(resultados):
+        saida = io.StringIO()
+        w = csv.writer(saida)
+        for n, (pos, trechos) in enumerate(resultados):
+            if pos is not None:
+                w.writerow([n, avalia_portfolio.pintar(descricoes[n], trechos), motor.termos[pos]['original']])
+        return saida.getvalue()
+
+    niveis = sorted({1, 2, 4, os.cpu_count() or 1})
+    referencia = None
+    print(f"📚 {len(motor)} termos | {len(descricoes)} itens sintéticos | {os.cpu_count()} núcleos")
+    for workers in niveis:
+        ini = time.perf_counter()
+        if workers == 1:
+            resultados = [avalia_portfolio.localizar_item(d, motor) for d in descricoes]
+        else:
+            resultados = avalia_portfolio.avaliar_em_paralelo(descricoes, termos_brutos, workers)
+        duracao = time.perf_counter() - ini
+        saida = csv_de(resultados)
+        if referencia is None: referencia = (saida, duracao)
+        igual = '✅ idêntico' if saida == referencia[0] else '❌ DIVERGENTE'
+        print(f"🧵 {workers:>2} workers: {duracao:6.2f} s ({len(descricoes) / duracao:,.0f} itens/s) "
+              f"-> {referencia[1] / duracao:.1f}x | CSV {igual}")
+
+# Roda num processo novo para medir o pico de memória (ru_maxrss) só da leitura do banco
+SCRIPT_MEMORIA = """
+import resource, sys
+import armazenamento
+modo = sys.argv[1]
+if modo == 'carregar': n = len(armazenamento.carregar_banco())
+else: n = sum(1 for _ in armazenamento.iterar_banco())
+print(n, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def bench_memoria(args):
+    """Pico de RSS lendo o banco inteiro (json.load) x em fluxo (array e NDJSON), com o histórico crescendo."""
+    import armazenamento
+    rnd = random.Random(11)
+    def editais(qtd):
+        for i in range(qtd):
+            yield {'id': f"{i:020d}", 'dt_enc': '2026-01-01T10:00:00', 'obj': ' '.join(rnd.choices(PALAVRAS_RUIDO, k=15)),
+                   'itens': [{'n': n, 'd': ' '.join(rnd.choices(PALAVRAS_RUIDO, k=12)), 'q': 10, 'u': 'UN', 'v_est': 1.5,
+                              'benef': 1} for n in range(1, 21)]}
+
+    pasta_codigo = os.path.dirname(os.path.abspath(__file__))
+    tamanhos = [args.itens // 8, args.itens // 4, args.itens // 2, args.itens]
+    print(f"{'editais':>8} | {'json.load':>10} | {'fluxo array':>11} | {'fluxo ndjson':>12}   (pico de RSS, MB)")
+    with tempfile.TemporaryDirectory() as pasta:
+        for qtd in tamanhos:
+            armazenamento.gravar_registros(os.path.join(pasta, armazenamento.ARQ_SNAPSHOT_JSON), editais(qtd))
+            armazenamento.converter(os.path.join(pasta, armazenamento.ARQ_SNAPSHOT_JSON), os.path.join(pasta, armazenamento.ARQ_SNAPSHOT_NDJSON))
+            picos = []
+            for modo, formato in (('carregar', 'json'), ('fluxo', 'json'), ('fluxo', 'ndjson')):
+                env = dict(os.environ, SNIPER_FORMATO=formato, SNIPER_BACKEND='json', PYTHONPATH=pasta_codigo)
+                saida = subprocess.run([sys.executable, '-c', SCRIPT_MEMORIA, modo], cwd=pasta, env=env,
+                                       capture_output=True, text=True, check=True).stdout.split()
+                assert int(saida[0]) == qtd, saida
+                picos.append(int(saida[1]) / 1024)
+            print(f"{qtd:>8} | {picos[0]:>10.0f} | {picos[1]:>11.0f} | {picos[2]:>12.0f}")
+
+# Versões anteriores dos três normalizadores, copiadas como estavam em cada script
+def normalize_original(t):
+    if not t: return ""
+    return ''.join(c for c in unicodedata.normalize('NFD', str(t)).upper() if unicodedata.category(c) != 'Mn')
+
+def normalizar_portfolio_original(texto):
+    if not texto: return ""
+    t = ''.join(c for c in unicodedata.normalize('NFD', str(texto)) if not unicodedata.combining(c))
+    return t.upper()
+
+def normalizar_gerador_original(texto):
+    if not texto: return ""
+    texto_limpo = "".join(c for c in unicodedata.normalize('NFD', str(texto).upper()) if not (ord(c) >= 768 and ord(c) <= 879))
+    return texto_limpo.strip()
+
+NORMALIZADORES = [
+    ('app.normalize', normalize_original, normalizacao.normalizar),
+    ('avalia_portfolio.normalizar', normalizar_portfolio_original, normalizacao.normalizar_descricao),
+    ('gerador_dicionario.normalizar', normalizar_gerador_original, normalizacao.normalizar_termo),
+]
+
+def textos_de_conferencia(termos_brutos, qtd, semente=5):
+    """Todos os code points, os termos do dicionário, descrições com acentos e textos mistos (latim + marcas
+    combinantes soltas + outros alfabetos) para pegar qualquer diferença do caminho rápido."""
+    rnd = random.Random(semente)
+    textos = [chr(cp) for cp in range(0x110000) if not 0xD800 <= cp <= 0xDFFF]
+    textos += termos_brutos + gerar_descricoes_reais(termos_brutos, qtd)
+    latinos = [chr(cp) for cp in range(0x20, 0x370)] + [chr(cp) for cp in range(0x2000, 0x2070)]
+    estranhos = [chr(cp) for cp in (0x345, 0x34F, 0x0E31, 0x093F, 0x1D165, 0x1E9E, 0x2126, 0x212B, 0xFB01, 0x0130, 0x3131, 0xAC00)]
+    for _ in range(qtd):
+        pool = latinos + estranhos if rnd.random() < 0.3 else latinos
+        textos.append(''.join(rnd.choices(pool, k=rnd.randint(1, 40))))
+    return textos + [None, 0, 123, 4.5, '', '   ', ' á ']
+
+def bench_normalizacao(args):
+    """normalizacao.py (tabela + memo) x os três normalizadores originais: saída idêntica e tempo.
+    Qualquer divergência encerra com código 1 (a conferência roda sozinha no CI com --so-conferencia)."""
+    with open(ARQ_DICIONARIO, 'r', encoding='utf-8') as f:
+        termos_brutos = json.load(f)
+    textos = textos_de_conferencia(termos_brutos, args.itens)
+    total_divergentes = 0
+    for nome, original, novo in NORMALIZADORES:
+        divergentes = [t for t in textos if original(t) != novo(t)]
+        total_divergentes += len(divergentes)
+        print(f"{'✅' if not divergentes else '❌'} {nome}: {len(textos):,} textos conferidos, {len(divergentes)} divergentes "
+              f"{[t for t in divergentes[:5]] if divergentes else ''}")
+    if total_divergentes: raise SystemExit(f"❌ {total_divergentes} saídas divergentes dos normalizadores originais")
+    if args.so_conferencia: return
+
+    # Carga típica: descrições de item com repetição (o mesmo CATMAT aparece em vários editais)
+    rnd = random.Random(9)
+    unicas = gerar_descricoes_reais(termos_brutos, args.itens // 4)
+    carga = [rnd.choice(unicas) for _ in range(args.itens)]
+    print(f"📝 {len(carga):,} descrições ({len(set(carga)):,} distintas)")
+    for nome, original, novo in NORMALIZADORES:
+        t_antes = cronometrar(lambda: [original(d) for d in carga])
+        t_tabela = cronometrar(lambda: [novo.cache_clear() or novo(d) for d in carga])
+        novo.cache_clear()
+        t_memo = cronometrar(lambda: [novo(d) for d in carga])
+        print(f"⚡ {nome:<30} original {t_antes:.3f} s | tabela {t_tabela:.3f} s ({t_antes / t_tabela:.1f}x) "
+              f"| tabela + memo {t_memo:.3f} s ({t_antes / t_memo:.1f}x)")
+
+def triagem_original(lic):
+    """Versão anterior do app.triar_licitacao (um `in` por veto e três any() pelas listas brancas)."""
+    import app
+    uo = lic.get('unidadeOrgao', {})
+    uf = str(uo.get('ufSigla') or 'BR').upper().strip()
+    obj_norm = normalize(lic.get('objetoCompra') or "")
+    if uf in app.ESTADOS_BLOQUEADOS: return 'VETO_GEO', False
+    for v in app.VETOS_ABSOLUTOS:
+        if v in obj_norm: return 'VETO_TITULO', False
+    tem_med = any(t in obj_norm for t in app.WL_MEDICAMENTOS)
+    tem_mmh = any(t in obj_norm for t in app.WL_NUTRI_MMH)
+    tem_vago = any(t in obj_norm for t in app.WL_TERMOS_VAGOS)
+    if tem_med:
+        if uf not in app.UFS_PERMITIDAS_MED: return 'VETO_GEO', False
+    elif tem_mmh:
+        if uf not in app.UFS_PERMITIDAS_MMH: return 'VETO_GEO', False
+    elif tem_vago:
+        return None, True
+    else:
+        return 'FORA_TEMATICA', False
+    return None, False
+
+# Vocabulário típico do campo objetoCompra da listagem
+PALAVRAS_OBJETO = [
+    "REGISTRO", "DE", "PRECOS", "PARA", "FUTURA", "E", "EVENTUAL", "AQUISICAO", "MATERIAIS", "ATENDER", "AS",
+    "NECESSIDADES", "DA", "SECRETARIA", "MUNICIPAL", "DO", "MUNICIPIO", "CONFORME", "ESPECIFICACOES", "TERMO",
+    "REFERENCIA", "CONTRATACAO", "EMPRESA", "FORNECIMENTO", "PARCELADO", "UNIDADES", "ESTADO", "GERAL"
+]
+
+def bench_triagem(args):
+    """Classificador do objeto (regex única) x laço de vetos + três any() do app.triar_licitacao."""
+    import app
+    todos = app.VETOS_ABSOLUTOS + app.WL_MEDICAMENTOS + app.WL_NUTRI_MMH + app.WL_TERMOS_VAGOS
+    rnd = random.Random(13)
+    ufs = app.UFS_PERMITIDAS_MED + app.ESTADOS_BLOQUEADOS + ['RS', 'PR']
+    listagem = []
+    for _ in range(args.itens):
+        palavras = rnd.choices(PALAVRAS_OBJETO, k=rnd.randint(8, 30))
+        for _ in range(rnd.choice((0, 0, 1, 1, 2))):
+            palavras.insert(rnd.randint(0, len(palavras)), rnd.choice(todos) + rnd.choice(('', 'S', 'OS', ' ')))
+        texto = ' '.join(palavras)
+        if rnd.random() < 0.2: texto = texto.replace(' ', '', 1) # Termos colados em outras palavras
+        listagem.append({'objetoCompra': texto.lower() if rnd.random() < 0.3 else texto, 'unidadeOrgao': {'ufSigla': rnd.choice(ufs)}})
+
+    def antes():
+        return [triagem_original(l) for l in listagem]
+    def depois():
+        return [app.triar_licitacao(l) for l in listagem]
+
+    divergencias = sum(1 for a, b in zip(antes(), depois()) if a != b)
+    termos = {t for t in todos if t}
+    erros_termos = sum(1 for l in listagem[:2000]
+                       if app.CLASSIFICADOR_OBJETO.encontrar(normalize(l['objetoCompra'])) != {t for t in termos if t in normalize(l['objetoCompra'])})
+    t_antes, t_depois = cronometrar(antes), cronometrar(depois)
+    print(f"📋 {len(listagem)} registros da listagem | {len(app.CLASSIFICADOR_OBJETO)} termos de triagem")
+    print(f"🐢 Antes : {t_antes:.3f} s ({len(listagem) / t_antes:,.0f} registros/s)")
+    print(f"⚡ Depois: {t_depois:.3f} s ({len(listagem) / t_depois:,.0f} registros/s) -> {t_antes / t_depois:.1f}x")
+    print(f"{'✅' if not divergencias and not erros_termos else '❌'} Decisões divergentes: {divergencias} | "
+          f"conjuntos de termos divergentes: {erros_termos}")
+
+def avaliar_regras_ingenuo(texto, regras):
+    """Leitura direta do CSV, regra a regra: uma busca pela chave, pelas afirmações e pelas negações de cada uma."""
+    disparadas = []
+    for r in regras:
+        alvo = normalize(texto) if r['inteligente'] else str(texto).upper()
+        if r['inteira']: tem_chave = re.search(r'(?<!\w)' + re.escape(r['chave']) + r'(?!\w)', alvo)
+        else: tem_chave = r['chave'] in alvo
+        if not tem_chave: continue
+        if r['afirmacao'] and not any(a in alvo for a in r['afirmacao']): continue
+        if any(n in alvo for n in r['negacao']): continue
+        disparadas.append(r)
+    return disparadas
+
+def bench_regras(args):
+    """Motor de regras_materiais.csv (uma passada) x avaliação regra a regra, em descrições sintéticas de itens."""
+    import regras_materiais
+    regras = regras_materiais.carregar_regras()
+    motor = regras_materiais.MotorRegras(regras)
+    rnd = random.Random(17)
+    vocabulario = sorted({t for r in regras for t in (r['rotulo'],) + r['afirmacao'] + r['negacao']})
+    descricoes = []
+    for _ in range(args.itens):
+        palavras = rnd.choices(PALAVRAS_RUIDO, k=rnd.randint(6, 20))
+        for _ in range(rnd.choice((0, 1, 2, 3))):
+            termo = rnd.choice(vocabulario) + rnd.choice(('', '', 'S', 'ICA', 'AO'))
+            palavras.insert(rnd.randint(0, len(palavras)), rnd.choice((str.upper, str.lower, str.title))(termo))
+        descricoes.append(' '.join(palavras))
+
+    antes = [avaliar_regras_ingenuo(d, regras) for d in descricoes]
+    depois = [motor.avaliar(d) for d in descricoes]
+    divergencias = sum(1 for a, b in zip(antes, depois) if a != b)
+    t_antes = cronometrar(lambda: [avaliar_regras_ingenuo(d, regras) for d in descricoes], 1)
+    t_depois = cronometrar(lambda: [motor.avaliar(d) for d in descricoes], 1)
+    print(f"🧤 {len(regras)} regras | {len(descricoes):,} descrições ({sum(1 for a in depois if a):,} com regra disparada)")
+    print(f"🐢 Regra a regra: {t_antes:.2f} s ({len(descricoes) / t_antes:,.0f} itens/s)")
+    print(f"⚡ Motor        : {t_depois:.2f} s ({len(descricoes) / t_depois:,.0f} itens/s) -> {t_antes / t_depois:.1f}x")
+    print(f"{'✅' if not divergencias else '❌'} Saídas divergentes: {divergencias}")
+
+ARQ_HISTORICO = 'benchmark_historico.jsonl'
+
+def _rodar_etapa(nome, comando, pasta, env, servidor):
+    """Roda um script num processo filho contra o PNCP local: tempo de parede, CPU e pico de RSS do próprio filho."""
+    servidor.zerar()
+    with open(os.path.join(pasta, f"{nome}.log"), 'w', encoding='utf-8') as log:
+        ini = time.perf_counter()
+        processo = subprocess.Popen(comando, cwd=pasta, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, uso = os.wait4(processo.pid, 0)
+        parede = time.perf_counter() - ini
+    processo.returncode = os.waitstatus_to_exitcode(status)
+    if processo.returncode != 0:
+        with open(os.path.join(pasta, f"{nome}.log"), encoding='utf-8') as f:
+            print(f.read()[-3000:])
+        raise SystemExit(f"❌ {nome} terminou com código {processo.returncode}")
+    return {'parede_s': round(parede, 2), 'cpu_s': round(uso.ru_utime + uso.ru_stime, 2),
+            'rss_mb': round(uso.ru_maxrss / 1024, 1), **servidor.resumo()}
+
+def bench_ponta_a_ponta(args):
+    """app.py (captura e recaptura) -> atualiza.py -> avalia_portfolio.py contra o mock_pncp.py: editais/s, req/s, CPU e pico de RSS por etapa.
+    Cada rodada é acrescentada ao histórico (JSONL) e comparada com a anterior de mesma configuração."""
+    import armazenamento
+    from mock_pncp import ServidorPNCP
+    pasta_codigo = os.path.dirname(os.path.abspath(__file__))
+    config = {'dias': args.dias, 'editais_dia': args.editais_dia, 'latencia_ms': args.mock_latencia_ms,
+              'taxa_erro': args.taxa_erro, 'taxa_429': args.taxa_429, 'modo': args.modo}
+    servidor = ServidorPNCP(0, args.mock_latencia_ms, args.taxa_erro, args.taxa_429, editais_por_dia=args.editais_dia).iniciar()
+    inicio = date(2026, 3, 2)
+    fim = inicio + timedelta(days=args.dias - 1)
+    etapas = {}
+    try:
+        with tempfile.TemporaryDirectory() as pasta:
+            for arq in (ARQ_DICIONARIO, 'regras_materiais.csv'):
+                if os.path.exists(os.path.join(pasta_codigo, arq)): shutil.copy(os.path.join(pasta_codigo, arq), pasta)
+            env = dict(os.environ, SNIPER_PNCP_URL=servidor.url, SNIPER_CACHE_HTTP='0', SNIPER_BACKEND='json',
+                       PYTHONPATH=pasta_codigo, PYTHONUNBUFFERED='1')
+            script = lambda nome: [sys.executable, os.path.join(pasta_codigo, nome)]
+            etapas['app'] = _rodar_etapa('app', script('app.py') + ['--start', str(inicio), '--end', str(fim), '--mode', args.modo,
+                                         '--rps', '1000', '--burst', '50'], pasta, env, servidor)
+            etapas['app']['editais'] = etapas['app']['editais_listados']
+            # Mesmo intervalo de novo: editais sem mudança na listagem não rebuscam os itens
+            etapas['recaptura'] = _rodar_etapa('recaptura', script('app.py') + ['--start', str(inicio), '--end', str(fim), '--mode', args.modo,
+                                               '--rps', '1000', '--burst', '50', '--force'], pasta, env, servidor)
+            etapas['recaptura']['editais'] = etapas['recaptura']['editais_listados']
+            etapas['atualiza'] = _rodar_etapa('atualiza', script('atualiza.py') + ['--budget-min', '600', '--limit', '0'], pasta, env, servidor)
+            etapas['atualiza']['editais'] = etapas['atualiza']['requisicoes'].get('compra', 0)
+            etapas['avalia_portfolio'] = _rodar_etapa('avalia_portfolio', script('avalia_portfolio.py'), pasta, env, servidor)
+            arquivos = [os.path.join(pasta, a) for a in (armazenamento.ARQ_SNAPSHOT, armazenamento.ARQ_DELTA, armazenamento.ARQ_INDICE)]
+            etapas['avalia_portfolio']['editais'] = sum(1 for _ in armazenamento.iterar_banco(*arquivos))
+    finally:
+        servidor.parar()
+
+    print(f"🧪 PNCP local: {args.dias} dia(s) x ~{args.editais_dia} editais | latência {args.mock_latencia_ms:g} ms | "
+          f"5xx {args.taxa_erro:.0%} | 429 {args.taxa_429:.0%} | modo {args.modo}")
+    print(f"{'etapa':<17} | {'editais':>7} | {'editais/s':>9} | {'req':>6} | {'req/s':>7} | {'parede':>7} | {'CPU':>7} | {'RSS MB':>6} | status")
+    for nome, e in etapas.items():
+        e['requisicoes_total'] = sum(e['requisicoes'].values())
+        e['editais_s'] = round(e['editais'] / e['parede_s'], 1) if e['parede_s'] else 0
+        e['req_s'] = round(e['requisicoes_total'] / e['parede_s'], 1) if e['parede_s'] else 0
+        print(f"{nome:<17} | {e['editais']:>7} | {e['editais_s']:>9.1f} | {e['requisicoes_total']:>6} | {e['req_s']:>7.1f} | "
+              f"{e['parede_s']:>6.1f}s | {e['cpu_s']:>6.1f}s | {e['rss_mb']:>6.0f} | {e['status']}")
+
+    commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=pasta_codigo, capture_output=True, text=True).stdout.strip()
+    rodada = {'quando': datetime.now().isoformat(timespec='seconds'), 'commit': commit, 'config': config, 'etapas': etapas}
+    anterior = None
+    if os.path.exists(args.historico):
+        with open(args.historico, encoding='utf-8') as f:
+            for linha in f:
+                try: r = json.loads(linha)
+                except ValueError: continue
+                if r.get('config') == config: anterior = r
+    with open(args.historico, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(rodada, ensure_ascii=False) + '\n')
+    if anterior:
+        print(f"📈 Comparado com {anterior['commit'] or '?'} ({anterior['quando']}):")
+        for nome, e in etapas.items():
+            antes = anterior['etapas'].get(nome)
+            if not antes: continue
+            delta = lambda campo: f"{100 * (e[campo] - antes[campo]) / antes[campo]:+.0f}%" if antes.get(campo) else 'n/d'
+            print(f"   {nome:<17} editais/s {delta('editais_s')} | CPU {delta('cpu_s')} | RSS {delta('rss_mb')}")
+    print(f"🗒️ Rodada registrada em {args.historico}")
+
+BENCHMARKS = {
+    'dicionario': bench_dicionario,
+    'portfolio': bench_portfolio,
+    'checkpoint': bench_checkpoint,
+    'escala': bench_escala,
+    'memoria': bench_memoria,
+    'normalizacao': bench_normalizacao,
+    'triagem': bench_triagem,
+    'regras': bench_regras,
+    'ponta_a_ponta': bench_ponta_a_ponta,
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks offline do Sniper Pharma")
+    parser.add_argument('alvo', choices=sorted(BENCHMARKS))
+    parser.add_argument('--itens', type=int, default=20000)
+    parser.add_argument('--latencia-ms', type=float, default=800, help="Tempo de rede de uma auditoria (checkpoint)")
+    parser.add_argument('--dias', type=int, default=2, help="Dias de publicações varridos (ponta_a_ponta)")
+    parser.add_argument('--editais-dia', type=int, default=200, help="Publicações por dia no PNCP local (ponta_a_ponta)")
+    parser.add_argument('--mock-latencia-ms', type=float, default=30, help="Latência média do PNCP local (ponta_a_ponta)")
+    parser.add_argument('--taxa-erro', type=float, default=0.01, help="Fração de 5xx do PNCP local (ponta_a_ponta)")
+    parser.add_argument('--taxa-429', type=float, default=0.01, help="Fração de 429 do PNCP local (ponta_a_ponta)")
+    parser.add_argument('--modo', choices=['threads', 'async'], default='async', help="Modo do app.py (ponta_a_ponta)")
+    parser.add_argument('--historico', default=ARQ_HISTORICO, help="JSONL com as rodadas anteriores (ponta_a_ponta)")
+    parser.add_argument('--so-conferencia', action='store_true', help="Só confere as saídas, sem cronometrar (normalizacao)")
+    args = parser.parse_args()
+    BENCHMARKS[args.alvo](args)
@@ -0,0 +1,158 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from controle_taxa import AdaptadorControlado
+from metricas import METRICAS
+
+# --- CONFIGURAÇÕES DO CACHE ---
+ARQ_CACHE = os.environ.get('SNIPER_CACHE_HTTP', 'cache_http.sqlite') # '0' desliga o cache
+LIMITE_BYTES = 500 * 1024 * 1024
+
+# Validade (segundos) por classe de endpoint do PNCP; o que não casar aqui não é guardado
+TTL_POR_ENDPOINT = [
+    ('listagem', re.compile(r'/contratacoes/publicacao'), 30 * 60),
+    ('resultados', re.compile(r'/resultados(\?|$)'), 60 * 60),
+    ('itens', re.compile(r'/compras/\d+/\d+/itens(\?|$)'), 12 * 3600),
+    ('compra', re.compile(r'/orgaos/\d+/compras/\d+/\d+(\?|$)'), 60 * 60),
+]
+
+def classe_endpoint(url):
+    for nome, padrao, ttl in TTL_POR_ENDPOINT:
+        if padrao.search(url): return nome, ttl
+    return None, 0
+
+class CacheHTTP:
+    """Cache de respostas em SQLite: validade por endpoint, revalidação ETag/Last-Modified e despejo LRU por tamanho."""
+
+    def __init__(self, caminho=ARQ_CACHE, limite_bytes=LIMITE_BYTES):
+        self.con = sqlite3.connect(caminho, check_same_thread=False)
+        self.con.executescript("""
+            CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT PRIMARY KEY, status INTEGER, cabecalhos TEXT, corpo BLOB,
+                etag TEXT, modificado TEXT, salvo_em REAL, acessado_em REAL, tamanho INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas(acessado_em);
+        """)
+        self.lock = threading.Lock()
+        self.limite_bytes = limite_bytes
+        self.total_bytes = self.con.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+        self.stats = {'HIT': 0, 'MISS': 0, 'REVALIDADO': 0, 'GRAVADO': 0, 'DESPEJADO': 0}
+
+    def buscar(self, chave):
+        with self.lock:
+            linha = self.con.execute("SELECT status, cabecalhos, corpo, etag, modificado, salvo_em FROM respostas WHERE chave = ?", (chave,)).fetchone()
+            if linha:
+                with self.con:
+                    self.con.execute("UPDATE respostas SET acessado_em = ? WHERE chave = ?", (time.time(), chave))
+        if not linha: return None
+        status, cabecalhos, corpo, etag, modificado, salvo_em = linha
+        return {'status': status, 'cabecalhos': json.loads(cabecalhos), 'corpo': corpo,
+                'etag': etag, 'modificado': modificado, 'salvo_em': salvo_em}
+
+    def gravar(self, chave, resposta):
+        corpo = resposta.content
+        cabecalhos = {k: v for k, v in resposta.headers.items() if k.lower() in ('content-type', 'etag', 'last-modified')}
+        agora = time.time()
+        with self.lock, self.con:
+            antigo = self.con.execute("SELECT tamanho FROM respostas WHERE chave = ?", (chave,)).fetchone()
+            self.con.execute("INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             (chave, resposta.status_code, json.dumps(cabecalhos), corpo, resposta.headers.get('ETag'),
+                              resposta.headers.get('Last-Modified'), agora, agora, len(corpo)))
+            self.total_bytes += len(corpo) - (antigo[0] if antigo else 0)
+            self.stats['GRAVADO'] += 1
+            if self.total_bytes > self.limite_bytes: self._despejar()
+
+    def renovar(self, chave):
+        """Resposta 304: o conteúdo guardado continua válido por mais um TTL."""
+        agora = time.time()
+        with self.lock, self.con:
+            self.con.execute("UPDATE respostas SET salvo_em = ?, acessado_em = ? WHERE chave = ?", (agora, agora, chave))
+
+    def _despejar(self):
+        """Remove as entradas menos usadas até ficar em 90% do limite (chamado com o lock já tomado)."""
+        alvo = self.limite_bytes * 0.9
+        for chave, tamanho in self.con.execute("SELECT chave, tamanho FROM respostas ORDER BY acessado_em").fetchall():
+            if self.total_bytes <= alvo: break
+            self.con.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+            self.total_bytes -= tamanho
+            self.stats['DESPEJADO'] += 1
+
+    def contar(self, evento):
+        with self.lock:
+            self.stats[evento] += 1
+
+    def resumo(self):
+        consultas = self.stats['HIT'] + self.stats['REVALIDADO'] + self.stats['MISS']
+        taxa = 100 * (self.stats['HIT'] + self.stats['REVALIDADO']) / consultas if consultas else 0
+        return (f"{self.stats['HIT']} hits, {self.stats['REVALIDADO']} revalidados (304), {self.stats['MISS']} misses "
+                f"({taxa:.0f}% aproveitado) | {self.stats['DESPEJADO']} despejados | {self.total_bytes / 1048576:.1f} MB em disco")
+
+class AdaptadorCache(AdaptadorControlado):
+    """HTTPAdapter que consulta o CacheHTTP antes de ir à rede (só GET de endpoints com TTL).
+    Acertos no cache não ocupam vaga no controle de concorrência."""
+
+    def __init__(self, cache, controle=None, **kwargs):
+        self.cache = cache
+        super().__init__(controle=controle, **kwargs)
+
+    def _resposta_do_cache(self, request, guardado):
+        r = Response()
+        r.status_code = guardado['status']
+        r.headers = CaseInsensitiveDict(guardado['cabecalhos'])
+        r._content = guardado['corpo']
+        r.encoding = get_encoding_from_headers(r.headers)
+        r.url = request.url
+        r.request = request
+        r.reason = 'OK (cache)'
+        r.connection = self
+        r.from_cache = True
+        return r
+
+    def send(self, request, **kwargs):
+        classe, ttl = classe_endpoint(request.url) if request.method == 'GET' else (None, 0)
+        if not ttl: return super().send(request, **kwargs)
+
+        chave = request.url
+        guardado = self.cache.buscar(chave)
+        if guardado and time.time() - guardado['salvo_em'] < ttl:
+            self.cache.contar('HIT')
+            METRICAS.acerto_cache(chave)
+            return self._resposta_do_cache(request, guardado)
+
+        # Vencido: pede ao PNCP só se mudou, quando ele mandou ETag/Last-Modified
+        if guardado:
+            if guardado['etag']: request.headers['If-None-Match'] = guardado['etag']
+            if guardado['modificado']: request.headers['If-Modified-Since'] = guardado['modificado']
+
+        resposta = super().send(request, **kwargs)
+        if resposta.status_code == 304 and guardado:
+            self.cache.renovar(chave)
+            self.cache.contar('REVALIDADO')
+            return self._resposta_do_cache(request, guardado)
+
+        self.cache.contar('MISS')
+        if resposta.status_code == 200:
+            self.cache.gravar(chave, resposta)
+        return resposta
+
+_CACHE = None
+_LOCK_CACHE = threading.Lock()
+
+def obter_cache():
+    """Cache único do processo (compartilhado por todas as sessões); None se desligado."""
+    global _CACHE
+    if ARQ_CACHE == '0': return None
+    with _LOCK_CACHE:
+        if _CACHE is None: _CACHE = CacheHTTP()
+    return _CACHE
+
+def criar_adaptador(controle=None, **kwargs):
+    """HTTPAdapter com cache quando ligado (e controle de concorrência quando informado)."""
+    cache = obter_cache()
+    return AdaptadorCache(cache, controle, **kwargs) if cache else AdaptadorControlado(controle, **kwargs)
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from metricas import METRICAS
+
+class LimitadorTaxa:
+    """Balde de fichas (token bucket) compartilhado: no máximo `taxa` requisições/s, com rajadas de até `rajada`.
+
+    Serve tanto threads (aguardar) quanto corrotinas (aguardar_async); cada chamada reserva uma ficha
+    e dorme só o tempo necessário até ela estar disponível.
+    """
+
+    def __init__(self, taxa, rajada=1):
+        if taxa <= 0: raise ValueError("A taxa precisa ser positiva.")
+        self.taxa = float(taxa)
+        self.rajada = max(1.0, float(rajada))
+        self.fichas = self.rajada
+        self.ultimo = time.monotonic()
+        self.lock = threading.Lock()
+        self.total_espera = 0.0
+
+    def _reservar(self):
+        """Consome uma ficha e devolve quantos segundos faltam até ela poder ser usada."""
+        with self.lock:
+            agora = time.monotonic()
+            self.fichas = min(self.rajada, self.fichas + (agora - self.ultimo) * self.taxa)
+            self.ultimo = agora
+            self.fichas -= 1
+            espera = -self.fichas / self.taxa if self.fichas < 0 else 0.0
+            self.total_espera += espera
+            return espera
+
+    def aguardar(self):
+        espera = self._reservar()
+        if espera > 0: time.sleep(espera)
+
+    async def aguardar_async(self):
+        espera = self._reservar()
+        if espera > 0: await asyncio.sleep(espera)
+
+# Respostas que indicam que o PNCP quer menos carga
+STATUS_SOBRECARGA = {403, 429, 500, 502, 503, 504}
+
+def segundos_retry_after(valor):
+    """Retry-After em segundos ('120') ou data HTTP ('Wed, 21 Oct 2026 07:28:00 GMT'); None se ausente/inválido."""
+    if not valor: return None
+    try: return max(0.0, float(valor))
+    except ValueError: pass
+    try: return max(0.0, (parsedate_to_datetime(valor) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError): return None
+
+class ControleConcorrencia:
+    """Controle AIMD de requisições em voo, compartilhado por todas as sessões de um processo.
+
+    Cada resposta saudável soma 1/limite (≈ +1 vaga por janela de respostas); 429/403/5xx cortam o limite
+    pela metade, no máximo um corte por `janela` segundos (as respostas que já estavam no ar não derrubam
+    de novo), e pausam todo mundo pelo Retry-After (ou backoff exponencial quando ele não vem).
+    """
+
+    def __init__(self, inicial, minimo=1, maximo=16, fator_corte=0.5, janela=2.0, log=logging.info):
+        self.minimo = max(1, minimo)
+        self.maximo = max(self.minimo, maximo)
+        self.limite = float(min(self.maximo, max(self.minimo, inicial)))
+        self.fator_corte = fator_corte
+        self.janela = janela
+        self.log = log
+        self.em_voo = 0
+        self.pausa_ate = 0.0
+        self.ultimo_corte = 0.0
+        self.sobrecargas_seguidas = 0
+        self.cond = threading.Condition()
+        self.stats = {'OK': 0, 'SOBRECARGA': 0, 'CORTES': 0, 'PAUSA_S': 0.0, 'PICO': self.limite}
+
+    @property
+    def vagas(self):
+        return int(self.limite)
+
+    def _tentar_entrar(self):
+        """Ocupa uma vaga se houver; senão devolve quanto esperar antes de tentar de novo (chamado com o lock)."""
+        espera = self.pausa_ate - time.monotonic()
+        if espera > 0: return espera
+        if self.em_voo >= self.vagas: return None
+        self.em_voo += 1
+        return 0
+
+    def entrar(self):
+        with self.cond:
+            while True:
+                espera = self._tentar_entrar()
+                if espera == 0: return
+                self.cond.wait(espera)
+
+    def sair(self):
+        with self.cond:
+            self.em_voo -= 1
+            self.cond.notify_all()
+
+    def registrar(self, status, retry_after=None, rotulo=''):
+        """Alimenta o controle com o desfecho de uma requisição (status None = erro de conexão/timeout)."""
+        with self.cond:
+            if status is not None and status not in STATUS_SOBRECARGA:
+                self.sobrecargas_seguidas = 0
+                self.limite = min(self.maximo, self.limite + 1 / self.limite)
+                self.stats['OK'] += 1
+                self.stats['PICO'] = max(self.stats['PICO'], self.limite)
+                self.cond.notify_all()
+                return
+
+            agora = time.monotonic()
+            self.stats['SOBRECARGA'] += 1
+            self.sobrecargas_seguidas += 1
+            pausa = segundos_retry_after(retry_after)
+            if pausa is None and status is not None:
+                pausa = min(60.0, 0.5 * 2 ** self.sobrecargas_seguidas)
+            if pausa and agora + pausa > self.pausa_ate:
+                self.stats['PAUSA_S'] += agora + pausa - max(self.pausa_ate, agora)
+                self.pausa_ate = agora + pausa
+            if agora - self.ultimo_corte < self.janela: return
+            anterior = self.vagas
+            self.limite = max(float(self.minimo), self.limite * self.fator_corte)
+            self.ultimo_corte = agora
+            self.stats['CORTES'] += 1
+        evento = f"HTTP {status}" if status is not None else "erro de conexão"
+        self.log(f"🚦 {evento}{' em ' + rotulo if rotulo else ''}: concorrência {anterior} -> {self.vagas}"
+                 f"{f' | pausa de {pausa:.0f}s' if pausa else ''}")
+
+    def resumo(self):
+        s = self.stats
+        return (f"concorrência atual {self.vagas} (pico {int(s['PICO'])}, teto {self.maximo}) | "
+                f"{s['SOBRECARGA']} sobrecargas, {s['CORTES']} cortes, {s['PAUSA_S']:.0f}s em pausa | {s['OK']} respostas saudáveis")
+
+class AdaptadorControlado(HTTPAdapter):
+    """HTTPAdapter que pede vaga ao ControleConcorrencia antes de ir à rede e reporta o desfecho.
+
+    As respostas de sobrecarga são repetidas aqui (até `tentativas` vezes), esperando a pausa global do
+    controle, em vez de cada thread dormir sozinha no backoff do urllib3 enquanto as outras seguem.
+    """
+
+    def __init__(self, controle=None, tentativas=5, **kwargs):
+        self.controle = controle
+        self.tentativas = tentativas
+        super().__init__(**kwargs)
+
+    def _enviar(self, request, repeticao, **kwargs):
+        """Uma ida à rede, medida (até o fim do corpo) e registrada nas METRICAS do processo."""
+        ini = time.perf_counter()
+        try:
+            resposta = super().send(request, **kwargs)
+            tamanho = len(resposta.content)
+        except Exception:
+            METRICAS.requisicao(request.url, None, time.perf_counter() - ini, repeticoes=int(repeticao))
+            raise
+        retries = getattr(resposta.raw, 'retries', None) # Falhas de conexão que o urllib3 já repetiu
+        METRICAS.requisicao(request.url, resposta.status_code, time.perf_counter() - ini, tamanho,
+                            int(repeticao) + len(retries.history if retries else ()))
+        return resposta
+
+    def send(self, request, **kwargs):
+        if self.controle is None: return self._enviar(request, False, **kwargs)
+        rotulo = urlsplit(request.url).path.rsplit('/', 1)[-1]
+        for tentativa in range(self.tentativas + 1):
+            self.controle.entrar()
+            try:
+                resposta = self._enviar(request, tentativa > 0, **kwargs)
+            except Exception:
+                self.controle.registrar(None, rotulo=rotulo)
+                raise
+            finally:
+                self.controle.sair()
+            self.controle.registrar(resposta.status_code, resposta.headers.get('Retry-After'), rotulo)
+            if resposta.status_code not in STATUS_SOBRECARGA or tentativa == self.tentativas:
+                return resposta
+            resposta.close() # Libera a conexão antes de tentar de novo
+        return resposta
@@ -0,0 +1,135 @@
+import gzip
+import json
+import os
+import re
+import logging
+from collections import defaultdict
+from armazenamento import carregar_banco
+from banco_sqlite import BancoSQLite
+
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+# --- ARTEFATOS DO PAINEL (index.html) ---
+# Índice pequeno com uma linha pré-agregada por edital + itens particionados por UF/mês, baixados sob demanda
+PASTA_WEB = 'dados_web'
+ARQ_INDICE_WEB = os.path.join(PASTA_WEB, 'indice.json.gz')
+PASTA_ITENS = os.path.join(PASTA_WEB, 'itens')
+ARQ_COMPAT = 'relatorio_compatibilidade.json.gz'
+
+# Campos do cabeçalho que o card e os filtros usam (os itens ficam de fora do índice)
+CAMPOS_RESUMO = ['id', 'dt_enc', 'uf', 'org', 'cid', 'uasg', 'unid_nome', 'obj', 'edit', 'sit_global', 'link',
+                 'val_tot', 'alerta_data', 'dt_enc_antiga']
+
+def particao(lic):
+    """UF + mês de encerramento: editais que costumam ser consultados juntos caem no mesmo arquivo."""
+    uf = (lic.get('uf') or 'XX').upper()
+    mes = (lic.get('dt_enc') or '')[:7] or 'sem-data'
+    return f"{uf}_{mes}"
+
+def _numero(valor):
+    try: return float(valor)
+    except (TypeError, ValueError): return 0.0
+
+def carregar_itens_compativeis(arq_compat=ARQ_COMPAT):
+    """{id: {itens compatíveis}} a partir do artefato JSON do avalia_portfolio."""
+    if not os.path.exists(arq_compat): return {}
+    with gzip.open(arq_compat, 'rt', encoding='utf-8') as f:
+        return json.load(f)['editais']
+
+def resumir(lic, compativeis):
+    """Linha do índice: os mesmos números que o renderMonitor calculava item a item no navegador."""
+    itens = lic.get('itens', [])
+    soma = sum(_numero(it.get('v_est')) * _numero(it.get('q')) for it in itens)
+    resumo = {k: lic[k] for k in CAMPOS_RESUMO if lic.get(k) not in (None, '')}
+    resumo.update({
+        'n_itens': len(itens),
+        'valor': round(soma if soma > 0 else _numero(lic.get('val_tot')), 2),
+        'me_epp': sum(1 for it in itens if str(it.get('benef')) in ('1', '2', '3')),
+        'compat_n': len(compativeis),
+        'compat': int(100 * len(compativeis) / (len(itens) or 1) + 0.5), # Arredonda como o Math.round do painel
+        'p': particao(lic),
+    })
+    return resumo
+
+def _gravar_gz(caminho, dados):
+    """Gzip determinístico (mtime=0): conteúdo igual gera bytes iguais e o git não vê mudança.
+    Só regrava quando mudou; devolve True se o arquivo foi escrito."""
+    bruto = gzip.compress(json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), mtime=0)
+    if os.path.exists(caminho):
+        with open(caminho, 'rb') as f:
+            if f.read() == bruto: return False
+    tmp = caminho + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(bruto)
+    os.replace(tmp, caminho)
+    return True
+
+def _meses(mais_recente, mais_antigo):
+    """'AAAA-MM' do mais recente ao mais antigo, inclusive."""
+    ano, mes = int(mais_recente[:4]), int(mais_recente[5:7])
+    while f"{ano:04d}-{mes:02d}" >= mais_antigo:
+        yield f"{ano:04d}-{mes:02d}"
+        ano, mes = (ano, mes - 1) if mes > 1 else (ano - 1, 12)
+
+def _proximo_mes(mes):
+    ano, m = int(mes[:4]), int(mes[5:7])
+    return f"{ano + m // 12:04d}-{m % 12 + 1:02d}"
+
+MES_VALIDO = re.compile(r'\d{4}-(0[1-9]|1[0-2])')
+
+def _particoes_sqlite(banco):
+    """Backend sqlite: uma partição (UF/mês) por vez, direto dos índices de uf e dt_enc, em vez de montar
+    todas na memória. Cada UF sai por mês com por_periodo; o que não cai em mês nenhum (sem data) fecha a UF."""
+    grupos = defaultdict(list)
+    for uf in banco.ufs(): grupos[(uf or 'XX').upper()].append(uf) # 'sp' e 'SP' vão para o mesmo arquivo
+    for ufs in grupos.values():
+        ids_uf = {uf: banco.por_uf(uf) for uf in ufs}
+        # por_uf vem do mais recente ao mais antigo: as pontas com data válida dão a faixa de meses da UF
+        com_data = lambda seq: next((d[:7] for d in map(banco.dt_enc, seq) if MES_VALIDO.match(d or '')), None)
+        recentes = [d for d in (com_data(ids) for ids in ids_uf.values()) if d]
+        antigos = [d for d in (com_data(reversed(ids)) for ids in ids_uf.values()) if d]
+        vistos = set()
+        # Editais sem UF (uf NULL) não têm filtro no índice: o grupo 'XX' inteiro sai pelo resto
+        if recentes and None not in ufs:
+            for mes in _meses(max(recentes), min(antigos)):
+                lics = [banco[i] for uf in ufs for i in banco.por_periodo(mes, _proximo_mes(mes), uf)]
+                vistos.update(l['id'] for l in lics)
+                if lics: yield from _agrupar(lics).items()
+        resto = [banco[i] for ids in ids_uf.values() for i in ids if i not in vistos]
+        yield from _agrupar(resto).items()
+
+def _agrupar(lics):
+    particoes = defaultdict(list)
+    for lic in lics: particoes[particao(lic)].append(lic)
+    return particoes
+
+def exportar(banco=None, arq_compat=ARQ_COMPAT):
+    if banco is None: banco = carregar_banco()
+    compat = carregar_itens_compativeis(arq_compat)
+    os.makedirs(PASTA_ITENS, exist_ok=True)
+
+    if isinstance(banco, BancoSQLite): grupos = _particoes_sqlite(banco)
+    else: grupos = sorted(_agrupar(banco.values()).items())
+
+    resumos, particoes, regravadas = [], set(), 0
+    for p, lics in grupos:
+        # Ordem por id: o mesmo banco gera os mesmos bytes nos dois backends (a ordem de leitura do sqlite é outra)
+        lics = sorted((l for l in lics if l.get('id')), key=lambda l: l['id'])
+        if not lics: continue
+        resumos.extend(resumir(lic, compat.get(lic['id'], ())) for lic in lics)
+        particoes.add(p)
+        regravadas += _gravar_gz(os.path.join(PASTA_ITENS, f"{p}.json.gz"), {lic['id']: lic.get('itens', []) for lic in lics})
+    resumos.sort(key=lambda r: (r.get('dt_enc') or '', r['id']), reverse=True)
+
+    # Partições que não têm mais editais (limpeza removeu) saem junto
+    obsoletas = [a for a in os.listdir(PASTA_ITENS) if a.endswith('.json.gz') and a[:-len('.json.gz')] not in particoes]
+    for a in obsoletas: os.remove(os.path.join(PASTA_ITENS, a))
+    _gravar_gz(ARQ_INDICE_WEB, {'editais': resumos})
+
+    tam_indice = os.path.getsize(ARQ_INDICE_WEB) / 1024
+    logging.info(f"📤 Painel: índice com {len(resumos)} editais ({tam_indice:.0f} KB) | {len(particoes)} partições de itens "
+                 f"({regravadas} regravadas, {len(obsoletas)} removidas)")
+    return len(resumos)
+
+if __name__ == '__main__':
+    exportar()
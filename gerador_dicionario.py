@@ -2,13 +2,9 @@ import csv
 import json
 import os
 import re
+from normalizacao import normalizar_termo
 
-def normalizar(texto):
-    if not texto: return ""
-    from unicodedata import normalize
-    # Remove acentos e limpa espaços extras
-    texto_limpo = "".join(c for c in normalize('NFD', str(texto).upper()) if not (ord(c) >= 768 and ord(c) <= 879))
-    return texto_limpo.strip()
+normalizar = normalizar_termo # Remove acentos e limpa espaços extras
 
 def eh_termo_valido(termo):
     """Verifica se o termo é um nome real e não uma dosagem/medida."""
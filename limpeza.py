@@ -1,58 +1,89 @@
 import json
-import gzip
+import hashlib
 import os
 import logging
+from armazenamento import iterar_banco, ler_registros, gravar_alteracoes, remover, compactar_se_necessario
 
 # Configuração de logs para acompanhamento no GitHub Actions
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
 
-def limpar_e_minificar():
+# Editais gravados no log por chamada (a gravação também é em fluxo)
+TAM_LOTE_GRAVACAO = 500
+
+def impressao(lic):
+    """Impressão digital do conteúdo: permite comparar com o banco sem manter os registros na memória."""
+    return hashlib.blake2b(json.dumps(lic, ensure_ascii=False, sort_keys=True).encode('utf-8'), digest_size=16).digest()
+
+def limpar_e_minificar(banco=None):
+    """Deduplica a entrada e faz dela o banco. Sem `banco`, lê e grava em disco (em fluxo); com `banco`
+    (dicionário já carregado, modo pipeline) só altera a memória e devolve (ids alterados, ids removidos)."""
     ARQ_ENTRADA = 'dadosoportunidades.json.gz'
-    ARQ_SAIDA = 'pregacoes_pharma_limpos.json.gz'
 
     if not os.path.exists(ARQ_ENTRADA):
         logging.error(f"❌ Erro: Ficheiro {ARQ_ENTRADA} não encontrado.")
-        return
+        return set(), []
 
     logging.info("🧹 Iniciando deduplicação e limpeza de banco de dados...")
 
+    # 1. DEDUPLICAÇÃO E ATUALIZAÇÃO (em fluxo)
+    # Para cada ID guardamos só (data de encerramento, posição no arquivo, impressão digital) da versão escolhida
+    escolhidos = {}
     try:
-        with gzip.open(ARQ_ENTRADA, 'rt', encoding='utf-8') as f:
-            licitacoes = json.load(f)
+        for posicao, lic in enumerate(ler_registros(ARQ_ENTRADA)):
+            id_lic = lic.get('id')
+            if not id_lic: continue
+            
+            # Se o edital já existe na base, comparamos a data de encerramento.
+            # Mantemos sempre o que tiver a data mais futura ou recente.
+            data_nova = lic.get('dt_enc', '')
+            if id_lic in escolhidos:
+                data_existente = escolhidos[id_lic][0]
+                
+                # Se a nova informação for mais recente ou tiver data de encerramento maior, substitui
+                if not (data_nova and (not data_existente or data_nova > data_existente)): continue
+            escolhidos[id_lic] = (data_nova, posicao, impressao(lic))
     except Exception as e:
         logging.error(f"❌ Erro ao ler dados: {e}")
-        return
-
-    # 1. DEDUPLICAÇÃO E ATUALIZAÇÃO
-    # Usamos um dicionário para garantir que cada ID seja único
-    base_limpa = {}
-    for lic in licitacoes:
-        id_lic = lic.get('id')
-        if not id_lic: continue
-        
-        # Se o edital já existe na base, comparamos a data de encerramento.
-        # Mantemos sempre o que tiver a data mais futura ou recente.
-        if id_lic in base_limpa:
-            data_existente = base_limpa[id_lic].get('dt_enc', '')
-            data_nova = lic.get('dt_enc', '')
-            
-            # Se a nova informação for mais recente ou tiver data de encerramento maior, substitui
-            if data_nova and (not data_existente or data_nova > data_existente):
-                base_limpa[id_lic] = lic
-        else:
-            base_limpa[id_lic] = lic
+        return set(), []
 
     # 2. CONSOLIDAÇÃO
-    # Transformamos o dicionário de volta em uma lista para o JSON
-    resultado_final = list(base_limpa.values())
-
+    # O resultado final substitui o banco: só as diferenças vão para o log (novos/alterados e removidos)
     try:
-        # Salvamos no formato comprimido que o novo index.html (com Pako) consegue ler
-        with gzip.open(ARQ_SAIDA, 'wt', encoding='utf-8') as f:
-            json.dump(resultado_final, f, ensure_ascii=False)
-        logging.info(f"✅ Sucesso: {len(resultado_final)} licitações únicas filtradas e salvas.")
+        no_banco = set()
+        removidos = []
+        alterados = set()
+        for lic in (banco.values() if banco is not None else iterar_banco()):
+            id_lic = lic['id']
+            no_banco.add(id_lic)
+            if id_lic not in escolhidos: removidos.append(id_lic)
+            elif impressao(lic) != escolhidos[id_lic][2]: alterados.add(id_lic)
+        alterados.update(i for i in escolhidos if i not in no_banco)
+
+        # Segunda leitura da entrada: só as versões escolhidas dos alterados são gravadas, em lotes
+        lote, gravados = [], 0
+        for posicao, lic in enumerate(ler_registros(ARQ_ENTRADA)):
+            id_lic = lic.get('id')
+            if id_lic in alterados and escolhidos[id_lic][1] == posicao:
+                if banco is not None:
+                    banco[id_lic] = lic
+                    gravados += 1
+                    continue
+                lote.append(lic)
+                if len(lote) >= TAM_LOTE_GRAVACAO:
+                    gravados += gravar_alteracoes(lote)
+                    lote = []
+        if banco is not None:
+            for id_lic in removidos: del banco[id_lic]
+        else:
+            gravados += gravar_alteracoes(lote)
+            remover(removidos)
+        logging.info(f"✅ Sucesso: {len(escolhidos)} licitações únicas filtradas ({gravados} gravadas, {len(removidos)} removidas).")
+        return alterados, removidos
     except Exception as e:
         logging.error(f"❌ Erro ao salvar ficheiro final: {e}")
+        return set(), []
 
 if __name__ == '__main__':
     limpar_e_minificar()
+    # Incorpora o log de alterações ao snapshot quando ele já cresceu demais
+    compactar_se_necessario()
@@ -0,0 +1,138 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+# --- MÉTRICAS DA EXECUÇÃO ---
+# Tudo o que passa pela sessão HTTP compartilhada (AdaptadorControlado/AdaptadorCache) é contado aqui por
+# endpoint: requisições, repetições, erros de conexão, status, bytes e latência. As etapas do script somam o
+# tempo gasto em cada fase. No fim, um JSON por script fica ao lado do log para ver onde o tempo da rodada foi.
+
+# Classe de endpoint do PNCP pela URL (a ordem importa: o mais específico primeiro)
+ENDPOINTS = [
+    ('listagem', re.compile(r'/contratacoes/publicacao')),
+    ('resultado_item', re.compile(r'/itens/\d+/resultados(\?|$)')),
+    ('resultados', re.compile(r'/resultados(\?|$)')),
+    ('itens', re.compile(r'/compras/\d+/\d+/itens(\?|$)')),
+    ('compra', re.compile(r'/orgaos/\d+/compras/\d+/\d+(\?|$)')),
+]
+
+# Limites (ms) das faixas do histograma de latência; a última faixa é "acima do maior limite"
+FAIXAS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+ROTULOS_FAIXAS = [f"<={f}" for f in FAIXAS_MS] + [f">{FAIXAS_MS[-1]}"]
+
+def faixa(segundos):
+    ms = segundos * 1000
+    return next((rotulo for f, rotulo in zip(FAIXAS_MS, ROTULOS_FAIXAS) if ms <= f), ROTULOS_FAIXAS[-1])
+
+def endpoint_da_url(url):
+    for nome, padrao in ENDPOINTS:
+        if padrao.search(url): return nome
+    return 'outro'
+
+def percentil(ordenados, p):
+    """Percentil por posição (nearest-rank) de uma lista já ordenada; None se vazia."""
+    if not ordenados: return None
+    return ordenados[min(len(ordenados) - 1, max(0, -(-p * len(ordenados) // 100) - 1))]
+
+class Metricas:
+    """Contadores da execução, compartilhados por threads e corrotinas (um lock só, seções curtas)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inicio = time.time()
+        self.endpoints = {}
+        self.etapas = {}
+
+    def _endpoint(self, nome):
+        e = self.endpoints.get(nome)
+        if e is None:
+            e = self.endpoints[nome] = {'requisicoes': 0, 'repeticoes': 0, 'erros': 0, 'cache': 0, 'bytes': 0,
+                                        'status': Counter(), 'latencias': []}
+        return e
+
+    def requisicao(self, url, status, segundos, tamanho=0, repeticoes=0):
+        """Uma ida à rede. status None = erro de conexão/timeout; repeticoes = tentativas extras desta ida
+        (do controle de concorrência ou do urllib3)."""
+        with self.lock:
+            e = self._endpoint(endpoint_da_url(url))
+            e['requisicoes'] += 1
+            e['repeticoes'] += repeticoes
+            e['bytes'] += tamanho
+            e['latencias'].append(segundos)
+            if status is None: e['erros'] += 1
+            else: e['status'][status] += 1
+
+    def acerto_cache(self, url):
+        with self.lock:
+            self._endpoint(endpoint_da_url(url))['cache'] += 1
+
+    def somar_etapa(self, nome, segundos, chamadas=1):
+        with self.lock:
+            e = self.etapas.setdefault(nome, {'segundos': 0.0, 'chamadas': 0})
+            e['segundos'] += segundos
+            e['chamadas'] += chamadas
+
+    @contextmanager
+    def etapa(self, nome):
+        """Soma o tempo do bloco na etapa (em paralelo, é a soma das tarefas, não o tempo de relógio)."""
+        ini = time.perf_counter()
+        try: yield
+        finally: self.somar_etapa(nome, time.perf_counter() - ini)
+
+    def resumo_endpoints(self):
+        resumo = {}
+        with self.lock:
+            for nome, e in sorted(self.endpoints.items()):
+                lat = sorted(e['latencias'])
+                histograma = Counter(faixa(s) for s in lat)
+                resumo[nome] = {
+                    'requisicoes': e['requisicoes'], 'repeticoes': e['repeticoes'], 'erros_conexao': e['erros'],
+                    'acertos_cache': e['cache'], 'bytes': e['bytes'],
+                    'status': {str(k): v for k, v in sorted(e['status'].items())},
+                    'latencia_ms': {f"p{p}": round(percentil(lat, p) * 1000, 1) for p in (50, 95, 99)} if lat else {},
+                    'histograma_ms': {r: histograma[r] for r in ROTULOS_FAIXAS if histograma[r]},
+                }
+        return resumo
+
+    def linhas(self):
+        """Resumo legível para o fim do log: uma linha por endpoint e uma com as etapas."""
+        linhas = []
+        for nome, e in self.resumo_endpoints().items():
+            lat = e['latencia_ms']
+            status = ' '.join(f"{k}x{v}" for k, v in e['status'].items())
+            linhas.append(f"📡 {nome}: {e['requisicoes']} req ({e['repeticoes']} repetidas, {e['erros_conexao']} erros de conexão, "
+                          f"{e['acertos_cache']} do cache) | p50 {lat.get('p50', 0):.0f} ms, p95 {lat.get('p95', 0):.0f} ms, "
+                          f"p99 {lat.get('p99', 0):.0f} ms | {e['bytes'] / 1048576:.1f} MB | {status or 'sem respostas'}")
+        with self.lock:
+            if self.etapas:
+                linhas.append("⏱️ Etapas (soma das tarefas): " + ' | '.join(f"{nome} {e['segundos']:.1f}s ({e['chamadas']}x)"
+                                                                       for nome, e in self.etapas.items()))
+        return linhas
+
+    def salvar(self, arquivo, script, **extras):
+        """Grava o JSON da execução (troca atômica) com endpoints, etapas e o que o script quiser somar."""
+        fim = time.time()
+        with self.lock:
+            etapas = {nome: {'segundos': round(e['segundos'], 3), 'chamadas': e['chamadas']} for nome, e in self.etapas.items()}
+        dados = {
+            'script': script,
+            'inicio': datetime.fromtimestamp(self.inicio).isoformat(timespec='seconds'),
+            'fim': datetime.fromtimestamp(fim).isoformat(timespec='seconds'),
+            'duracao_s': round(fim - self.inicio, 1),
+            'endpoints': self.resumo_endpoints(),
+            'etapas': etapas,
+            **extras,
+        }
+        tmp = arquivo + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, arquivo)
+        return dados
+
+# Métricas únicas do processo (todas as sessões e threads registram aqui)
+METRICAS = Metricas()
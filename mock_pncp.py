@@ -0,0 +1,294 @@
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+# --- PNCP LOCAL PARA BENCHMARKS OFFLINE ---
+# Responde os endpoints que app.py, atualiza.py e teste_espiao.py consultam, com os mesmos nomes de campo.
+# Tudo é gerado de forma determinística a partir do dia/edital (mesma semente = mesmas respostas), sem arquivo em disco.
+# Uso: python mock_pncp.py --porta 8765 --latencia-ms 80 --taxa-429 0.02  e  SNIPER_PNCP_URL=http://127.0.0.1:8765
+PORTA = 8765
+EDITAIS_POR_DIA = 300
+ARQ_DICIONARIO = 'dicionario_ouro.json'
+
+# Objetos típicos da listagem, cobrindo cada ramo da triagem do app.py (medicamento, MMH, vago, veto, fora da temática)
+OBJETOS = [
+    (30, "REGISTRO DE PREÇOS PARA FUTURA E EVENTUAL AQUISIÇÃO DE MEDICAMENTOS PARA A FARMÁCIA BÁSICA DO MUNICÍPIO"),
+    (10, "AQUISIÇÃO DE MEDICAMENTOS INJETÁVEIS E SOROS PARA O HOSPITAL MUNICIPAL"),
+    (12, "AQUISIÇÃO DE MATERIAL MÉDICO HOSPITALAR (SERINGAS, LUVAS, GAZES E SONDAS)"),
+    (4, "AQUISIÇÃO DE NUTRIÇÃO ENTERAL E FÓRMULA INFANTIL PARA ATENDER DEMANDAS JUDICIAIS"),
+    (10, "AQUISIÇÃO DE INSUMOS PARA ATENDER A SECRETARIA DE SAÚDE"),
+    (8, "CONTRATAÇÃO DE EMPRESA PARA OBRAS DE PAVIMENTAÇÃO EM VIAS URBANAS"),
+    (8, "AQUISIÇÃO DE GÊNEROS ALIMENTÍCIOS PARA A MERENDA ESCOLAR"),
+    (6, "LOCAÇÃO DE VEÍCULOS PARA A FROTA MUNICIPAL"),
+    (12, "AQUISIÇÃO DE MATERIAL DE EXPEDIENTE E ESCRITÓRIO PARA AS SECRETARIAS"),
+]
+UFS = [(14, 'SP'), (10, 'MG'), (8, 'BA'), (7, 'PE'), (6, 'CE'), (6, 'RJ'), (5, 'PR'), (5, 'RS'), (4, 'GO'), (4, 'PA'),
+       (4, 'MA'), (3, 'PB'), (3, 'RN'), (3, 'PI'), (3, 'AL'), (3, 'SE'), (3, 'ES'), (2, 'SC'), (2, 'MT'), (2, 'MS'),
+       (2, 'AM'), (2, 'TO'), (1, 'DF'), (1, 'RO'), (1, 'AC'), (1, 'AP'), (1, 'RR')]
+ITENS_MMH = ["SERINGA DESCARTÁVEL 10ML COM AGULHA", "LUVA DE PROCEDIMENTO LÁTEX TAMANHO M", "GAZE HIDRÓFILA 7,5X7,5CM ESTÉRIL",
+             "SONDA NASOGÁSTRICA Nº 12", "ATADURA DE CREPOM 15CM", "ESPARADRAPO IMPERMEÁVEL 10CMX4,5M",
+             "CATETER INTRAVENOSO 20G", "EQUIPO MACROGOTAS PARA SORO", "MÁSCARA CIRÚRGICA DESCARTÁVEL TRIPLA"]
+ITENS_FORA = ["BISCOITO DOCE TIPO MAISENA 400G", "ARROZ PARBOILIZADO TIPO 1 5KG", "PAPEL A4 RESMA 500 FOLHAS",
+              "CANETA ESFEROGRÁFICA AZUL", "DETERGENTE NEUTRO 500ML", "PNEU ARO 15 PARA VEÍCULO"]
+FORMAS = ["COMPRIMIDO", "CÁPSULA", "SOLUÇÃO INJETÁVEL AMPOLA 2ML", "SUSPENSÃO ORAL FRASCO 60ML", "CREME BISNAGA 30G"]
+SITUACOES = [(90, 'Divulgada no PNCP'), (4, 'Revogada'), (3, 'Anulada'), (3, 'Suspensa')]
+FORNECEDORES = ["DISTRIBUIDORA HOSPITALAR NORDESTE LTDA", "FARMA MEDICAMENTOS EIRELI", "CIRURGICA BRASIL COMERCIO LTDA",
+                "MEDICAL SUPRIMENTOS S/A", "PHARMA LOG DISTRIBUICAO LTDA"]
+
+def _rnd(*chave):
+    """Gerador próprio de cada dia/edital/item: a mesma chave sempre produz o mesmo conteúdo."""
+    return random.Random(zlib.crc32(':'.join(map(str, chave)).encode()))
+
+def _escolher(rnd, pesos):
+    return rnd.choices([v for _, v in pesos], weights=[p for p, _ in pesos])[0]
+
+_FARMACOS = None
+def farmacos():
+    global _FARMACOS
+    if _FARMACOS is None:
+        try:
+            with open(ARQ_DICIONARIO, 'r', encoding='utf-8') as f:
+                _FARMACOS = sorted({t.split()[0] for t in json.load(f) if t.split()})
+        except (OSError, ValueError):
+            _FARMACOS = ["DIPIRONA", "AMOXICILINA", "PARACETAMOL", "OMEPRAZOL", "LOSARTANA", "METFORMINA"]
+    return _FARMACOS
+
+# --- FIXTURES ---
+def total_editais(dia, editais_por_dia=EDITAIS_POR_DIA):
+    """Publicações do dia (YYYYMMDD): ±20% em torno da média, menos no fim de semana."""
+    data = datetime.strptime(dia, '%Y%m%d')
+    base = editais_por_dia * (0.25 if data.weekday() >= 5 else 1)
+    return int(base * _rnd('dia', dia).uniform(0.8, 1.2))
+
+def gerar_edital(dia, i):
+    """Registro de /contratacoes/publicacao (campos lidos por app.triar_licitacao e avaliar_itens)."""
+    rnd = _rnd('edital', dia, i)
+    data = datetime.strptime(dia, '%Y%m%d')
+    cnpj = f"{zlib.crc32(dia.encode()) % 10**8:08d}{i:06d}"
+    uf = _escolher(rnd, UFS)
+    encerramento = data + timedelta(days=rnd.randint(3, 20), hours=rnd.choice((9, 10, 14)))
+    return {
+        'numeroControlePNCP': f"{cnpj}-1-{i + 1:06d}/{data.year}",
+        'numeroCompra': f"{i + 1:03d}", 'anoCompra': data.year, 'sequencialCompra': i + 1,
+        'modalidadeId': 6, 'modalidadeNome': 'Pregão - Eletrônico',
+        'objetoCompra': _escolher(rnd, OBJETOS),
+        'orgaoEntidade': {'cnpj': cnpj, 'razaoSocial': f"MUNICIPIO DE TESTE {i}", 'poderId': 'E', 'esferaId': 'M'},
+        'unidadeOrgao': {'ufSigla': uf, 'municipioNome': f"CIDADE {i % 97}", 'codigoUnidade': f"{rnd.randint(1, 999999):06d}",
+                         'nomeUnidade': 'FUNDO MUNICIPAL DE SAUDE'},
+        'dataPublicacaoPncp': data.strftime('%Y-%m-%dT08:00:00'),
+        'dataAberturaProposta': data.strftime('%Y-%m-%dT08:00:00'),
+        'dataEncerramentoProposta': encerramento.strftime('%Y-%m-%dT%H:%M:%S'),
+        'dataAtualizacao': (data + timedelta(hours=rnd.randint(8, 20))).strftime('%Y-%m-%dT%H:%M:%S'),
+        'situacaoCompraId': 1, 'situacaoCompraNome': 'Divulgada no PNCP',
+        'valorTotalEstimado': round(rnd.uniform(5_000, 2_000_000), 2),
+    }
+
+def gerar_listagem(dia, pagina, tamanho, editais_por_dia=EDITAIS_POR_DIA):
+    total = total_editais(dia, editais_por_dia)
+    inicio = (pagina - 1) * tamanho
+    if inicio >= total: return None
+    paginas = -(-total // tamanho)
+    return {'data': [gerar_edital(dia, i) for i in range(inicio, min(inicio + tamanho, total))],
+            'totalRegistros': total, 'totalPaginas': paginas, 'numeroPagina': pagina,
+            'paginasRestantes': paginas - pagina, 'empty': False}
+
+def quantidade_itens(cnpj, ano, seq):
+    rnd = _rnd('qtd', cnpj, ano, seq)
+    return rnd.randint(501, 700) if rnd.random() < 0.01 else rnd.randint(1, 60) # Poucos passam de uma página
+
+def gerar_item(cnpj, ano, seq, n):
+    """Registro de /itens (campos lidos por app.avaliar_itens e teste_espiao.capturar_detalhes_completos)."""
+    rnd = _rnd('item', cnpj, ano, seq, n)
+    sorteio = rnd.random()
+    if sorteio < 0.55:
+        descricao = f"{rnd.choice(farmacos())} {rnd.choice((250, 500, 10, 20, 40))}MG {rnd.choice(FORMAS)}"
+    elif sorteio < 0.8:
+        descricao = rnd.choice(ITENS_MMH)
+    else:
+        descricao = rnd.choice(ITENS_FORA)
+    quantidade = rnd.randint(10, 5000)
+    valor = round(rnd.uniform(0.05, 90), 4)
+    return {
+        'numeroItem': n, 'descricao': descricao, 'materialOuServico': 'M', 'materialOuServicoNome': 'Material',
+        'quantidade': quantidade, 'unidadeMedida': rnd.choice(('UN', 'CX', 'FR', 'AMP', 'PCT')),
+        'valorUnitarioEstimado': valor, 'valorTotal': round(valor * quantidade, 2),
+        'tipoBeneficio': rnd.choice((1, 1, 3, 4, 5)), 'situacaoCompraItemNome': 'Em andamento',
+    }
+
+def gerar_itens(cnpj, ano, seq, pagina, tamanho):
+    total = quantidade_itens(cnpj, ano, seq)
+    inicio = (pagina - 1) * tamanho
+    return [gerar_item(cnpj, ano, seq, n) for n in range(inicio + 1, min(inicio + tamanho, total) + 1)]
+
+def gerar_resultado(cnpj, ano, seq, n):
+    """Resultado homologado de um item (metade dos itens já tem vencedor), ou None."""
+    rnd = _rnd('resultado', cnpj, ano, seq, n)
+    if rnd.random() >= 0.5: return None
+    return {'numeroItem': n, 'sequencialResultado': 1, 'nomeRazaoSocialFornecedor': rnd.choice(FORNECEDORES),
+            'niFornecedor': f"{rnd.randint(10**13, 10**14 - 1)}", 'valorUnitarioHomologado': round(rnd.uniform(0.05, 90), 4),
+            'quantidadeHomologada': rnd.randint(10, 5000), 'dataResultado': f"{ano}-03-01T10:00:00"}
+
+def gerar_resultados(cnpj, ano, seq, pagina, tamanho):
+    todos = [r for n in range(1, quantidade_itens(cnpj, ano, seq) + 1) if (r := gerar_resultado(cnpj, ano, seq, n))]
+    return todos[(pagina - 1) * tamanho:pagina * tamanho]
+
+def gerar_compra(cnpj, ano, seq):
+    """Cabeçalho da compra (atualiza.buscar_status_global_pncp lê situacaoCompraNome)."""
+    return {'orgaoEntidade': {'cnpj': cnpj}, 'anoCompra': int(ano), 'sequencialCompra': int(seq),
+            'situacaoCompraNome': _escolher(_rnd('compra', cnpj, ano, seq), SITUACOES)}
+
+# --- SERVIDOR ---
+ROTAS = [
+    ('listagem', re.compile(r'^/api/consulta/v1/contratacoes/publicacao$')),
+    ('compra', re.compile(r'^/api/pncp/v1/orgaos/(\d+)/compras/(\d+)/(\d+)$')),
+    ('itens', re.compile(r'^/api/pncp/v1/orgaos/(\d+)/compras/(\d+)/(\d+)/itens$')),
+    ('resultado_item', re.compile(r'^/api/pncp/v1/orgaos/(\d+)/compras/(\d+)/(\d+)/itens/(\d+)/resultados$')),
+    ('resultados', re.compile(r'^/api/pncp/v1/orgaos/(\d+)/compras/(\d+)/(\d+)/resultados$')),
+]
+
+class ManipuladorPNCP(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # Conexões persistentes, como o PNCP de verdade
+    server_version = 'MockPNCP/1.0'
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, rota, status, corpo=None, cabecalhos=None):
+        bruto = json.dumps(corpo, ensure_ascii=False).encode('utf-8') if corpo is not None else b''
+        self.send_response(status)
+        if bruto: self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(bruto)))
+        for k, v in (cabecalhos or {}).items(): self.send_header(k, v)
+        self.end_headers()
+        if bruto: self.wfile.write(bruto)
+        self.server.contar(rota, status, len(bruto))
+
+    def do_GET(self):
+        servidor = self.server
+        partes = urlsplit(self.path)
+        params = {k: v[0] for k, v in parse_qs(partes.query).items()}
+        rota, grupos = next(((nome, m.groups()) for nome, padrao in ROTAS if (m := padrao.match(partes.path))), (None, None))
+        if rota is None: return self._responder('desconhecida', 404, {'message': 'Not Found'})
+
+        if servidor.latencia: time.sleep(max(0.0, random.gauss(servidor.latencia, servidor.latencia * 0.3)))
+        sorteio = random.random()
+        if sorteio < servidor.taxa_429:
+            return self._responder(rota, 429, {'message': 'Too Many Requests'}, {'Retry-After': str(servidor.retry_after)})
+        if sorteio < servidor.taxa_429 + servidor.taxa_erro:
+            return self._responder(rota, random.choice((500, 502, 503)), {'message': 'Erro simulado'})
+
+        pagina = int(params.get('pagina', 1))
+        tamanho = int(params.get('tamanhoPagina', 50))
+        if rota == 'listagem':
+            corpo = gerar_listagem(params.get('dataInicial', ''), pagina, tamanho, servidor.editais_por_dia)
+            if corpo: servidor.contar_editais(len(corpo['data']))
+        elif rota == 'compra':
+            corpo = gerar_compra(*grupos)
+        elif rota == 'itens':
+            corpo = gerar_itens(*grupos, pagina, tamanho)
+        elif rota == 'resultado_item':
+            resultado = gerar_resultado(*grupos[:3], int(grupos[3]))
+            corpo = [resultado] if resultado else []
+        else:
+            corpo = gerar_resultados(*grupos, pagina, tamanho) or None
+        if corpo is None: return self._responder(rota, 204)
+        self._responder(rota, 200, corpo)
+
+class ServidorPNCP(ThreadingHTTPServer):
+    """PNCP local com latência (gaussiana, ±30%), 5xx e 429 (com Retry-After) injetados nas taxas pedidas."""
+    daemon_threads = True
+
+    def __init__(self, porta=0, latencia_ms=50, taxa_erro=0.0, taxa_429=0.0, retry_after=1, editais_por_dia=EDITAIS_POR_DIA):
+        super().__init__(('127.0.0.1', porta), ManipuladorPNCP)
+        self.latencia = latencia_ms / 1000
+        self.taxa_erro = taxa_erro
+        self.taxa_429 = taxa_429
+        self.retry_after = retry_after
+        self.editais_por_dia = editais_por_dia
+        self.lock = threading.Lock()
+        self.zerar()
+
+    def handle_error(self, request, client_address):
+        """Cliente que fecha a conexão persistente ao terminar não é erro do benchmark."""
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def zerar(self):
+        with self.lock:
+            self.requisicoes = Counter()
+            self.status = Counter()
+            self.bytes = 0
+            self.editais_listados = 0
+
+    def contar(self, rota, status, tamanho):
+        with self.lock:
+            self.requisicoes[rota] += 1
+            self.status[status] += 1
+            self.bytes += tamanho
+
+    def contar_editais(self, n):
+        with self.lock:
+            self.editais_listados += n
+
+    def resumo(self):
+        with self.lock:
+            return {'requisicoes': dict(self.requisicoes), 'status': {str(k): v for k, v in sorted(self.status.items())},
+                    'bytes': self.bytes, 'editais_listados': self.editais_listados}
+
+    def iniciar(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def parar(self):
+        self.shutdown()
+        self.server_close()
+
+def salvar_amostra(pasta, dia, editais_por_dia=EDITAIS_POR_DIA):
+    """Grava a listagem de um dia e os itens/resultados dos 5 primeiros editais, para inspecionar as fixtures."""
+    os.makedirs(pasta, exist_ok=True)
+    listagem = gerar_listagem(dia, 1, 50, editais_por_dia)
+    with open(os.path.join(pasta, f"publicacao_{dia}.json"), 'w', encoding='utf-8') as f:
+        json.dump(listagem, f, ensure_ascii=False, indent=1)
+    for lic in listagem['data'][:5]:
+        chave = (lic['orgaoEntidade']['cnpj'], str(lic['anoCompra']), str(lic['sequencialCompra']))
+        nome = '_'.join(chave)
+        with open(os.path.join(pasta, f"itens_{nome}.json"), 'w', encoding='utf-8') as f:
+            json.dump(gerar_itens(*chave, 1, 500), f, ensure_ascii=False, indent=1)
+        with open(os.path.join(pasta, f"resultados_{nome}.json"), 'w', encoding='utf-8') as f:
+            json.dump(gerar_resultados(*chave, 1, 500), f, ensure_ascii=False, indent=1)
+    return len(listagem['data'])
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="PNCP local para benchmarks offline")
+    parser.add_argument('--porta', type=int, default=PORTA)
+    parser.add_argument('--latencia-ms', type=float, default=50)
+    parser.add_argument('--taxa-erro', type=float, default=0.0, help="Fração de respostas 5xx")
+    parser.add_argument('--taxa-429', type=float, default=0.0, help="Fração de respostas 429 (com Retry-After)")
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--editais-dia', type=int, default=EDITAIS_POR_DIA)
+    parser.add_argument('--amostra', metavar='PASTA', help="Só grava fixtures de exemplo (hoje) na pasta e sai")
+    args = parser.parse_args()
+
+    if args.amostra:
+        n = salvar_amostra(args.amostra, datetime.now().strftime('%Y%m%d'), args.editais_dia)
+        print(f"📁 Fixtures de exemplo em {args.amostra} ({n} editais na primeira página)")
+    else:
+        servidor = ServidorPNCP(args.porta, args.latencia_ms, args.taxa_erro, args.taxa_429, args.retry_after, args.editais_dia)
+        print(f"🧪 PNCP local em {servidor.url} (SNIPER_PNCP_URL={servidor.url}) | latência {args.latencia_ms:g} ms | "
+              f"5xx {args.taxa_erro:.0%} | 429 {args.taxa_429:.0%}")
+        try: servidor.serve_forever()
+        except KeyboardInterrupt: print(f"\n📊 {servidor.resumo()}")
@@ -0,0 +1,59 @@
+import unicodedata
+from functools import lru_cache
+
+# --- NORMALIZAÇÃO DE TEXTO COMPARTILHADA ---
+# Os três normalizadores do projeto (app, avalia_portfolio, gerador_dicionario) diferem só em detalhes de
+# escrita não latina; cada um mantém aqui a sua regra original, com o mesmo caminho rápido na frente:
+# ASCII puro vira .upper(), texto latino passa por uma tabela de tradução pré-calculada e só o resto
+# (outros alfabetos) cai no NFD caractere a caractere. Descrições repetidas (CATMAT) saem do memo.
+TAM_MEMO = 1 << 16
+
+# Faixas da tabela: Latim + diacríticos combinantes (0000–036F) e pontuação geral (2000–206F: travessões,
+# aspas curvas, marcadores). Nelas nenhum caractere mantido pela regra é combinante com classe > 0, então a
+# reordenação canônica do NFD não muda nada e a saída do texto é a concatenação da saída de cada caractere.
+FAIXAS_TABELA = [(0x0000, 0x0370), (0x2000, 0x2070)]
+
+def _sem_mn(t):
+    """Regra do app.py: NFD, maiúsculas, descarta categoria Mn."""
+    return ''.join(c for c in unicodedata.normalize('NFD', t).upper() if unicodedata.category(c) != 'Mn')
+
+def _sem_combinantes(t):
+    """Regra do avalia_portfolio.py: NFD, descarta combinantes (classe canônica > 0), maiúsculas."""
+    return ''.join(c for c in unicodedata.normalize('NFD', t) if not unicodedata.combining(c)).upper()
+
+def _sem_bloco_diacriticos(t):
+    """Regra do gerador_dicionario.py: maiúsculas, NFD, descarta o bloco U+0300–U+036F."""
+    return ''.join(c for c in unicodedata.normalize('NFD', t.upper()) if not (768 <= ord(c) <= 879))
+
+class _ForaDaTabela(Exception):
+    pass
+
+class _Tabela(dict):
+    """Tabela do str.translate; um caractere fora das faixas aborta a tradução (volta à regra completa)."""
+    def __missing__(self, cp):
+        raise _ForaDaTabela
+
+def _montar(regra, aparar=False):
+    tabela = _Tabela((cp, regra(chr(cp))) for ini, fim in FAIXAS_TABELA for cp in range(ini, fim))
+
+    @lru_cache(maxsize=TAM_MEMO)
+    def _normalizar(t):
+        if t.isascii(): r = t.upper()
+        else:
+            try: r = t.translate(tabela)
+            except _ForaDaTabela: r = regra(t)
+        return r.strip() if aparar else r
+
+    def normalizar(texto):
+        if not texto: return ""
+        return _normalizar(texto if type(texto) is str else str(texto))
+    normalizar.cache_info = _normalizar.cache_info
+    normalizar.cache_clear = _normalizar.cache_clear
+    return normalizar
+
+# Objeto e itens na triagem da captura (app.py)
+normalizar = _montar(_sem_mn)
+# Descrições e termos no motor do portfólio (avalia_portfolio.py)
+normalizar_descricao = _montar(_sem_combinantes)
+# Colunas da planilha ao gerar o dicionário (gerador_dicionario.py), com espaços das pontas removidos
+normalizar_termo = _montar(_sem_bloco_diacriticos, aparar=True)
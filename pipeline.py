@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+import signal
+import logging
+import app
+import limpeza
+import avalia_portfolio
+import exportar
+from armazenamento import carregar_banco, gravar_alteracoes, remover, compactar, compactar_se_necessario
+
+# Captura -> limpeza -> avaliação -> exportação num processo só: o banco é lido uma vez, alterado em memória
+# e gravado uma vez (log de alterações; snapshot regravado a partir da memória quando precisa compactar).
+# Os scripts continuam rodando sozinhos como antes.
+
+def main():
+    parser = app.criar_parser()
+    parser.add_argument('--workers', type=int, default=1, help="Processos da avaliação de portfólio (0 = todos os núcleos)")
+    parser.add_argument('--compactar', action='store_true', help="Regrava o snapshot no fim mesmo abaixo do limiar de compactação")
+    args = parser.parse_args()
+
+    if os.path.exists(app.ARQ_LOCK): sys.exit(0)
+    with open(app.ARQ_LOCK, 'w') as f: f.write("lock")
+
+    tempos = {}
+    def etapa(nome, func):
+        ini = time.perf_counter()
+        resultado = func()
+        tempos[nome] = time.perf_counter() - ini
+        logging.info(f"⏱️ {nome}: {tempos[nome]:.1f}s")
+        return resultado
+
+    try:
+        signal.signal(signal.SIGTERM, app.interromper)
+        data_ini, data_fim, concluidos, dias = app.dias_pendentes(args)
+        app.log_mensagem(f"🚀 Pipeline: {data_ini} a {data_fim} (modo {args.mode}) | {len(dias)} dias a varrer")
+
+        banco = etapa('carga do banco', carregar_banco)
+        interrompido, stats = False, {}
+        if dias:
+            inicio = time.time()
+            stats, interrompido = etapa('captura', lambda: app.executar_captura(args, dias, banco, concluidos))
+
+        alterados, removidos = set(app.ALTERADOS), []
+        try:
+            if dias: app.resumir_captura(stats, inicio)
+            if not interrompido:
+                alterados_limpeza, removidos = etapa('limpeza', lambda: limpeza.limpar_e_minificar(banco))
+                alterados = (alterados | alterados_limpeza) - set(removidos)
+        except KeyboardInterrupt:
+            # A captura está só em memória: um sinal depois dela não pode jogá-la fora (vai direto para a gravação)
+            interrompido, removidos = True, []
+            app.log_mensagem("⚠️ Interrompido depois da captura: gravando o que já foi capturado e os dias concluídos...")
+
+        def gravar():
+            gravados = gravar_alteracoes([banco[i] for i in alterados if i in banco])
+            remover(removidos)
+            # Interrompido, o banco em memória pode ter a limpeza pela metade: fica só no log, sem regravar o snapshot
+            if args.compactar and not interrompido: compactar(registros=banco.values())
+            elif not interrompido: compactar_se_necessario(registros=banco.values())
+            logging.info(f"💾 Banco gravado uma vez: {gravados} editais alterados, {len(removidos)} removidos.")
+        # Um segundo sinal não corta a gravação: fica anotado e as etapas seguintes são puladas
+        sinais = []
+        signal.signal(signal.SIGTERM, lambda signum, frame: sinais.append(signum))
+        etapa('gravação', gravar)
+        # Checkpoint só depois do banco: um dia marcado como concluído está sempre no disco
+        app.salvar_checkpoint(concluidos)
+        app.salvar_rejeitados()
+        signal.signal(signal.SIGTERM, app.interromper)
+        if sinais and not interrompido:
+            interrompido = True
+            app.log_mensagem("⚠️ Interrompido durante a gravação (concluída): avaliação/exportação ficam para a próxima rodada.")
+
+        try:
+            if not interrompido:
+                etapa('avaliação de portfólio', lambda: avalia_portfolio.main(args.workers or os.cpu_count(), banco.values()))
+                etapa('exportação do painel', lambda: exportar.exportar(banco))
+        except KeyboardInterrupt:
+            interrompido = True
+            app.log_mensagem("⚠️ Interrompido depois da gravação: avaliação/exportação ficam para a próxima rodada.")
+
+        logging.info("📊 Tempo por etapa: " + ' | '.join(f"{nome} {t:.1f}s" for nome, t in tempos.items())
+                     + f" | total {sum(tempos.values()):.1f}s")
+        app.salvar_metricas(stats, 'pipeline.py', argumentos=vars(args), interrompido=interrompido,
+                            etapas_pipeline={nome: round(t, 3) for nome, t in tempos.items()})
+    finally:
+        if os.path.exists(app.ARQ_LOCK): os.remove(app.ARQ_LOCK)
+
+if __name__ == '__main__':
+    main()
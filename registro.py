@@ -0,0 +1,53 @@
+import atexit
+import logging
+import queue
+import sys
+import threading
+from datetime import datetime
+from logging.handlers import QueueListener
+
+# --- LOG DOS SCRIPTS ---
+# Quem loga só carimba a hora e enfileira a linha; uma thread única escreve no console e no arquivo (aberto uma
+# vez, não a cada mensagem), então workers e corrotinas não disputam o arquivo nem esperam o disco.
+
+class _Linha(logging.Handler):
+    """Repassa a linha já formatada, sem prefixo de nível."""
+    def format(self, registro):
+        return registro.msg
+
+class _Console(_Linha, logging.StreamHandler):
+    pass
+
+class _Arquivo(_Linha, logging.FileHandler):
+    pass
+
+def criar_log(arquivo, formato_hora='%H:%M:%S'):
+    """log_mensagem(msg) de um script: '[hora] msg' no console e em `arquivo`, escritos pela thread da fila.
+    A fila é esvaziada na saída do processo (atexit); `log_mensagem.descarregar()` força a escrita antes."""
+    fila = queue.SimpleQueue()
+    estado = {'ouvinte': None}
+    lock = threading.Lock()
+
+    def iniciar():
+        with lock:
+            if estado['ouvinte'] is None:
+                # delay=True: importar o script (pipeline, benchmark) não cria o arquivo de log
+                ouvinte = QueueListener(fila, _Console(sys.stdout), _Arquivo(arquivo, encoding='utf-8', delay=True))
+                ouvinte.start()
+                estado['ouvinte'] = ouvinte
+
+    def log_mensagem(msg):
+        if estado['ouvinte'] is None: iniciar()
+        fila.put(logging.makeLogRecord({'msg': f"[{datetime.now().strftime(formato_hora)}] {msg}", 'levelno': logging.INFO}))
+
+    def descarregar():
+        """Espera a thread escrever tudo o que já foi enfileirado; a próxima mensagem abre outra."""
+        with lock:
+            ouvinte, estado['ouvinte'] = estado['ouvinte'], None
+        if ouvinte is None: return
+        ouvinte.stop()
+        for h in ouvinte.handlers: h.close()
+
+    atexit.register(descarregar)
+    log_mensagem.descarregar = descarregar
+    return log_mensagem
@@ -0,0 +1,76 @@
+import csv
+import os
+import re
+import logging
+from automato import ClassificadorTermos
+from normalizacao import normalizar
+
+ARQ_REGRAS = 'regras_materiais.csv'
+
+def _preparar(termo, inteligente):
+    """busca_inteligente 'Sim': sem acento e sem caixa (mesma normalização da triagem); 'Não': só maiúsculas."""
+    termo = termo.strip()
+    return normalizar(termo) if inteligente else termo.upper()
+
+def carregar_regras(arquivo=ARQ_REGRAS):
+    """Linhas do CSV como regras: palavra-chave + afirmações (basta uma, se houver) + negações (nenhuma pode aparecer).
+    operador 'Igual' exige a palavra-chave como palavra inteira; afirmações e negações são radicais (substring)."""
+    if not os.path.exists(arquivo):
+        logging.warning(f"⚠️ {arquivo} não encontrado: nenhuma regra de material ativa.")
+        return []
+    regras = []
+    with open(arquivo, 'r', encoding='utf-8-sig', newline='') as f:
+        for n, linha in enumerate(csv.DictReader(f), start=2):
+            inteligente = (linha.get('busca_inteligente') or 'Sim').strip().upper() in ('SIM', 'S')
+            chave = _preparar(linha.get('palavra_chave') or '', inteligente)
+            if not chave: continue
+            def lista(coluna):
+                return tuple(dict.fromkeys(_preparar(t, inteligente) for t in (linha.get(coluna) or '').split(';') if t.strip()))
+            regras.append({
+                'linha': n, 'rotulo': (linha.get('palavra_chave') or '').strip().upper(), 'chave': chave,
+                'afirmacao': lista('afirmacao'), 'negacao': lista('negacao'), 'inteligente': inteligente,
+                'inteira': (linha.get('operador') or 'Igual').strip().upper() == 'IGUAL',
+            })
+    return regras
+
+class MotorRegras:
+    """Todas as regras compiladas num ClassificadorTermos só: uma passada pela descrição acha chaves, afirmações e
+    negações de uma vez e só as regras cuja chave apareceu são conferidas (nada de varrer o texto regra a regra)."""
+
+    def __init__(self, regras):
+        self.regras = regras
+        self.modos = {}
+        for inteligente in (True, False):
+            grupo = [r for r in regras if r['inteligente'] == inteligente]
+            if not grupo: continue
+            por_chave = {}
+            for r in grupo: por_chave.setdefault(r['chave'], []).append(r)
+            termos = {t for r in grupo for t in (r['chave'],) + r['afirmacao'] + r['negacao']}
+            self.modos[inteligente] = (ClassificadorTermos({'termo': termos}), por_chave)
+        # Conferência de palavra inteira, só para chaves que já apareceram como substring
+        self.limites = {r['chave']: re.compile(r'(?<!\w)' + re.escape(r['chave']) + r'(?!\w)') for r in regras if r['inteira']}
+
+    def __len__(self):
+        return len(self.regras)
+
+    def avaliar(self, texto):
+        """Regras disparadas pela descrição, na ordem do CSV."""
+        if not texto or not self.regras: return []
+        disparadas = []
+        for inteligente, (classificador, por_chave) in self.modos.items():
+            alvo = normalizar(texto) if inteligente else str(texto).upper()
+            achados = classificador.encontrar(alvo)
+            for chave in achados.intersection(por_chave):
+                inteira = None
+                for r in por_chave[chave]:
+                    if r['inteira']:
+                        if inteira is None: inteira = bool(self.limites[chave].search(alvo))
+                        if not inteira: continue
+                    if r['afirmacao'] and achados.isdisjoint(r['afirmacao']): continue
+                    if not achados.isdisjoint(r['negacao']): continue
+                    disparadas.append(r)
+        if len(disparadas) > 1: disparadas.sort(key=lambda r: r['linha'])
+        return disparadas
+
+def carregar_motor(arquivo=ARQ_REGRAS):
+    return MotorRegras(carregar_regras(arquivo))
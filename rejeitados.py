@@ -0,0 +1,79 @@
+import gzip
+import json
+import os
+import threading
+
+# --- ÍNDICE NEGATIVO DA CAPTURA ---
+# Editais que só foram rejeitados depois de baixar os itens (VETO_DICIONARIO, ou FORA_TEMATICA com todos os
+# itens na blacklist). A chave é o id + o hash da listagem (h_lst): se o edital mudar no PNCP ele volta a ser
+# avaliado. A assinatura dos filtros (dicionário, regras, blacklist, listas da triagem) fica no cabeçalho:
+# mudou, o índice inteiro é descartado.
+ARQ_REJEITADOS = 'rejeitados_captura.json.gz'
+# Teto de entradas; as mais antigas (nem registradas nem consultadas há mais tempo) saem primeiro
+LIMITE_ENTRADAS = 200000
+
+class IndiceRejeitados:
+    """{id: (h_lst, páginas de itens que custou, status da rejeição)} persistido em gzip, compartilhado pelas threads da captura."""
+
+    def __init__(self, assinatura, arquivo=ARQ_REJEITADOS, limite=LIMITE_ENTRADAS):
+        self.assinatura = assinatura
+        self.arquivo = arquivo
+        self.limite = limite
+        self.lock = threading.Lock()
+        self.entradas = {}
+        self.situacao = 'vazio'
+        self.stats = {'ACERTOS': 0, 'REQ_POUPADAS': 0, 'NOVOS': 0}
+        self._carregar()
+
+    def _carregar(self):
+        if not os.path.exists(self.arquivo): return
+        try:
+            with gzip.open(self.arquivo, 'rt', encoding='utf-8') as f:
+                dados = json.load(f)
+        except Exception: return
+        if dados.get('assinatura') != self.assinatura:
+            self.situacao = 'filtros alterados, índice descartado'
+            return
+        self.entradas = {id_lic: tuple(v) for id_lic, v in dados['editais'].items()}
+        self.situacao = f"{len(self.entradas)} editais"
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def consultar(self, id_lic, h_lst):
+        """Status da rejeição se o edital, nesta versão da listagem, já caiu com os filtros atuais; senão None."""
+        with self.lock:
+            entrada = self.entradas.get(id_lic)
+            if entrada is None or entrada[0] != h_lst: return None
+            self.entradas[id_lic] = self.entradas.pop(id_lic) # Vai para o fim: consultado agora
+            self.stats['ACERTOS'] += 1
+            self.stats['REQ_POUPADAS'] += entrada[1]
+            return entrada[2]
+
+    def registrar(self, id_lic, h_lst, paginas, status):
+        with self.lock:
+            self.entradas.pop(id_lic, None)
+            self.entradas[id_lic] = (h_lst, paginas, status)
+            self.stats['NOVOS'] += 1
+
+    def descartar(self, id_lic):
+        """O edital passou nos filtros (listagem nova): deixa de ser rejeitado."""
+        with self.lock:
+            self.entradas.pop(id_lic, None)
+
+    def salvar(self):
+        with self.lock:
+            excesso = len(self.entradas) - self.limite
+            if excesso > 0:
+                for id_lic in list(self.entradas)[:excesso]: del self.entradas[id_lic]
+            dados = {'assinatura': self.assinatura, 'editais': self.entradas}
+            bruto = gzip.compress(json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), mtime=0)
+        tmp = self.arquivo + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(bruto)
+        os.replace(tmp, self.arquivo)
+
+    def resumo(self):
+        s = self.stats
+        return (f"{s['ACERTOS']} editais rejeitados sem buscar itens ({s['REQ_POUPADAS']} requisições de itens poupadas) | "
+                f"{s['NOVOS']} novos no índice, {len(self.entradas)} no total")